@@ -4,6 +4,7 @@ from enum import IntEnum
 from itertools import zip_longest, islice
 from math import log2, ceil, floor
 import os
+import random
 
 # =============================================================================
 # HASH FUNCTIONS
@@ -147,6 +148,78 @@ class Hash:
 			tree_idx_offset >>= 1
 		return node
 
+# =============================================================================
+# FAULT INJECTION
+# =============================================================================
+
+class FaultModel(IntEnum):
+	RANDOM = 0  # random output
+	BITFLIP = 1 # output with random bits flipped
+	SKIP = 2    # skipped call, the output is the input (e.g., skipped chain step for F)
+	STUCK = 3   # output stuck at a value
+
+# Fault model, index of the faulted call among the eligible ones (all of them if
+# None), predicate on (primitive name, adrs) of the eligible calls (all calls if
+# None, adrs is None for PRF_msg and H_msg), flipped bits, and stuck value
+# (zeros if None)
+Fault = namedtuple("Fault", "model call predicate bits value", defaults=(None, None, 1, None))
+
+class FaultyHash(Hash):
+	"""Hash corrupting the output of the calls selected by its fault (if any),
+	e.g., SPHINCSplus(instance, hash=FaultyHash). C, treehash and recomp_root
+	go through the faulty F and H."""
+
+	def __init__(self, n, m, robust=False):
+		super().__init__(n, m, robust=robust)
+		self.rng = random.Random()
+		self.reset()
+
+	def reset(self, fault=None):
+		self.fault = fault
+		self.calls = 0    # calls since the reset
+		self.eligible = 0 # eligible calls since the reset
+		self.faulted = [] # indices of the faulted calls
+
+	def _inject(self, name, adrs, out, x):
+		self.calls += 1
+		fault = self.fault
+		if fault is None or (fault.predicate is not None and not fault.predicate(name, adrs)):
+			return out
+		self.eligible += 1
+		if fault.call is not None and fault.call != self.eligible-1:
+			return out
+		self.faulted += [self.calls-1]
+		return self.corrupt(fault, out, x)
+
+	def corrupt(self, fault, out, x):
+		"""Returns the output out of a call on the message input x, faulted."""
+		if fault.model == FaultModel.RANDOM:
+			return self.rng.randbytes(len(out))
+		if fault.model == FaultModel.BITFLIP:
+			flips = sum(1 << i for i in self.rng.sample(range(8*len(out)), fault.bits))
+			return int.to_bytes(int.from_bytes(out, byteorder="big") ^ flips, byteorder="big", length=len(out))
+		if fault.model == FaultModel.SKIP:
+			return x[:len(out)].ljust(len(out), b'\x00') # message input, unmasked
+		return fault.value if fault.value is not None else b'\x00'*len(out)
+
+	def T_l(self, xs, adrs, pk_seed):
+		return self._inject("T_l", adrs, super().T_l(xs, adrs, pk_seed), b''.join(xs))
+
+	def F(self, x, adrs, pk_seed):
+		return self._inject("F", adrs, super().F(x, adrs, pk_seed), x)
+
+	def H(self, left, right, adrs, pk_seed):
+		return self._inject("H", adrs, super().H(left, right, adrs, pk_seed), left + right)
+
+	def PRF(self, x, adrs):
+		return self._inject("PRF", adrs, super().PRF(x, adrs), x)
+
+	def PRF_msg(self, x, opt, sk_prf):
+		return self._inject("PRF_msg", None, super().PRF_msg(x, opt, sk_prf), x)
+
+	def H_msg(self, x, pk_root, pk_seed, R):
+		return self._inject("H_msg", None, super().H_msg(x, pk_root, pk_seed, R), x)
+
 # =============================================================================
 # ADDRESSING SCHEME
 # =============================================================================
@@ -213,6 +286,14 @@ class ADRS:
 			raise IndexError(f"{idx}")
 		self.bytes = self.bytes[:4*idx] + int.to_bytes(val, byteorder=self.ENDIAN, length=4*length) + self.bytes[4*(idx+length):]
 
+	def getWords(self, idx, length):
+		"""Gets the value in byte address at specified index (e.g., in a fault
+		predicate).
+		"""
+		if idx < 0 or 4*(idx+length) > self.SPX_ADDRESS_BYTES:
+			raise IndexError(f"{idx}")
+		return int.from_bytes(self.bytes[4*idx:4*(idx+length)], byteorder=self.ENDIAN)
+
 	def setLayerAddress(self, layeraddr):
 		self.setWords(layeraddr, self.SPX_LAYER_IDX, 1)
 
@@ -525,13 +606,25 @@ SPHINCSPLUS_INSTANCES = {
 	"256f": spx_inst(n=32, h=68, d=17, a=10, k=30, w=4)  # h' = 4
 }
 
+# Reduced ("toy") instances, signing in a fraction of a second, to simulate full attacks
+# (collect, identify, graft, forge) many times. Any other spx_inst may be passed
+# to SPHINCSplus as well, and evaluation/util/spx_inst.py has the matching
+# entries of the complexity models, to extrapolate to the instances above.
+TOY_INSTANCES = {
+	"toy-xs": spx_inst(n=4, h=8,  d=2, a=3, k=4, w=4), # h' = 4
+	"toy-s":  spx_inst(n=8, h=12, d=3, a=4, k=6, w=4), # h' = 4
+	"toy-f":  spx_inst(n=8, h=12, d=6, a=3, k=8, w=4)  # h' = 2
+}
+
 class SPHINCSplus:
 
-	def __init__(self, instance, randomize=True, robust=False):
-		spx = SPHINCSPLUS_INSTANCES[instance]
+	def __init__(self, instance, randomize=True, robust=False, hash=Hash):
+		spx = instance if isinstance(instance, spx_inst) else {**SPHINCSPLUS_INSTANCES, **TOY_INSTANCES}[instance]
+		if spx.h % spx.d:
+			raise ValueError(f"h = {spx.h} is not a multiple of d = {spx.d}")
 
 		m = (spx.k*spx.a+7)//8 + (spx.h-spx.h//spx.d+7)//8 + (spx.h//spx.d+7)//8
-		self.hash = Hash(spx.n, m, robust=robust)
+		self.hash = hash(spx.n, m, robust=robust)
 		self.fors = FORS(spx.a, spx.k, self.hash)
 		self.wots_plus = WOTSplus(spx.w, self.hash)
 		self.xmss = XMSS(spx.h//spx.d, self.wots_plus, self.hash)
@@ -629,6 +722,9 @@ class SPHINCSplus:
 
 		return (R, sig_fors, sig_ht)
 
+	def context(self, msg):
+		return SigningContext(self, msg)
+
 	def to_bytes(self, sig):
 		sig_bytes = b''
 
@@ -732,4 +828,95 @@ class SPHINCSplus:
 			for j in range(len(s_wots_plus)):
 				print(f"WOTS+{j:2}: {s_wots_plus[j].hex().zfill(self.hash.n*2)}")
 			for j in range(len(a_path_xmss)):
-				print(f"path {j:2}: {a_path_xmss[j].hex().zfill(self.hash.n*2)}")
\ No newline at end of file
+				print(f"path {j:2}: {a_path_xmss[j].hex().zfill(self.hash.n*2)}")
+
+# =============================================================================
+# INCREMENTAL SIGNING
+# =============================================================================
+
+class SigningContext:
+	"""Checkpoints a clean signature of msg (FORS signature, per-layer roots,
+	W-OTS+ signatures, leaves and authentication paths), so that each faulty
+	signature of msg only recomputes from the faulted layer upward: the tree of
+	the faulted layer from its cached leaves, and the W-OTS+ signatures of the
+	layers above (their trees do not depend on the signed roots). The faulty
+	signatures are those of SPHINCSplus.fault_sign, which requires
+	randomize=False for them to share R.
+	"""
+
+	def __init__(self, spx, msg):
+		if spx.randomize:
+			raise ValueError("Incremental signing requires randomize=False")
+		self.spx = spx
+		self.R = spx.hash.PRF_msg(msg, b'\x00'*spx.hash.n, spx.sk_prf)
+		(md, tree_idx, leaf_idx) = spx.digest(msg, self.R)
+
+		adrs = ADRS()
+		adrs.setLayerAddress(0)
+		adrs.setTreeAddress(tree_idx)
+		adrs.setKeyPairAddress(leaf_idx)
+
+		self.sig_fors = spx.fors.sign(md, spx.sk_seed, adrs, spx.pk_seed)
+		root = spx.fors.keyextract(md, self.sig_fors, adrs, spx.pk_seed)
+
+		# Per layer: signed root (i.e., roots[i+1] is the root of layer i),
+		# address, leaf index, leaves, and (W-OTS+ signature, authentication path)
+		self.roots = [root]
+		self.adrs = []
+		self.leaf_idx = []
+		self.leaves = []
+		self.sig_ht = []
+		for i in range(spx.d):
+			adrs.setLayerAddress(i)
+			adrs.setTreeAddress(tree_idx)
+			tree_adrs = ADRS(adrs)
+
+			leaves = []
+			for j in range(2**spx.xmss.h_prime):
+				tree_adrs.setKeyPairAddress(j)
+				(_, pk) = spx.wots_plus.keygen(spx.sk_seed, tree_adrs, spx.pk_seed)
+				leaves += [pk]
+			tree_adrs.setKeyPairAddress(leaf_idx)
+			sig = spx.wots_plus.sign(root, spx.sk_seed, tree_adrs, spx.pk_seed)
+			(root, auth_path) = self._tree(leaves, leaf_idx, adrs)
+
+			self.roots += [root]
+			self.adrs += [ADRS(adrs)]
+			self.leaf_idx += [leaf_idx]
+			self.leaves += [leaves]
+			self.sig_ht += [(sig, auth_path)]
+			leaf_idx = (tree_idx & (2**spx.xmss.h_prime-1))
+			tree_idx >>= spx.xmss.h_prime
+
+	def _tree(self, leaves, leaf_idx, adrs):
+		tree_adrs = ADRS(adrs)
+		tree_adrs.setType(ADRS.Type.XMSS)
+		tree_adrs.setKeyPairAddress(0)
+		return self.spx.hash.treehash(leaves, leaf_idx, tree_adrs, self.spx.pk_seed)
+
+	def _wots_sign(self, root, i):
+		wots_adrs = ADRS(self.adrs[i])
+		wots_adrs.setKeyPairAddress(self.leaf_idx[i])
+		return self.spx.wots_plus.sign(root, self.spx.sk_seed, wots_adrs, self.spx.pk_seed)
+
+	def sign(self):
+		return (self.R, self.sig_fors, list(self.sig_ht))
+
+	def resign(self, layer, root):
+		"""Returns the signature where the root of the given layer is root (the
+		layers below are those of the clean signature)."""
+		sig_ht = self.sig_ht[:layer+1]
+		for i in range(layer+1, self.spx.d):
+			sig_ht += [(self._wots_sign(root, i), self.sig_ht[i][1])]
+			root = self.roots[i+1]
+		return (self.R, self.sig_fors, sig_ht)
+
+	def fault_sign(self, layer=0, verifying=True):
+		leaf_idx = self.leaf_idx[layer]
+		leaves = list(self.leaves[layer])
+		leaves[leaf_idx ^ 1 if verifying else leaf_idx] = os.urandom(self.spx.hash.n) # random leaf faulted
+		(root, auth_path) = self._tree(leaves, leaf_idx, self.adrs[layer])
+
+		(R, sig_fors, sig_ht) = self.resign(layer, root)
+		sig_ht[layer] = (self.sig_ht[layer][0], auth_path)
+		return (R, sig_fors, sig_ht)
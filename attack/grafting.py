@@ -0,0 +1,326 @@
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from SPHINCSplus import ADRS
+
+# =============================================================================
+# TREE GRAFTING
+# =============================================================================
+#
+# A W-OTS+ key pair at (layer, tree_idx, leaf_idx) is compromised when several
+# of its signatures are known: for each chain i, any value from the lowest
+# known position b_min[i] upwards can be computed. A structure (the XMSS tree
+# at layer-1, or the FORS key pair if layer = 0) is grafted below it when its
+# root has all its base-W digits (and checksum digits) at least b_min.
+#
+# The candidate structures share the left half of their first tree, built from
+# the attacker's own keys, and differ by the right node at its top, which needs
+# not be opened. Hence a candidate costs one call to H (and T_k for FORS) on a
+# copy of the hash state, and its digits are then checked byte by byte with
+# precomputed tables, aborting at the first digit below b_min.
+
+# Compromised W-OTS+ key pair, with the lowest known position of each chain
+# (b_min) and its (digit, chain value)
+Grafting = namedtuple("Grafting", "layer tree_idx leaf_idx b_min known")
+# Found candidate
+Graft = namedtuple("Graft", "right root tried seconds")
+
+def wots_digits(wots_plus, msg):
+	"""Returns the base-W digits of msg followed by its checksum, as in
+	WOTSplus.sign."""
+	b = wots_plus.to_baseW(int.from_bytes(msg, byteorder="big"), wots_plus.len1)
+	csum = sum(map(lambda x: wots_plus.W - 1 - x, b))
+	return b + wots_plus.to_baseW(csum, wots_plus.len2)
+
+def compromised(spx, layer, tree_idx, leaf_idx, signatures):
+	"""Returns the grafting target of a compromised W-OTS+ key pair.
+
+	Args:
+		spx (SPHINCSplus): The SPHINCS+ instance (with the public key).
+		layer, tree_idx, leaf_idx (int): The address of the W-OTS+ key pair.
+		signatures (list): Its identified signatures, as (msg, W-OTS+ signature).
+	"""
+	known = []
+	for i in range(spx.wots_plus.len):
+		known += [min((wots_digits(spx.wots_plus, msg)[i], sig[i]) for (msg, sig) in signatures)]
+	return Grafting(layer, tree_idx, leaf_idx, [b for (b, _) in known], known)
+
+def _shake(*chunks):
+	return hashlib.shake_256(b''.join(chunks))
+
+def _xor(x, mask):
+	return int.to_bytes(int.from_bytes(x, "little") ^ int.from_bytes(mask, "little"), length=len(x), byteorder="little")
+
+def _tables(wots_plus, b_min):
+	"""Returns, for each byte of the root, the table of the bytes whose digits
+	are all at least b_min (None otherwise) or their checksum contribution, and
+	the table of the valid checksums."""
+	(w, W) = (wots_plus.w, wots_plus.W)
+	per_byte = 8//w
+	tables = []
+	for j in range(wots_plus.len1//per_byte):
+		bounds = b_min[j*per_byte:(j+1)*per_byte]
+		table = []
+		for x in range(256):
+			digits = [(x >> (8 - w*(k+1))) & (W-1) for k in range(per_byte)]
+			table += [sum(W-1-b for b in digits) if all(b >= m for (b, m) in zip(digits, bounds)) else None]
+		tables += [table]
+	csum_ok = [all(b >= m for (b, m) in zip(wots_plus.to_baseW(c, wots_plus.len2), b_min[wots_plus.len1:]))
+	           for c in range(wots_plus.len1*(W-1)+1)]
+	return (tables, csum_ok)
+
+# =============================================================================
+# SEARCH
+# =============================================================================
+
+class GraftingSearch:
+	"""Searches a structure to graft below a compromised W-OTS+ key pair.
+
+	Args:
+		spx (SPHINCSplus): The SPHINCS+ instance (with pk_seed).
+		target (Grafting): The compromised W-OTS+ key pair (see compromised).
+		sk_seed (bytes): The attacker's seed, for the left half of the first tree
+			(and the other FORS trees).
+	"""
+
+	def __init__(self, spx, target, sk_seed):
+		self.spx = spx
+		self.target = target
+		(n, pk_seed) = (spx.hash.n, spx.pk_seed)
+
+		# Address of the top node of the (first) tree of the grafted structure
+		top = ADRS()
+		if target.layer == 0:
+			top.setTreeAddress(target.tree_idx)
+			top.setKeyPairAddress(target.leaf_idx)
+			top.setType(ADRS.Type.FORSTREE)
+			height = spx.fors.a
+		else:
+			top.setLayerAddress(target.layer-1)
+			top.setTreeAddress((target.tree_idx << spx.xmss.h_prime) | target.leaf_idx)
+			top.setType(ADRS.Type.XMSS)
+			height = spx.xmss.h_prime
+		top.setTreeHeight(height)
+		top.setTreeIndex(0)
+		self.top = top
+
+		# Left half of the first tree, from the attacker's keys
+		self.left = self._subtree_root(sk_seed, height-1)
+		masks = _shake(pk_seed, top.bytes).digest(2*n) if spx.hash.robust else b'\x00'*2*n
+		self.mask_right = masks[n:]
+		self.prefix = pk_seed + top.bytes + _xor(self.left, masks[:n])
+
+		# FORS public key compression: T_k(root_0 || other roots)
+		(self.pk_prefix, self.pk_suffix, self.pk_mask) = (None, None, None)
+		if target.layer == 0:
+			pk_adrs = ADRS()
+			pk_adrs.setTreeAddress(target.tree_idx)
+			pk_adrs.setKeyPairAddress(target.leaf_idx)
+			pk_adrs.setType(ADRS.Type.FORSPK)
+			others = b''.join(self._fors_root(sk_seed, i) for i in range(1, spx.fors.k))
+			mask = _shake(pk_seed, pk_adrs.bytes).digest(spx.fors.k*n) if spx.hash.robust else b'\x00'*spx.fors.k*n
+			(self.pk_prefix, self.pk_suffix, self.pk_mask) = (pk_seed + pk_adrs.bytes, _xor(others, mask[n:]), mask[:n])
+
+		(self.tables, self.csum_ok) = _tables(spx.wots_plus, target.b_min)
+
+	def _subtree_root(self, sk_seed, height):
+		"""Returns the root of the left subtree (of the given height) of the first
+		tree of the grafted structure, from the attacker's keys."""
+		spx = self.spx
+		adrs = ADRS(self.top)
+		leaves = []
+		if self.target.layer == 0:
+			adrs.setTreeHeight(0)
+			for j in range(2**height):
+				adrs.setTreeIndex(j)
+				leaves += [spx.hash.F(spx.hash.PRF(sk_seed, adrs), adrs, spx.pk_seed)]
+		else:
+			wots_adrs = ADRS()
+			wots_adrs.setLayerAddress(self.target.layer-1)
+			wots_adrs.setTreeAddress((self.target.tree_idx << spx.xmss.h_prime) | self.target.leaf_idx)
+			for j in range(2**height):
+				wots_adrs.setKeyPairAddress(j)
+				leaves += [spx.wots_plus.keygen(sk_seed, wots_adrs, spx.pk_seed)[1]]
+		if height == 0:
+			return leaves[0]
+		return spx.hash.treehash(leaves, -1, adrs, spx.pk_seed)[0]
+
+	def _fors_root(self, sk_seed, i):
+		"""Returns the root of the i-th FORS tree, from the attacker's keys."""
+		spx = self.spx
+		adrs = ADRS(self.top)
+		adrs.setTreeHeight(0)
+		leaves = []
+		for j in range(spx.fors.t):
+			adrs.setTreeIndex(i*spx.fors.t + j)
+			leaves += [spx.hash.F(spx.hash.PRF(sk_seed, adrs), adrs, spx.pk_seed)]
+		return spx.hash.treehash(leaves, -1, adrs, spx.pk_seed, tree_idx_offset=(i*spx.fors.t >> 1))[0]
+
+	def right(self, prefix, counter):
+		"""Returns the (masked) right node of candidate counter."""
+		return prefix + int.to_bytes(counter, length=self.spx.hash.n-len(prefix), byteorder="big")
+
+	def root(self, right):
+		"""Returns the root of the grafted structure of a (masked) right node."""
+		n = self.spx.hash.n
+		node = _shake(self.prefix, right).digest(n)
+		if self.pk_prefix is not None:
+			node = _shake(self.pk_prefix, _xor(node, self.pk_mask), self.pk_suffix).digest(n)
+		return node
+
+	def check(self, root):
+		"""Returns whether all the digits of root (and its checksum) are covered,
+		aborting at the first byte with a digit below b_min."""
+		csum = 0
+		for (x, table) in zip(root, self.tables):
+			part = table[x]
+			if part is None:
+				return False
+			csum += part
+		return self.csum_ok[csum]
+
+	def scan(self, prefix, start, stop):
+		"""Returns the first candidate counter in [start, stop) that can be
+		grafted (None if there is none)."""
+		n = self.spx.hash.n
+		state = _shake(self.prefix)
+		(pk_state, pk_mask, pk_suffix) = (None, self.pk_mask, self.pk_suffix)
+		if self.pk_prefix is not None:
+			pk_state = _shake(self.pk_prefix)
+		length = n - len(prefix)
+		for counter in range(start, stop):
+			h = state.copy()
+			h.update(prefix + counter.to_bytes(length, "big"))
+			node = h.digest(n)
+			if pk_state is not None:
+				h = pk_state.copy()
+				h.update(_xor(node, pk_mask) + pk_suffix)
+				node = h.digest(n)
+			if self.check(node):
+				return counter
+		return None
+
+	def forge(self, root):
+		"""Returns the W-OTS+ signature of root under the compromised key pair,
+		chaining each known value up to the digit of root."""
+		spx = self.spx
+		adrs = ADRS()
+		adrs.setLayerAddress(self.target.layer)
+		adrs.setTreeAddress(self.target.tree_idx)
+		adrs.setType(ADRS.Type.WOTSCHAIN)
+		adrs.setKeyPairAddress(self.target.leaf_idx)
+		sig = []
+		for (i, (digit, (b, value))) in enumerate(zip(wots_digits(spx.wots_plus, root), self.target.known)):
+			adrs.setChainAddress(i)
+			sig += [spx.hash.C(value, b, digit-b, adrs, spx.pk_seed)]
+		return sig
+
+# Search of the current process pool (set by _init)
+_SEARCH = None
+
+def _init(search):
+	global _SEARCH
+	_SEARCH = search
+
+def _scan(args):
+	(prefix, start, stop) = args
+	return _SEARCH.scan(prefix, start, stop)
+
+def search(grafting, checkpoint=None, chunk=2**16, processes=None, max_candidates=None, report=print):
+	"""Runs the grafting search across all cores, and returns the first graft
+	found (None if max_candidates, or all the candidates of the counter space,
+	are tried without success).
+
+	The candidates are scanned in order, by waves of chunks, so that the
+	checkpoint (if any) records the next candidate after each wave, and the
+	search resumes from it.
+
+	Args:
+		grafting (GraftingSearch): The search.
+		checkpoint (str): Path of the checkpoint file (None for no checkpoint).
+		chunk (int): The number of candidates per task.
+		processes (int): The number of processes (os.cpu_count() if None).
+		max_candidates (int): The maximum number of candidates (None to try the
+			whole counter space).
+		report (function): Called with a progress line after each wave (None to
+			be silent).
+	"""
+	t = grafting.target
+	ident = {"layer": t.layer, "tree_idx": t.tree_idx, "leaf_idx": t.leaf_idx, "b_min": t.b_min,
+	         "left": grafting.left.hex(), "pk_seed": grafting.spx.pk_seed.hex()}
+	# Random prefix of the right nodes, leaving at least 8 bytes to the counter
+	n = grafting.spx.hash.n
+	state = {"target": ident, "prefix": os.urandom(max(0, min(8, n-8))).hex(), "next": 0, "seconds": 0.0, "found": None}
+	if checkpoint is not None and os.path.exists(checkpoint):
+		with open(checkpoint) as f:
+			saved = json.load(f)
+		if saved["target"] == ident:
+			state = saved
+
+	def save():
+		if checkpoint is not None:
+			with open(f"{checkpoint}.tmp", 'w') as f:
+				json.dump(state, f)
+			os.replace(f"{checkpoint}.tmp", checkpoint)
+
+	prefix = bytes.fromhex(state["prefix"])
+	# The candidates are bounded by the counter space (e.g., 2^32 if n = 4)
+	space = 256**(n-len(prefix))
+	max_candidates = space if max_candidates is None else min(max_candidates, space)
+	processes = processes or os.cpu_count()
+	with ProcessPoolExecutor(max_workers=processes, initializer=_init, initargs=(grafting,)) as pool:
+		while state["found"] is None and (max_candidates is None or state["next"] < max_candidates):
+			(first, start) = (state["next"], time.perf_counter())
+			last = first + 4*processes*chunk if max_candidates is None else min(first + 4*processes*chunk, max_candidates)
+			tasks = [(prefix, s, min(s+chunk, last)) for s in range(first, last, chunk)]
+			for ((_, _, stop), found) in zip(tasks, pool.map(_scan, tasks)):
+				if found is not None:
+					(state["found"], state["next"]) = (found, found+1)
+					break
+				state["next"] = stop
+			elapsed = time.perf_counter() - start
+			state["seconds"] += elapsed
+			save()
+			if report is not None:
+				report(f"{state['next']} candidates ({state['seconds']:.1f} s, {(state['next']-first)/elapsed:.0f} candidates/s)")
+
+	if state["found"] is None:
+		return None
+	right = grafting.right(prefix, state["found"])
+	return Graft(_xor(right, grafting.mask_right), grafting.root(right), state["next"], state["seconds"])
+
+# =============================================================================
+# DEMO
+# =============================================================================
+
+# Compromised W-OTS+ key pair, simulated with a fresh key
+INSTANCE = "128f"
+LAYER = 1
+TREE_IDX = 0
+LEAF_IDX = 0
+SIGNATURES = 3
+CHECKPOINT = "grafting.json"
+
+if __name__ == '__main__':
+	from SPHINCSplus import SPHINCSplus
+
+	spx = SPHINCSplus(INSTANCE)
+	spx.keygen(pk_root=os.urandom(spx.PKROOT_LENGTH)) # the root is not needed
+	adrs = ADRS()
+	adrs.setLayerAddress(LAYER)
+	adrs.setTreeAddress(TREE_IDX)
+	adrs.setKeyPairAddress(LEAF_IDX)
+	signatures = [(msg, spx.wots_plus.sign(msg, spx.sk_seed, adrs, spx.pk_seed)) for msg in [os.urandom(spx.hash.n) for _ in range(SIGNATURES)]]
+
+	target = compromised(spx, LAYER, TREE_IDX, LEAF_IDX, signatures)
+	grafting = GraftingSearch(spx, target, os.urandom(spx.SKSEED_LENGTH))
+	graft = search(grafting, checkpoint=CHECKPOINT)
+	pk = spx.wots_plus.keyextract(*signatures[0], adrs, spx.pk_seed)
+	print(f"Grafted root {graft.root.hex()} after {graft.tried} candidates ({graft.tried/graft.seconds:.0f} candidates/s)")
+	print(f"Forged W-OTS+ signature valid: {spx.wots_plus.keyextract(graft.root, grafting.forge(graft.root), adrs, spx.pk_seed) == pk}")
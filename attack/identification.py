@@ -0,0 +1,131 @@
+import hashlib
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from SPHINCSplus import ADRS
+
+# =============================================================================
+# W-OTS+ IDENTIFICATION WITHOUT PUBLIC KEY
+# =============================================================================
+#
+# Given several signatures of a same W-OTS+ key pair (e.g., faulty ones), the
+# position of each chain value is unknown, and so is the public key. As F is
+# tweaked by the position, each distinct value v of a chain is walked forward
+# from every hypothetical position p to the end of the chain (W(W-1)/2 calls
+# to F, half a call below the (W(W-1)+1)/2 per chain of
+# cmplx_uf.sig_identification_nvonly_hashes). A walk that reaches
+# another value v' of the chain identifies both positions (up to a collision
+# of F). The walked nodes are recorded, so that the walks sharing a suffix
+# (i.e., reaching a node already walked, or starting from one) stop there, and
+# the other hypotheses of an identified value are skipped. Without this
+# deduplication, the cost is exactly W(W-1)/2 calls per distinct value.
+#
+# The chains are independent, hence identified in parallel.
+
+# Identification of a chain: position of each signature value (None if
+# unidentified), the lowest identified (position, value), and the calls to F
+Chain = namedtuple("Chain", "positions lowest hashes")
+
+def _chain_adrs(layer, tree_idx, leaf_idx):
+	adrs = ADRS()
+	adrs.setLayerAddress(layer)
+	adrs.setTreeAddress(tree_idx)
+	adrs.setType(ADRS.Type.WOTSCHAIN)
+	adrs.setKeyPairAddress(leaf_idx)
+	return adrs.bytes[:24]
+
+def identify_chain(args):
+	"""Returns the identification (Chain) of the values of a chain.
+
+	Args:
+		args: (chain index, values (one per signature), address prefix (see
+			_chain_adrs), pk_seed, W, robust, dedup)
+	"""
+	(i, values, prefix, pk_seed, W, robust, dedup) = args
+	n = len(pk_seed)
+	prefix += i.to_bytes(4, "big")
+
+	def F(x, q):
+		adrs = prefix + q.to_bytes(4, "big")
+		if robust:
+			mask = hashlib.shake_256(pk_seed + adrs).digest(n)
+			x = bytes(a ^ b for (a, b) in zip(x, mask))
+		return hashlib.shake_256(pk_seed + adrs + x).digest(n)
+
+	distinct = list(dict.fromkeys(values))
+	where = {}
+	walked = {} # (position, value) -> (walked value, hypothesis)
+	hashes = 0
+	for v in distinct:
+		for p in range(W):
+			if dedup and ((p, v) in walked or where.get(v, p) != p):
+				continue # suffix already walked, or v identified at another position
+			(x, q) = (v, p)
+			walked[(q, x)] = (v, p)
+			while q < W-1:
+				x = F(x, q)
+				(hashes, q) = (hashes + 1, q + 1)
+				if x != v and x in distinct:
+					(where[x], where[v]) = (q, p)
+				if dedup and (q, x) in walked:
+					break # shared suffix
+				walked[(q, x)] = (v, p)
+
+	lowest = min(((where[v], v) for v in distinct if v in where), default=None)
+	return Chain([where.get(v) for v in values], lowest, hashes)
+
+def identify(spx, layer, tree_idx, leaf_idx, signatures, dedup=True, processes=1):
+	"""Returns the identification (Chain) of each chain of signatures of a same
+	W-OTS+ key pair.
+
+	Args:
+		spx (SPHINCSplus): The SPHINCS+ instance (with pk_seed).
+		layer, tree_idx, leaf_idx (int): The address of the W-OTS+ key pair.
+		signatures (list): The W-OTS+ signatures (lists of chain values).
+		dedup (bool): Whether to skip the shared suffixes and the hypotheses of
+			the identified values.
+		processes (int): The number of processes (1 to run in this process,
+			None for os.cpu_count()).
+	"""
+	prefix = _chain_adrs(layer, tree_idx, leaf_idx)
+	W = spx.wots_plus.W
+	tasks = [(i, [sig[i] for sig in signatures], prefix, spx.pk_seed, W, spx.hash.robust, dedup) for i in range(spx.wots_plus.len)]
+	if processes == 1:
+		return list(map(identify_chain, tasks))
+	with ProcessPoolExecutor(max_workers=processes) as pool:
+		return list(pool.map(identify_chain, tasks))
+
+def messages(chains):
+	"""Returns the identified digits of each signature (None where unidentified)."""
+	return [list(digits) for digits in zip(*(chain.positions for chain in chains))]
+
+# =============================================================================
+# DEMO
+# =============================================================================
+
+INSTANCE = "256s"
+SIGNATURES = [2, 3, 4]
+
+if __name__ == '__main__':
+	from SPHINCSplus import SPHINCSplus
+
+	spx = SPHINCSplus(INSTANCE, robust=True)
+	spx.keygen(pk_root=os.urandom(spx.PKROOT_LENGTH)) # the root is not needed
+	adrs = ADRS()
+	adrs.setLayerAddress(1)
+	(ell, len1, W) = (spx.wots_plus.len, spx.wots_plus.len1, spx.wots_plus.W)
+	print(f"SPHINCS+-{INSTANCE}: W(W-1)/2 = {W*(W-1)//2} calls to F per chain and distinct value without dedup "
+	      f"((W(W-1)+1)/2 = {(W*(W-1)+1)/2} in cmplx_uf)")
+	for M in SIGNATURES:
+		signatures = [spx.wots_plus.sign(os.urandom(spx.hash.n), spx.sk_seed, adrs, spx.pk_seed) for _ in range(M)]
+		distinct = sum(len(set(sig[i] for sig in signatures)) for i in range(ell))
+		for dedup in [False, True]:
+			chains = identify(spx, 1, 0, 0, signatures, dedup, processes=None)
+			hashes = sum(chain.hashes for chain in chains)
+			# The checksum chains are correlated, only the message chains are counted
+			unidentified = sum(chain.lowest is None for chain in chains[:len1])
+			print(f"\tM = {M}, {'with' if dedup else 'without'} dedup: {hashes/distinct:.2f} calls to F per chain and distinct value, "
+			      f"{unidentified}/{len1} unidentified message chains (expected {len1/W**(M-1):.2f})")
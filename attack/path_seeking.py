@@ -0,0 +1,196 @@
+import hashlib
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from SPHINCSplus import spx_inst
+
+# =============================================================================
+# PATH SEEKING
+# =============================================================================
+#
+# A forgery through a compromised W-OTS+ key pair at (layer, tree_idx,
+# leaf_idx) needs a digest H_msg(R, pk_seed, pk_root, msg) whose path in the
+# hypertree passes by it, i.e., whose tree index at that layer is tree_idx and
+# whose leaf index in that tree is leaf_idx. This takes 2^(h-hp*layer)
+# evaluations of H_msg on average (see cmplx_uf.path_seeking_hashes).
+#
+# The candidates are enumerated by counter. With a free message, R is fixed
+# and the counter is the message, hence the state after R || pk_seed ||
+# pk_root is absorbed once and copied for each candidate. With a chosen
+# message, the counter is R (which comes first in H_msg), hence each candidate
+# absorbs R followed by the constant pk_seed || pk_root || msg. The digests of
+# a batch are decoded at once, as in SPHINCSplus.digest.
+
+# Target key pair
+PathTarget = namedtuple("PathTarget", "layer tree_idx leaf_idx")
+# Found candidate
+Hit = namedtuple("Hit", "R msg tree_idx leaf_idx tried seconds")
+
+def expected_hashes(params, layer):
+	"""Returns 2^(h-hp*layer), the expected number of H_msg evaluations."""
+	return 2**(params.h - (params.h//params.d)*layer)
+
+class PathSeeking:
+	"""Searches R and msg whose digest passes by a target key pair.
+
+	Args:
+		params (spx_inst): The SPHINCS+ parameters (possibly of reduced height).
+		pk_seed, pk_root (bytes): The public key.
+		target (PathTarget): The target key pair.
+		msg (bytes): The message to sign (None if free).
+	"""
+
+	def __init__(self, params, pk_seed, pk_root, target, msg=None):
+		self.params = params
+		self.hp = params.h//params.d
+		if not 0 <= target.layer < params.d:
+			raise ValueError(f"Layer {target.layer} out of range (d = {params.d})")
+		if not 0 <= target.tree_idx < 2**(params.h - self.hp*(target.layer+1)):
+			raise ValueError(f"Tree {target.tree_idx} out of range at layer {target.layer} ({2**(params.h - self.hp*(target.layer+1))} trees)")
+		if not 0 <= target.leaf_idx < 2**self.hp:
+			raise ValueError(f"Leaf {target.leaf_idx} out of range ({2**self.hp} leaves per tree)")
+		self.target = target
+		(self.pk_seed, self.pk_root, self.msg) = (pk_seed, pk_root, msg)
+
+		# Digest: md || tree_idx || leaf_idx (see SPHINCSplus.digest)
+		self.md_len = (params.k*params.a+7)//8
+		self.tree_len = (params.h-self.hp+7)//8
+		self.leaf_len = (self.hp+7)//8
+		self.m = self.md_len + self.tree_len + self.leaf_len
+
+		# The target constrains the h-hp*layer most significant bits of the
+		# path, i.e., tree_idx >> hp*(layer-1) (and leaf_idx if layer = 0)
+		if target.layer == 0:
+			self.shift = 0
+			self.path = target.tree_idx
+		else:
+			self.shift = self.hp*(target.layer-1)
+			self.path = (target.tree_idx << self.hp) | target.leaf_idx
+
+	def candidate(self, prefix, counter):
+		"""Returns (R, msg) of candidate counter."""
+		if self.msg is None:
+			return (prefix + b'\x00'*(self.params.n-len(prefix)), counter.to_bytes(8, "big"))
+		return (prefix + counter.to_bytes(self.params.n-len(prefix), "big"), self.msg)
+
+	def digest(self, R, msg):
+		"""Returns (md, tree_idx, leaf_idx), as SPHINCSplus.digest."""
+		D = hashlib.shake_256(R + self.pk_seed + self.pk_root + msg).digest(self.m)
+		(tree_idx, leaf_idx) = self.decode(np.frombuffer(D, dtype=np.uint8)[None,:])
+		return (D[:self.md_len], int(tree_idx[0]), int(leaf_idx[0]))
+
+	def _index(self, D, offset, length, bits):
+		"""Returns the big-endian integers of D[:, offset:offset+length] (at most
+		8 bytes), truncated to bits."""
+		padded = np.zeros((len(D), 8), dtype=np.uint8)
+		padded[:, 8-length:] = D[:, offset:offset+length]
+		return padded.view(">u8")[:,0].astype(np.uint64) & np.uint64((1 << bits) - 1)
+
+	def decode(self, D):
+		"""Returns the tree and leaf indices of the digests D (one per row)."""
+		tree_idx = self._index(D, self.md_len, self.tree_len, self.params.h-self.hp)
+		leaf_idx = self._index(D, self.md_len+self.tree_len, self.leaf_len, self.hp)
+		return (tree_idx, leaf_idx)
+
+	def hits(self, tree_idx, leaf_idx):
+		"""Returns the mask of the digests that pass by the target."""
+		hit = (tree_idx >> np.uint64(self.shift)) == np.uint64(self.path)
+		if self.target.layer == 0:
+			hit &= leaf_idx == np.uint64(self.target.leaf_idx)
+		return hit
+
+	def scan(self, prefix, start, stop, batch=2**14):
+		"""Returns the first candidate counter in [start, stop) that passes by the
+		target (None if there is none)."""
+		(n, m) = (self.params.n, self.m)
+		if self.msg is None:
+			state = hashlib.shake_256(self.candidate(prefix, 0)[0] + self.pk_seed + self.pk_root)
+		else:
+			suffix = self.pk_seed + self.pk_root + self.msg
+			length = n - len(prefix)
+		for first in range(start, stop, batch):
+			D = bytearray()
+			for counter in range(first, min(first+batch, stop)):
+				if self.msg is None:
+					h = state.copy()
+					h.update(counter.to_bytes(8, "big"))
+				else:
+					h = hashlib.shake_256(prefix + counter.to_bytes(length, "big") + suffix)
+				D += h.digest(m)
+			hit = np.flatnonzero(self.hits(*self.decode(np.frombuffer(bytes(D), dtype=np.uint8).reshape(-1, m))))
+			if len(hit):
+				return first + int(hit[0])
+		return None
+
+# Search of the current process pool (set by _init)
+_SEEKING = None
+
+def _init(seeking):
+	global _SEEKING
+	_SEEKING = seeking
+
+def _scan(args):
+	return _SEEKING.scan(*args)
+
+def search(seeking, chunk=2**18, processes=None, max_candidates=None, report=print):
+	"""Shards the candidates across processes, by waves of chunks, and returns
+	the first hit (None if max_candidates, or all the candidates of the
+	counter space, are tried without success).
+
+	Args:
+		seeking (PathSeeking): The search.
+		chunk (int): The number of candidates per task.
+		processes (int): The number of processes (os.cpu_count() if None).
+		max_candidates (int): The maximum number of candidates (None to try the
+			whole counter space).
+		report (function): Called with a progress line after each wave (None to
+			be silent).
+	"""
+	# Random prefix of R, leaving at least 8 bytes to the counter (in R if the
+	# message is fixed, in the message otherwise)
+	n = seeking.params.n
+	prefix = os.urandom(max(0, min(8, n-8)))
+	space = 256**(8 if seeking.msg is None else n-len(prefix))
+	max_candidates = space if max_candidates is None else min(max_candidates, space)
+	processes = processes or os.cpu_count()
+	expected = expected_hashes(seeking.params, seeking.target.layer)
+	(tried, seconds, found) = (0, 0.0, None)
+	with ProcessPoolExecutor(max_workers=processes, initializer=_init, initargs=(seeking,)) as pool:
+		while found is None and (max_candidates is None or tried < max_candidates):
+			start = time.perf_counter()
+			last = tried + processes*chunk if max_candidates is None else min(tried + processes*chunk, max_candidates)
+			tasks = [(prefix, s, min(s+chunk, last)) for s in range(tried, last, chunk)]
+			for ((_, _, stop), counter) in zip(tasks, pool.map(_scan, tasks)):
+				if counter is not None:
+					(found, tried) = (counter, counter+1)
+					break
+				tried = stop
+			seconds += time.perf_counter() - start
+			if report is not None:
+				rate = tried/seconds
+				report(f"{tried} candidates ({seconds:.1f} s, {rate:.0f} H_msg/s), expected 2^{expected.bit_length()-1} ({expected/rate:.1f} s)")
+
+	if found is None:
+		return None
+	(R, msg) = seeking.candidate(prefix, found)
+	(_, tree_idx, leaf_idx) = seeking.digest(R, msg)
+	return Hit(R, msg, tree_idx, leaf_idx, tried, seconds)
+
+# =============================================================================
+# DEMO
+# =============================================================================
+
+# Reduced-height parameters (h = 20, h' = 5), and the compromised key pair
+PARAMS = spx_inst(n=16, h=20, d=4, a=6, k=8, w=4)
+TARGET = PathTarget(layer=1, tree_idx=0x123, leaf_idx=7)
+
+if __name__ == '__main__':
+	seeking = PathSeeking(PARAMS, os.urandom(PARAMS.n), os.urandom(PARAMS.n), TARGET)
+	hit = search(seeking)
+	print(f"R = {hit.R.hex()}, msg = {hit.msg.hex()}: tree_idx = {hit.tree_idx:#x}, leaf_idx = {hit.leaf_idx} "
+	      f"after {hit.tried} H_msg (expected {expected_hashes(PARAMS, TARGET.layer)})")
@@ -1,13 +1,23 @@
 #!/bin/python
 
+import os
 from math import log2, ceil
 from util.spx_inst import SPHINCSPLUS_INSTANCES
 from util.cmplx_spx import *
 from util.combi import recomp_exp
+from util.sweep import Memo, cell, run, write_table
 
 SIGNIFICANT_RATIO = 2/3
 
+# On-disk memo of the cells, and folder of the CSV/JSON tables
+MEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sweep")
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+RECOMP_LOG_N = [3, 4, 6, 8, 9, 12, 16]
+RECOMP_RATIOS = [1/2, 2/3, 3/4]
+
 if __name__ == '__main__':
+	(expl_rows, memory_rows) = ([], [])
 	for inst in SPHINCSPLUS_INSTANCES:
 		spx = SPHINCSPLUS_INSTANCES[inst]
 		print(f"SPHINCS+-{inst}")
@@ -39,22 +49,31 @@ if __name__ == '__main__':
 				C = min(N, b)
 				if l != spx.d-1:
 					s_total_expl_h += x_total_h*(1-C/N)
+			expl_rows += [{"instance": inst, "log_b": log_b, "b": b, "exploitable_hashes": s_total_expl_h, "total_hashes": s_total_h}]
 			print(f"\tb = ({SIGNIFICANT_RATIO:.2f})2^{log_b}: {s_total_expl_h/s_total_h:.4f} ({s_total_expl_h:.2f}/{s_total_h:.2f})")
 		print(f"Memory complexity of caching b branches")
 		for log_b in [spx.hp, 2*spx.hp, 3*spx.hp, 4*spx.hp, spx.h]:
 			b = ceil(SIGNIFICANT_RATIO*(2**log_b))
 			C = sum([min(2**(spx.h-spx.hp*l), b) for l in range(spx.d)])
 			total_bytes = C*(spx.n+1)*spx.ell
+			memory_rows += [{"instance": inst, "log_b": log_b, "b": b, "bytes": total_bytes}]
 			print(f"\tb = ({SIGNIFICANT_RATIO:.2f})2^{log_b}: {total_bytes:.2E} bytes")
 		print(f"")
 
 	print(f"")
 	print(f"E[queries to recomp.]")
-	for log_N in [3, 4, 6, 8, 9]:
+	# One row per (N, C), where C = N-1 (ratio None) closes each N
+	rows = [{"N": 2**log_N, "ratio": ratio, "C": ceil(ratio*(2**log_N)) if ratio else 2**log_N-1}
+	        for log_N in RECOMP_LOG_N for ratio in RECOMP_RATIOS + [None]]
+	for (r, queries_avg) in zip(rows, run([cell(recomp_exp, r["N"], r["C"]) for r in rows], Memo(MEMO_DIR))):
+		r["queries_avg"] = queries_avg
+	for log_N in RECOMP_LOG_N:
 		print(f"N = {2**log_N}")
-		for ratio in [1/2, 2/3, 3/4]:
-			C = ceil(ratio*(2**log_N))
-			queries_avg = recomp_exp(2**log_N, C)
-			print(f"\t\t({ratio:.2f}){2**log_N}:  = {queries_avg:.2f} (2^{log2(queries_avg):.2f})")
-		queries_avg = recomp_exp(2**log_N, 2**log_N-1)
-		print(f"\t\t{2**log_N}-1: {queries_avg:.2f} (2^{log2(queries_avg):.2f})")
\ No newline at end of file
+		for r in [r for r in rows if r["N"] == 2**log_N]:
+			if r["ratio"]:
+				print(f"\t\t({r['ratio']:.2f}){r['N']}:  = {r['queries_avg']:.2f} (2^{log2(r['queries_avg']):.2f})")
+			else:
+				print(f"\t\t{r['N']}-1: {r['queries_avg']:.2f} (2^{log2(r['queries_avg']):.2f})")
+	write_table(os.path.join(OUTPUT_DIR, "caching_branches_expl"), expl_rows)
+	write_table(os.path.join(OUTPUT_DIR, "caching_branches_memory"), memory_rows)
+	write_table(os.path.join(OUTPUT_DIR, "caching_branches_recomp"), rows)
\ No newline at end of file
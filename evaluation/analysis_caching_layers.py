@@ -1,10 +1,16 @@
 #!/bin/python
 
+import os
 from math import log2
 from util.spx_inst import SPHINCSPLUS_INSTANCES
 from util.cmplx_spx import *
+from util.sweep import write_table
+
+# Folder of the CSV/JSON tables
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
 
 if __name__ == '__main__':
+	(expl_rows, memory_rows) = ([], [])
 	for inst in SPHINCSPLUS_INSTANCES:
 		spx = SPHINCSPLUS_INSTANCES[inst]
 
@@ -20,10 +26,15 @@ if __name__ == '__main__':
 			if c < spx.d:
 				s_total_expl_h += f_total_h
 			s_total_h = f_total_h + (spx.d-c)*x_total_h + c*(2**(spx.hp-1)*(spx.ell*(spx.W-1)+2) + (2**spx.hp) - 1)
+			expl_rows += [{"instance": inst, "c": c, "exploitable_hashes": s_total_expl_h, "total_hashes": s_total_h}]
 			print(f"\tc = {c}: {s_total_expl_h/s_total_h:.4f} ({s_total_expl_h}/{s_total_h})")
 		print(f"Memory complexity of caching c layers")
 		for c in [1,2,3,4, spx.d]:
 			C = (2**spx.hp)*(2**(c*spx.hp)-1)//(2**spx.hp-1)
 			total_bytes = C*spx.n*spx.ell
+			memory_rows += [{"instance": inst, "c": c, "bytes": total_bytes}]
 			print(f"\tc = {c}: {total_bytes:.2E} bytes")
-		print(f"")
\ No newline at end of file
+		print(f"")
+
+	write_table(os.path.join(OUTPUT_DIR, "caching_layers_expl"), expl_rows)
+	write_table(os.path.join(OUTPUT_DIR, "caching_layers_memory"), memory_rows)
@@ -1,10 +1,16 @@
 #!/bin/python
 
+import os
 from math import log2
 from util.spx_inst import SPHINCSPLUS_INSTANCES
 from util.cmplx_spx import *
+from util.sweep import write_table
+
+# Folder of the CSV/JSON tables
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
 
 if __name__ == '__main__':
+	rows = []
 	for inst in SPHINCSPLUS_INSTANCES:
 		spx = SPHINCSPLUS_INSTANCES[inst]
 
@@ -26,6 +32,11 @@ if __name__ == '__main__':
 		s_total_nonverif_h = spx_total_nonverifiable_hashes(spx.log_t, spx.d, spx.k, spx.ell, spx.W, spx.hp)
 		s_total_h = spx_total_hashes(spx.log_t, spx.d, spx.k, spx.ell, spx.W, spx.hp)
 		assert s_total_verif_h + s_total_nonverif_h == s_total_h, f"SPHINCS+ computations inconsistent ({s_total_verif_h} + {s_total_nonverif_h} != {total})"
+		rows += [{"instance": inst,
+		          "fors_verifiable": f_verif_h, "fors_nonverifiable": f_nonverif_h, "fors_total": f_total_h,
+		          "xmss_verifiable": x_verif_h, "xmss_nonverifiable": x_nonverif_h, "xmss_total": x_total_h,
+		          "spx_exploitable": s_total_expl_h, "spx_verifiable": s_total_verif_h,
+		          "spx_nonverifiable": s_total_nonverif_h, "spx_total": s_total_h}]
 
 		print(f"SPHINCS+-{inst}")
 		print(f"")
@@ -41,4 +52,6 @@ if __name__ == '__main__':
 		print(f"\tPr(l*=0) = {f_total_h/s_total_h:.4f} ({f_total_h}/{s_total_h})")
 		for l in[1, spx.d-1, spx.d]:
 			print(f"\tPr(l*={l}) = {x_total_h/s_total_h:.4f} ({x_total_h}/{s_total_h})")
-		print(f"")
\ No newline at end of file
+		print(f"")
+
+	write_table(os.path.join(OUTPUT_DIR, "fault_counts"), rows)
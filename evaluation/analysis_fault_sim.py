@@ -0,0 +1,31 @@
+#!/bin/python
+
+import os
+from util.spx_inst import TOY_INSTANCES
+from util.cmplx_spx import *
+from util.montecarlo import agrees
+from util.fault_sim import FaultModel, simulate
+
+# Faulty signatures per instance and fault model (each takes a full signature)
+TRIALS = 2**10
+PROCESSES = os.cpu_count()
+
+def report(label, value, e):
+	flag = "ok" if agrees(value, e) else "!!"
+	print(f"\t\t{label}: {value:.4f} | {e.mean:.4f} [{e.lo:.4f}, {e.hi:.4f}] ({e.trials} trials) {flag}")
+
+if __name__ == '__main__':
+	print(f"analysis_fault.py | empirical [95% confidence interval]")
+	for inst in TOY_INSTANCES:
+		spx = TOY_INSTANCES[inst]
+		s_total_h = spx_total_hashes(spx.log_t, spx.d, spx.k, spx.ell, spx.W, spx.hp)
+		s_total_expl_h = spx_total_exploitable_hashes(spx.log_t, spx.d, spx.k, spx.ell, spx.W, spx.hp)
+		s_total_verif_h = spx_total_verifiable_hashes(spx.log_t, spx.d, spx.k, spx.ell, spx.W, spx.hp)
+
+		print(f"SPHINCS+-{inst}")
+		for model in FaultModel:
+			stats = simulate(inst, model, trials=TRIALS, processes=PROCESSES)
+			print(f"\t{model.name} ({stats.calls} hash calls, {s_total_h} in analysis_fault.py)")
+			report(f"Pr(Faulty signature is exploitable)", s_total_expl_h/s_total_h, stats.exploitable)
+			report(f"Pr(Faulty signature is verifiable)", s_total_verif_h/s_total_h, stats.verifiable)
+		print(f"")
@@ -0,0 +1,57 @@
+#!/bin/python
+
+import os
+from util.spx_inst import TOY_INSTANCES
+from util.cmplx_spx import *
+from util.fault_space import FORS, Outcome, enumerate_faults
+
+PROCESSES = os.cpu_count()
+
+def report(label, value, count):
+	flag = "ok" if count == value else "!!"
+	print(f"\t\t{label}: {value} | {count} | {count-value:+d} {flag}")
+
+def report_shift(label, shifts, diffs):
+	"""Reports the shifts of the counts due to the implementation, and whether
+	they account for the differences between the formulas and the enumeration."""
+	explained = "explains the differences" if shifts == diffs else "!! does not explain the differences"
+	print(f"\t\tShift, {label}: {', '.join(f'{x:+d}' for x in shifts)} ({explained})")
+
+if __name__ == '__main__':
+	print(f"analysis_fault.py | enumerated from SPHINCSplus.py | difference")
+	for inst in TOY_INSTANCES:
+		spx = TOY_INSTANCES[inst]
+		(tally, digits) = enumerate_faults(inst, processes=PROCESSES)
+
+		fors = tally[FORS]
+		f_verif_h = fors_total_verifiable_hashes(spx.log_t, spx.k)
+		f_nonverif_h = fors_total_nonverifiable_hashes(spx.log_t, spx.k)
+		print(f"SPHINCS+-{inst}")
+		print(f"\tFORS ({sum(fors.values())} hash calls, {fors_total_hashes(spx.log_t, spx.k)} in analysis_fault.py)")
+		report(f"Verifiable", f_verif_h, fors[Outcome.VERIFIABLE])
+		report(f"Non-verifiable", f_nonverif_h, fors[Outcome.NONVERIFIABLE])
+		report(f"Without effect", 0, fors[Outcome.VALID])
+		# SPHINCSplus.sign recomputes the FORS root from the FORS signature
+		# (keyextract, k*(a+1)+1 calls instead of the k*(a+2)+1 non-verifiable
+		# ones), where the revealed secrets (k calls) are verifiable, and the
+		# revealed leaves and their paths (k*(a+1) calls) have no effect
+		report_shift("keyextract FORS recomputation (verifiable, non-verifiable, without effect)",
+		             [spx.k, -spx.k, spx.k*(spx.log_t+1)],
+		             [fors[Outcome.VERIFIABLE] - f_verif_h, fors[Outcome.NONVERIFIABLE] - f_nonverif_h, fors[Outcome.VALID]])
+
+		x_verif_h = xmss_total_verifiable_hashes(spx.ell, spx.W, spx.hp)
+		x_nonverif_h = xmss_total_nonverifiable_hashes(spx.ell, spx.W, spx.hp)
+		for layer in range(spx.d-1):
+			print(f"\tXMSS, layer {layer} ({sum(tally[layer].values())} hash calls, {xmss_total_hashes(spx.ell, spx.W, spx.hp)} in analysis_fault.py)")
+			report(f"Verifiable", x_verif_h, tally[layer][Outcome.VERIFIABLE])
+			report(f"Non-verifiable", x_nonverif_h, tally[layer][Outcome.NONVERIFIABLE])
+			# The signature values of the signing W-OTS+ carry the faults of the
+			# links below them (ell PRF and sum(b) F calls) to the verifier
+			below = spx.ell + sum(digits[layer])
+			report_shift("links below the signature values (verifiable, non-verifiable)", [below, -below],
+			             [tally[layer][Outcome.VERIFIABLE] - x_verif_h, tally[layer][Outcome.NONVERIFIABLE] - x_nonverif_h])
+		top = tally[spx.d-1]
+		print(f"\tXMSS, layer {spx.d-1} ({sum(top.values())} hash calls, not exploitable)")
+		report(f"Exploitable", 0, top[Outcome.VERIFIABLE] + top[Outcome.NONVERIFIABLE])
+		print(f"\tPRF_msg and H_msg: {dict((o.name, c) for (o, c) in tally[None].items())}")
+		print(f"")
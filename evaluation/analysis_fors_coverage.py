@@ -0,0 +1,25 @@
+#!/bin/python
+
+from util.spx_inst import SPHINCSPLUS_INSTANCES
+from util.fors_coverage import *
+
+# Number of simulated signatures per instance (the tables report its prefixes)
+LOG_Q = 20
+# Height of the restricted hypertree, to observe many signatures per key pair
+KEY_BITS = 8
+
+if __name__ == '__main__':
+	for inst in SPHINCSPLUS_INSTANCES:
+		spx = SPHINCSPLUS_INSTANCES[inst]
+		revealed = simulate(spx, 2**LOG_Q)
+		print(f"SPHINCS+-{inst}")
+		print(f"")
+		for key_bits in [None, KEY_BITS]:
+			print(f"2^{spx.h if key_bits is None else key_bits} FORS key pairs")
+			print(f"\tQ\tRevealed leaves (sim./th.)\tlog2 Pr(forgery) (sim./th.)")
+			for log_Q in range(8, LOG_Q+1, 2):
+				Q = 2**log_Q
+				cov = coverage(spx, Revealed(*(column[:Q] for column in revealed)), key_bits)
+				print(f"\t2^{log_Q}\t{revealed_fraction(spx, cov, key_bits):.4e} / {analytic_revealed_fraction(spx, Q, key_bits):.4e}"
+				      f"\t{forgery_log2pr(spx, cov, key_bits):.2f} / {analytic_forgery_log2pr(spx, Q, key_bits):.2f}")
+		print(f"")
@@ -0,0 +1,57 @@
+#!/bin/python
+
+import os
+from math import ceil
+from util.spx_inst import SPHINCSPLUS_INSTANCES
+from util.combi import break_pb, coverage_exp, maxload_exp, recomp_exp
+from util.cmplx_uf import grafting_pr
+from util.montecarlo import *
+
+TRIALS = 10**6
+# Largest number of random values drawn per formula evaluation
+MAX_DRAWS = 2**28
+# Tail probability at which maxload_exp stops (the paper stops at 1E-02, which
+# underestimates the expectation by more than the confidence intervals)
+MAXLOAD_TOL = 1E-12
+PROCESSES = os.cpu_count()
+
+def report(label, value, e):
+	flag = "ok" if agrees(value, e) else "!!"
+	print(f"\t{label}: {value:.6g} | {e.mean:.6g} [{e.lo:.6g}, {e.hi:.6g}] ({e.trials} trials) {flag}")
+
+if __name__ == '__main__':
+	print(f"Analytical | empirical [95% confidence interval]")
+
+	print(f"Pr(no W-OTS+ break) (break_pb), N = 256")
+	for Mv in [0, 4, 16, 64]:
+		for Mf in [4, 16, 64]:
+			e = estimate(sample_break, 256, Mv, Mf, trials=TRIALS, processes=PROCESSES)
+			report(f"Mv = {Mv}, Mf = {Mf}", break_pb(256, Mv, Mf), e)
+
+	print(f"E[Mv] to cover layer (coverage_exp)")
+	for log_N in [3, 4, 6, 8, 9, 12]:
+		N = 2**log_N
+		e = estimate(sample_coverage, N, trials=min(TRIALS, MAX_DRAWS//N), processes=PROCESSES)
+		report(f"N = {N}", coverage_exp(N), e)
+
+	print(f"E[Max. load | Mf] (maxload_exp)")
+	for log_N in [3, 4, 6]:
+		for Mf in [64, 256, 1024]:
+			N = 2**log_N
+			e = estimate(sample_maxload, N, Mf, 0, trials=min(TRIALS, MAX_DRAWS//(N+Mf)), processes=PROCESSES)
+			report(f"N = {N}, Mf = {Mf} (paper: {maxload_exp(N, Mf, 0):.6g})", maxload_exp(N, Mf, 0, tol=MAXLOAD_TOL), e)
+
+	print(f"E[queries to recomp.] (recomp_exp)")
+	for log_N in [3, 6, 8]:
+		N = 2**log_N
+		for C in sorted({ceil(ratio*N) for ratio in [1/2, 2/3, 3/4]} | {N-1}):
+			e = estimate(sample_recomp, N, C, trials=TRIALS, processes=PROCESSES)
+			report(f"N = {N}, C = {C}", recomp_exp(N, C), e)
+
+	print(f"Grafting probability (grafting_pr)")
+	for inst in SPHINCSPLUS_INSTANCES:
+		spx = SPHINCSPLUS_INSTANCES[inst]
+		for M in [2, 4, 8]:
+			e = estimate_grafting_pr(spx.ell, M, spx.W, trials=TRIALS, processes=PROCESSES)
+			report(f"SPHINCS+-{inst}, M = {M}", grafting_pr(spx.ell, M, spx.W), e)
+	print(f"")
@@ -1,30 +1,57 @@
 #!/bin/python
 
+import os
 from math import log2
 from util.combi import break_pb, coverage_exp, maxload_exp
+from util.sweep import Memo, cell, run, write_table
 
 N = 2**8
 
+# On-disk memo of the cells, and folder of the CSV/JSON tables
+MEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sweep")
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+BREAK_LOG_N = [8]
+BREAK_MV = [0] + [2**log_Mv for log_Mv in range(2,7)]
+BREAK_MF = [2**log_Mf for log_Mf in range(2,7)]
+COVERAGE_LOG_N = [3,4,6,8,9,12,16]
+MAXLOAD_LOG_N = [3, 4, 6, 8, 9]
+MAXLOAD_MF = [2**log_Mf for log_Mf in range(6, 11)]
+
 if __name__ == '__main__':
-	for log_N in [8]:
+	# Cells of the three tables, run at once
+	break_rows = [{"N": 2**log_N, "Mv": Mv, "Mf": Mf} for log_N in BREAK_LOG_N for Mv in BREAK_MV for Mf in BREAK_MF]
+	coverage_rows = [{"N": 2**log_N} for log_N in COVERAGE_LOG_N]
+	maxload_rows = [{"N": 2**log_N, "Mf": Mf} for log_N in MAXLOAD_LOG_N for Mf in MAXLOAD_MF]
+	cells = [cell(break_pb, r["N"], r["Mv"], r["Mf"]) for r in break_rows] + \
+	        [cell(coverage_exp, r["N"]) for r in coverage_rows] + \
+	        [cell(maxload_exp, r["N"], r["Mf"], 0) for r in maxload_rows]
+	results = iter(run(cells, Memo(MEMO_DIR)))
+	for r in break_rows:
+		r["pr_break"] = 1.0-next(results)
+	for r in coverage_rows:
+		r["avg_Mv"] = next(results)
+	for r in maxload_rows:
+		r["max_M"] = next(results)
+
+	for log_N in BREAK_LOG_N:
 		print(f"Pr(W-OTS+ break) where N = {2**log_N}")
-		for log_Mv in [0] + list(range(2,7)):
-			Mv = 2**log_Mv if log_Mv > 0 else 0
+		for Mv in BREAK_MV:
 			print(f"\tMv = {Mv}")
-			for log_Mf in range(2,7):
-				Mf = 2**log_Mf
-				print(f"\t\tMf = {Mf}: {1.0-break_pb(2**log_N, Mv, Mf):.4f}")
+			for r in [r for r in break_rows if (r["N"], r["Mv"]) == (2**log_N, Mv)]:
+				print(f"\t\tMf = {r['Mf']}: {r['pr_break']:.4f}")
 
 	print(f"E[Mv] to cover layer")
-	for log_N in [3,4,6,8,9,12,16]:
-		avg_Mv = coverage_exp(2**log_N)
-		print(f"\tN = {2**log_N}: {avg_Mv:.2f} (2^{log2(avg_Mv):.2f})")
+	for r in coverage_rows:
+		print(f"\tN = {r['N']}: {r['avg_Mv']:.2f} (2^{log2(r['avg_Mv']):.2f})")
 
 	print(f"E[Max. load | Mf]")
-	for log_N in [3, 4, 6, 8, 9]:
+	for log_N in MAXLOAD_LOG_N:
 		print(f"\tN = {2**log_N}")
-		for log_Mf in range(6, 11):
-			Mf = 2**log_Mf
-			max_M = maxload_exp(2**log_N, Mf, 0)
-			print(f"\t\tMf = {Mf}: {max_M:.2f} (2^{log2(max_M):.2f})")
-	print(f"")
\ No newline at end of file
+		for r in [r for r in maxload_rows if r["N"] == 2**log_N]:
+			print(f"\t\tMf = {r['Mf']}: {r['max_M']:.2f} (2^{log2(r['max_M']):.2f})")
+	print(f"")
+
+	write_table(os.path.join(OUTPUT_DIR, "multifault_break"), break_rows)
+	write_table(os.path.join(OUTPUT_DIR, "multifault_coverage"), coverage_rows)
+	write_table(os.path.join(OUTPUT_DIR, "multifault_maxload"), maxload_rows)
@@ -0,0 +1,30 @@
+#!/bin/python
+
+import time
+from math import log2
+from util.spx_inst import SPHINCSPLUS_INSTANCES
+from util.search import search, OBJECTIVES
+
+# Budgets: signature size of the standard fast instance, 1 GiB of caching memory
+MAX_MEM_BYTES = 2**30
+TOP = 10
+
+if __name__ == '__main__':
+	for (s, f) in [("128s", "128f"), ("192s", "192f"), ("256s", "256f")]:
+		spx = SPHINCSPLUS_INSTANCES[f]
+		max_sig_bytes = (1 + spx.k*(spx.log_t+1) + spx.h + spx.d*spx.ell)*spx.n
+
+		start = time.time()
+		(front, total) = search(spx.n, max_sig_bytes=max_sig_bytes, max_mem_bytes=MAX_MEM_BYTES)
+		elapsed = time.time() - start
+
+		print(f"SPHINCS+-{s[:3]}* (signature <= {max_sig_bytes} bytes, memory <= {MAX_MEM_BYTES:.2E} bytes)")
+		print(f"")
+		print(f"\t{total} candidates, {len(front['h'])} on the Pareto front ({elapsed:.1f} sec)")
+		print(f"\tLowest Pr(Expl.)")
+		order = sorted(range(len(front['h'])), key=lambda i: [front[o][i] for o in OBJECTIVES])
+		for i in order[:TOP]:
+			print(f"\t\th = {front['h'][i]}, d = {front['d'][i]}, log_t = {front['log_t'][i]}, k = {front['k'][i]}, W = {front['W'][i]}, c = {front['c'][i]}: "
+			      f"Pr(Expl.) = {front['pr_expl'][i]:.4f}, Pr(graft) = 2^{front['graft_log2pr'][i]:.2f}, "
+			      f"|sig| = {front['sig_bytes'][i]:.0f}, mem. = {front['mem_bytes'][i]:.2E}, hashes = 2^{log2(front['sign_hashes'][i]):.2f}")
+		print(f"")
@@ -0,0 +1,34 @@
+#!/bin/python
+
+from util.spx_inst import SPHINCSPLUS_INSTANCES
+from util.cmplx_spx import *
+from util.timeline import sign_timeline, experiment_timeline, FORS
+
+if __name__ == '__main__':
+	for inst in SPHINCSPLUS_INSTANCES:
+		spx = SPHINCSPLUS_INSTANCES[inst]
+
+		# Timeline of a whole signature (consistent with cmplx_spx)
+		timeline = sign_timeline(spx)
+		s_total_expl_h = spx_total_exploitable_hashes(spx.log_t, spx.d, spx.k, spx.ell, spx.W, spx.hp)
+		s_total_h = spx_total_hashes(spx.log_t, spx.d, spx.k, spx.ell, spx.W, spx.hp)
+		assert len(timeline) == s_total_h, f"Timeline inconsistent ({len(timeline)} != {s_total_h})"
+		assert timeline.count(exploitable=True) == s_total_expl_h, f"Timeline inconsistent ({timeline.count(exploitable=True)} != {s_total_expl_h})"
+		expl_time = sum([end - start for (start, end) in timeline.windows(exploitable=True)])
+
+		print(f"SPHINCS+-{inst}")
+		print(f"")
+		print(f"Signature ({timeline.duration()} Keccak-f permutations)")
+		print(f"\tPr(Faulty hash call is exploitable) = {s_total_expl_h/s_total_h:.4f}")
+		print(f"\tPr(Glitch at random time is exploitable) = {expl_time:.4f}")
+		print(f"\tExploitable windows: {', '.join([f'[{start:.4f}, {end:.4f})' for (start, end) in timeline.windows(exploitable=True)])}")
+		for offset in [0.25, 0.5, 0.75, 0.99]:
+			call = timeline.at(offset)
+			layer = {None: "message", FORS: "FORS"}.get(call.layer, f"layer {call.layer}")
+			print(f"\tt={offset:.2f}: {layer}, {call.structure} call #{call.offset} ({call.func})")
+
+		# Timeline of the experiments (one XMSS tree, signed at the next layer)
+		timeline = experiment_timeline(spx)
+		print(f"Experiments ({timeline.duration()} Keccak-f permutations)")
+		print(f"\tExploitable windows: {', '.join([f'[{start:.4f}, {end:.4f})' for (start, end) in timeline.windows(exploitable=True)])}")
+		print(f"")
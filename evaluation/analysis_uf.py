@@ -1,16 +1,23 @@
 #!/bin/python
 
+import os
 from math import log2
 from util.spx_inst import SPHINCSPLUS_INSTANCES
 from util.cmplx_uf import *
+from util.sweep import write_table
+
+# Folder of the CSV/JSON tables
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
 
 if __name__ == '__main__':
+	tables = {"processing": [], "unidentified": [], "grafting": [], "path_seeking": []}
 	for inst in SPHINCSPLUS_INSTANCES:
 		spx = SPHINCSPLUS_INSTANCES[inst]
 
 		# Count the number of hash function calls
 		sig_id_h = sig_identification_withpk_hashes(spx.ell, spx.W)
 		nv_sig_id_h = sig_identification_nvonly_hashes(spx.ell, spx.W)
+		tables["processing"] += [{"instance": inst, "withpk_hashes": sig_id_h, "nvonly_hashes": nv_sig_id_h}]
 
 		print(f"SPHINCS+-{inst}")
 		print(f"")
@@ -20,22 +27,30 @@ if __name__ == '__main__':
 		print(f"\tE[Non-id. chunks]")
 		for M in range(2,5):
 			unid_chunks = unidentied_chunks_number(spx.ell, spx.W, M)
+			tables["unidentified"] += [{"instance": inst, "M": M, "chunks": unid_chunks, "ell": spx.ell}]
 			print(f"\t\tM = {M}: {unid_chunks:.2f}/{spx.ell}")
+		grafting = [{"instance": inst, "M": 2**logM,
+		             "pr_graft": grafting_pr(spx.ell, 2**logM, spx.W),
+		             "fors_hashes": fors_grafting_hashes(spx.log_t, spx.k, spx.ell, 2**logM, spx.W),
+		             "xmss_hashes": xmss_grafting_hashes(spx.hp, spx.k, spx.ell, 2**logM, 2**spx.log_t, spx.W)}
+		            for logM in range(1,6)]
+		tables["grafting"] += grafting
 		print(f"\tGrafting hashes")
 		print(f"\t\tGrafting probability")
-		for logM in range(1,6):
-			pr_graft = grafting_pr(spx.ell, 2**logM, spx.W)
-			print(f"\t\t\tM = {2**logM}: {pr_graft:.4f} (2^{log2(pr_graft):.2f})")
+		for r in grafting:
+			print(f"\t\t\tM = {r['M']}: {r['pr_graft']:.4f} (2^{log2(r['pr_graft']):.2f})")
 		print(f"\t\tFORS")
-		for logM in range(1,6):
-			f_graft_h = fors_grafting_hashes(spx.log_t, spx.k, spx.ell, 2**logM, spx.W)
-			print(f"\t\t\tM = {2**logM}: {f_graft_h:.4f} (2^{log2(f_graft_h):.2f})")
+		for r in grafting:
+			print(f"\t\t\tM = {r['M']}: {r['fors_hashes']:.4f} (2^{log2(r['fors_hashes']):.2f})")
 		print(f"\t\tXMSS")
-		for logM in range(1,6):
-			x_graft_h = xmss_grafting_hashes(spx.hp, spx.k, spx.ell, 2**logM, 2**spx.log_t, spx.W)
-			print(f"\t\t\tM = {2**logM}: {x_graft_h:.4f} (2^{log2(x_graft_h):.2f})")
+		for r in grafting:
+			print(f"\t\t\tM = {r['M']}: {r['xmss_hashes']:.4f} (2^{log2(r['xmss_hashes']):.2f})")
 		print(f"\tPath seeking hashes")
 		for layer in [0, 1, spx.d-1]:
 			pseek_h = path_seeking_hashes(spx.h, spx.hp, layer)
+			tables["path_seeking"] += [{"instance": inst, "layer": layer, "hashes": pseek_h}]
 			print(f"\t\tl* = {layer}: {pseek_h} (2^{int(log2(pseek_h))})")
-		print(f"")
\ No newline at end of file
+		print(f"")
+
+	for (name, rows) in tables.items():
+		write_table(os.path.join(OUTPUT_DIR, f"uf_{name}"), rows)
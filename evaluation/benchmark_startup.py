@@ -0,0 +1,42 @@
+#!/bin/python
+
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+from statistics import median
+
+# Number of runs per measurement (the median is reported)
+REPEAT = 5
+# Largest Stirling row built by the table benchmark
+STIRL2ND_M = 256
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def wall_ms(code, env=None):
+	"""Returns the median wall time (in ms) of a fresh interpreter running code
+	in this folder."""
+	timer = "import time; t = time.perf_counter(); {}; print((time.perf_counter() - t)*1E3)"
+	runs = [float(subprocess.run([sys.executable, "-c", timer.format(code)], cwd=HERE, env=env,
+	                             capture_output=True, text=True, check=True).stdout) for _ in range(REPEAT)]
+	return median(runs)
+
+if __name__ == '__main__':
+	print(f"Cold start (import of the script in a fresh interpreter, median of {REPEAT})")
+	for script in sorted(glob.glob(os.path.join(HERE, "analysis_*.py"))):
+		module = os.path.splitext(os.path.basename(script))[0]
+		print(f"\t{module}: {wall_ms(f'import {module}'):.1f} ms")
+	print(f"\tnumpy (for reference): {wall_ms('import numpy'):.1f} ms")
+
+	print(f"Stirling rows up to m = {STIRL2ND_M}")
+	with tempfile.TemporaryDirectory() as tables_dir:
+		env = dict(os.environ, SPX_TABLES_DIR=tables_dir)
+		code = f"from util.combi import stirl2nd_row; stirl2nd_row({STIRL2ND_M})"
+		subprocess.run([sys.executable, "-c", code], cwd=HERE, env=env, check=True)
+		print(f"\tPersistent table: {wall_ms(code, env):.1f} ms")
+		# Below a file, hence nothing is ever saved
+		open(os.path.join(tables_dir, "file"), 'w').close()
+		env["SPX_TABLES_DIR"] = os.path.join(tables_dir, "file", "tables")
+		print(f"\tRebuilt (no table): {wall_ms(code, env):.1f} ms")
+	print(f"")
@@ -0,0 +1,150 @@
+import numpy as np
+
+# ------------------------------------------------------------------------------
+# Array-aware complexities
+# ------------------------------------------------------------------------------
+#
+# Same functions as in cmplx_spx.py and cmplx_uf.py, but evaluated on NumPy
+# arrays broadcast against each other (e.g., built with grid), so that a whole
+# parameter sweep is a single call. Counts are returned as float64 arrays, as
+# powers of two overflow int64 for the largest parameters.
+
+_f = lambda x: np.asarray(x, dtype=np.float64)
+_pow2 = lambda e: np.exp2(_f(e))
+
+# ------------------------------------------------------------------------------
+# Parameter grids
+# ------------------------------------------------------------------------------
+
+def wots_len(n, W):
+	"""Returns the number of chains in a W-OTS+ signature (ell = len1 + len2).
+	"""
+	(n, logW) = (_f(n), np.log2(_f(W)))
+	len1 = np.ceil(8*n/logW)
+	len2 = np.floor(np.log2(len1*(_f(W)-1))/logW) + 1
+	return len1 + len2
+
+def grid(spx=None, **axes):
+	"""Returns the parameters of a sweep as arrays broadcast against each other,
+	one axis per argument (in order).
+
+	Args:
+		spx (list): SPHINCS+ instances (spx_inst), each field along a same axis.
+		axes: Other parameters (e.g., n, h, d, log_t, k, W, M, layer), each
+			along its own axis.
+
+	Returns:
+		dict of arrays, where hp and ell are derived if missing.
+	"""
+	spx = list(spx or [])
+	axes = ([(spx[0]._fields, list(zip(*spx)))] if spx else []) + \
+	       [((name,), [values]) for (name, values) in axes.items()]
+	g = {}
+	for (i, (names, columns)) in enumerate(axes):
+		shape = [1]*len(axes)
+		shape[i] = -1
+		for (name, values) in zip(names, columns):
+			g[name] = np.asarray(values).reshape(shape)
+	if 'hp' not in g and 'h' in g and 'd' in g:
+		g['hp'] = g['h']//g['d']
+	if 'ell' not in g and 'n' in g and 'W' in g:
+		g['ell'] = wots_len(g['n'], g['W']).astype(int)
+	return g
+
+# ------------------------------------------------------------------------------
+# XMSS count of hash function calls
+# ------------------------------------------------------------------------------
+
+def xmss_total_hashes(ell, W, hp):
+	return _pow2(hp)*(_f(ell)*W+2) - 1
+
+def xmss_total_nonverifiable_hashes(ell, W, hp):
+	return (_f(ell)*W) + 1 + hp
+
+def xmss_total_verifiable_hashes(ell, W, hp):
+	return (_pow2(hp)-1)*(_f(ell)*W+1) + _pow2(hp) - hp - 1
+
+# ------------------------------------------------------------------------------
+# FORS count of hash function calls
+# ------------------------------------------------------------------------------
+
+def fors_total_hashes(a, k):
+	t = _pow2(a)
+	return _f(k)*(3*t-1) + 1
+
+def fors_total_nonverifiable_hashes(a, k):
+	return _f(k)*(_f(a)+2) + 1
+
+def fors_total_verifiable_hashes(a, k):
+	t = _pow2(a)
+	return _f(k)*(3*t-a-3)
+
+# ------------------------------------------------------------------------------
+# SPHINCS+ count of hash function calls
+# ------------------------------------------------------------------------------
+
+def spx_total_hashes(a, d, k, ell, W, hp):
+	return fors_total_hashes(a, k) + xmss_total_hashes(ell, W, hp)*d + 2
+
+def spx_total_nonverifiable_hashes(a, d, k, ell, W, hp):
+	return fors_total_nonverifiable_hashes(a, k) + xmss_total_nonverifiable_hashes(ell, W, hp)*(_f(d)-1) + xmss_total_hashes(ell, W, hp) + 1
+
+def spx_total_verifiable_hashes(a, d, k, ell, W, hp):
+	return fors_total_verifiable_hashes(a, k) + xmss_total_verifiable_hashes(ell, W, hp)*(_f(d)-1) + 1
+
+def spx_total_exploitable_hashes(a, d, k, ell, W, hp):
+	return fors_total_hashes(a, k) + xmss_total_hashes(ell, W, hp)*(_f(d)-1) + 1
+
+# ------------------------------------------------------------------------------
+# Processing
+# ------------------------------------------------------------------------------
+
+def sig_identification_withpk_hashes(ell, W):
+	"""Case 1: known W-OTS+ public key.
+	"""
+	return _f(ell)*(_f(W)-1)/2
+
+def sig_identification_nvonly_hashes(ell, W):
+	"""Case 2: unknown W-OTS+ public key.
+	"""
+	return _f(ell)*(_f(W)*(_f(W)-1)+1)/2
+
+def unidentied_chunks_number(ell, W, M):
+	"""Expected number of unidentified chunks with M non-verifiable signatures.
+	"""
+	return _f(ell)*(1.0/(_f(W)**(_f(M)-1)))
+
+# ------------------------------------------------------------------------------
+# Grafting
+# ------------------------------------------------------------------------------
+
+def grafting_pr(ell, M, W):
+	"""Sum over the W values x of a chunk of 1 - ((W-1-x)/W)^M, i.e., W minus
+	the sum over y < W of (y/W)^M, accumulated one y at a time for all the
+	(possibly different) W of the grid.
+	"""
+	(ell, M, W) = np.broadcast_arrays(_f(ell), _f(M), _f(W))
+	s = W.copy()
+	for y in range(1, int(W.max())):
+		s -= np.where(y < W, (y/W)**M, 0)
+	return (s/W)**ell
+
+def fors_grafting_hashes(a, k, ell, M, W):
+	f_total_h = fors_total_hashes(a, k)
+	graft_h = 1.0/grafting_pr(ell, M, W)
+
+	return f_total_h*graft_h
+
+def xmss_grafting_hashes(hp, k, ell, M, t, W):
+	x_hashes = xmss_total_hashes(ell, W, hp)
+	graft_h = 1.0/grafting_pr(ell, M, W)
+
+	return x_hashes*graft_h
+
+# ------------------------------------------------------------------------------
+# Path seeking
+# ------------------------------------------------------------------------------
+
+def path_seeking_hashes(h, hp, layer):
+	"""See cmplx_uf.path_seeking_hashes."""
+	return _pow2(_f(h) - _f(hp)*layer)
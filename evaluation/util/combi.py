@@ -1,15 +1,53 @@
-from math import prod, comb, factorial
-import sympy
-import numpy as np
+from fractions import Fraction
+from functools import lru_cache
+from itertools import accumulate
+from math import prod, comb, lgamma
+from .lazy import lazy_import
+from .tables import load_table, save_table
+
+np = lazy_import("numpy")
+
+# Rows of Stirling's numbers of the second kind computed so far (loaded from
+# the persistent tables on first use)
+_STIRL2ND_ROWS = None
+# Number of rows persisted (the size of the table grows as m^3)
+STIRL2ND_SAVED_ROWS = 257
+
+def stirl2nd_row(m):
+	"""Returns the m-th row of Stirling's numbers of the second kind, i.e., the
+	number of ways to partition m balls into t non-empty bins for t = 0..m.
+
+	The rows are computed once by recurrence, S(m, t) = t*S(m-1, t) + S(m-1, t-1),
+	and kept for the subsequent calls and runs (see tables.py).
+
+	Args:
+		m (int): The number of balls.
+	"""
+	global _STIRL2ND_ROWS
+	if _STIRL2ND_ROWS is None:
+		_STIRL2ND_ROWS = load_table("stirl2nd", [(1,)])
+	if len(_STIRL2ND_ROWS) <= m:
+		saved = len(_STIRL2ND_ROWS)
+		while len(_STIRL2ND_ROWS) <= m:
+			row = _STIRL2ND_ROWS[-1] + (0,)
+			_STIRL2ND_ROWS.append(tuple(t*row[t] + (row[t-1] if t > 0 else 0) for t in range(len(row))))
+		if saved < STIRL2ND_SAVED_ROWS:
+			save_table("stirl2nd", _STIRL2ND_ROWS[:STIRL2ND_SAVED_ROWS])
+	return _STIRL2ND_ROWS[m]
 
 # Stirling's number of the second kind
-stirl2nd = sympy.functions.combinatorial.numbers.stirling
+stirl2nd = lambda m, t: stirl2nd_row(m)[t] if 0 <= t <= m else 0
 # Count the number of combinations with repetitions
 multiset = lambda m, N: comb(m+N-1, m-1)
 
 def truncexp(N, k):
 	return prod(map(lambda i: N-i, range(k)))
 
+@lru_cache(maxsize=None)
+def truncexp_row(N):
+	"""Returns the falling factorials N*(N-1)*...*(N-k+1) for k = 0..N."""
+	return (1,) + tuple(accumulate(range(N, 0, -1), lambda x, y: x*y))
+
 def break_pb(N, Mv, Mf):
 	if Mf == 1:
 		return 1 - (1 - 1/N)**Mv
@@ -29,12 +67,28 @@ def break_pb(N, Mv, Mf):
 		Ref: https://www.ism.ac.jp/editsec/aism/pdf/040_1_0077.pdf
 
 		Returns: Equation (3.4) of https://www.ism.ac.jp/editsec/aism/pdf/040_1_0077.pdf, p.83 (7)"""
-		s = 0
-		for t1 in range(min(Mv, N)+1):
-			stirl2nd_Mvt1 = stirl2nd(Mv, t1)
-			for t2 in range(min(Mf, N)+1):
-				s += stirl2nd_Mvt1*stirl2nd(Mf, t2)*truncexp(N, t1+t2)
-		return s/(N**(Mv+Mf))
+		return float(break_pb_exact(N, Mv, Mf))
+
+@lru_cache(maxsize=None)
+def break_pb_exact(N, Mv, Mf):
+	"""Returns the probability of break_pb as an exact fraction (Mv, Mf > 0).
+
+	The double sum over (t1, t2) only depends on t1+t2 through the falling
+	factorial, hence it is evaluated as the convolution of the Stirling rows of
+	Mv and Mf, truncated to t1+t2 <= N (beyond, the falling factorial is zero).
+
+	Args:
+		N (int): The number of bins.
+		Mv (int): The number of throws of the first type.
+		Mf (int): The number of throws of the second type.
+	"""
+	(row_v, row_f) = (stirl2nd_row(Mv), stirl2nd_row(Mf))
+	falling = truncexp_row(N)
+	s = 0
+	for t1 in range(min(Mv, N)+1):
+		if row_v[t1]:
+			s += row_v[t1]*sum(row_f[t2]*falling[t1+t2] for t2 in range(min(Mf, N-t1)+1))
+	return Fraction(s, N**(Mv+Mf))
 
 def multinomial_transition_pb(N, m, k, sk, sk_prev):
 	"""Returns the multinomial transition probabliity, i.e., the entries of the
@@ -50,31 +104,96 @@ def multinomial_transition_pb(N, m, k, sk, sk_prev):
 	p = 1/(N-k)
 	return comb(m-sk_prev, sk-sk_prev)*p**(sk-sk_prev)*(1-p)**(m-sk) if sk >= sk_prev else 0
 
-def max_multinomial_freq_pb(N, m, c):
-	"""Returns the probability that the maximum frequency of the multinomial
-	distribution with parameters N and m.
+def max_multinomial_freq_pbs(N, m, cs):
+	"""Returns the probabilities that the maximum frequency of the multinomial
+	distribution with parameters N and m is at most c, for each threshold c.
+
+	The transition matrices Q_k (see multinomial_transition_pb) are banded, as
+	a bin receives at most c balls. Hence, instead of multiplying them, the
+	distribution of the cumulative number of balls is propagated from bin to
+	bin, one band diagonal at a time, for all the thresholds at once. The
+	binomial coefficients are derived in log space to avoid overflows.
 
 	Ref: https://link.springer.com/content/pdf/10.1007/s11222-010-9174-3.pdf
 
+	Args:
+		N (int): The number of bins (N > 1).
+		m (int): The number of thrown balls.
+		cs (list): The thresholds.
+
+	Returns:
+		Array of Pr(max. frequency <= c), for c in cs
+	"""
+	cs = np.asarray(cs)
+	order = np.argsort(cs)
+	cs_sorted = np.minimum(cs[order], m)
+	band = int(cs_sorted[-1]) if len(cs) else 0
+
+	# Log-factorials and band coordinates (j: cumulative balls, d: balls in bin)
+	logfact = np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, m+1)))))
+	j = np.arange(m+1)[:,None]
+	d = np.arange(band+1)[None,:]
+	rest = np.maximum(m-j-d, 0)
+	logbinom = logfact[m-j] - logfact[np.minimum(d, m)] - logfact[rest]
+	valid = (j + d) <= m
+
+	# Distribution of the cumulative number of balls, one row per threshold
+	V = np.zeros((len(cs), m+1))
+	V[:,0] = 1.0
+	for k in range(N-1):
+		p = 1/(N-k)
+		B = np.where(valid, np.exp(logbinom + d*np.log(p) + rest*np.log1p(-p)), 0.0)
+		W = np.zeros_like(V)
+		for b in range(band+1):
+			rows = np.searchsorted(cs_sorted, b) # thresholds c >= b
+			W[rows:,b:] += V[rows:,:m+1-b]*B[:m+1-b,b]
+		V = W
+
+	# The last bin receives the remaining balls
+	i = np.arange(m+1)
+	pbs = np.zeros(len(cs))
+	pbs[order] = [V[r, m-i <= c].sum() for (r, c) in enumerate(cs_sorted)]
+	return pbs
+
+def max_multinomial_freq_pb(N, m, c):
+	"""Returns the probability that the maximum frequency of the multinomial
+	distribution with parameters N and m is at most c.
+
 	Args:
 		N (int): The number of bins.
 		m (int): The number of thrown balls.
+		c (int): The threshold.
 	"""
-	Q = [np.matrix([multinomial_transition_pb(N, m, 0, i, 0) if i <= c else 0 for i in range(m+1)])]
-	for k in range(1,N-1):
-		Q += [np.matrix([[multinomial_transition_pb(N, m, k, i, j) if i-j <= c else 0 for i in range(m+1)] for j in range(m+1)])]
-	Q += [np.matrix([[1 if m-i <= c else 0] for i in range(m+1)])]
+	return max_multinomial_freq_pbs(N, m, [c])[0]
 
-	return prod(Q).min()
+def maxload_exp(N, Mf, Mv, chunk=32, tol=1E-02):
+	"""Returns the expected maximum load of N bins after Mf throws, plus the
+	probability that a given bin receives one of Mv throws, as the sum of the
+	tail probabilities Pr(max. load > c).
 
-def maxload_exp(N, Mf, Mv):
+	The sum stops at the first tail probability below tol, hence the result
+	underestimates the expectation by the remaining tail (1E-02, as reported in
+	the paper, by default).
+
+	Args:
+		N (int): The number of bins.
+		Mf (int): The number of throws.
+		Mv (int): The number of throws at the given bin.
+		chunk (int): The number of thresholds evaluated at once.
+		tol (float): The tail probability at which the sum stops.
+	"""
 	s = 0
 	l = 1.0
-	c = 0
-	while l > 1E-02:
-		l = 1.0-max_multinomial_freq_pb(N, Mf, c)
-		s += l
-		c += 1
+	c = (Mf+N-1)//N # Pr(max. load < Mf/N) = 0
+	s += c
+	while l > tol:
+		# Evaluate the next chunk of thresholds at once
+		for pb in max_multinomial_freq_pbs(N, Mf, range(c, c+chunk)):
+			l = 1.0-pb
+			s += l
+			c += 1
+			if l <= tol:
+				break
 	return s + (1 - ((N-1)/N)**Mv)
 
 def coverage_exp(N):
@@ -94,17 +213,171 @@ def coverage_exp(N):
 		return 0
 	return N*sum(map(lambda x: 1/(N-x), range(N)))
 
+# Mass below which the tails of the occupancy distribution are dropped
+OCCUPANCY_EPS = 1E-30
+
 def alpha(i, m):
-	return sum(map(lambda k: (-1)**(i-k)*comb(i, k)*k**m, range(1, i+1)))/factorial(i)
+	"""Returns the number of ways to partition m balls into i non-empty bins,
+	i.e., Stirling's number of the second kind (see stirl2nd_row)."""
+	return stirl2nd(m, i) if (i, m) != (0, 0) else 0
+
+# Number of collisions (m - i) up to which the occupancy distribution is exact
+OCCUPANCY_MAX_COLLISIONS = 2**10
+# Number of occupancy distributions kept in cache
+OCCUPANCY_CACHE = 2**10
+# Log of the second-order Eulerian numbers, rows 0..OCCUPANCY_MAX_COLLISIONS
+_EULERIAN2_LOG = None
+
+# Log-factorials of an array
+log_fact = lambda x: np.asarray(np.frompyfunc(lgamma, 1, 1)(np.asarray(x, dtype=float) + 1), dtype=float)
+
+def eulerian2_log():
+	"""Returns the table of the logs of the second-order Eulerian numbers
+	<<k, j>> for k, j = 0..OCCUPANCY_MAX_COLLISIONS, computed by recurrence,
+	<<k, j>> = (j+1)*<<k-1, j>> + (2k-1-j)*<<k-1, j-1>>, in log space (all the
+	terms are positive).
+	"""
+	global _EULERIAN2_LOG
+	if _EULERIAN2_LOG is None:
+		K = OCCUPANCY_MAX_COLLISIONS
+		j = np.arange(K+1)
+		L = np.full((K+1, K+1), -np.inf)
+		L[0,0] = 0.0
+		with np.errstate(divide='ignore'):
+			for k in range(1, K+1):
+				move = np.full(K+1, -np.inf)
+				move[1:] = np.log(np.maximum(2*k-1-j[1:], 0)) + L[k-1,:-1]
+				L[k] = np.logaddexp(np.log(j+1) + L[k-1], move)
+		L.flags.writeable = False
+		_EULERIAN2_LOG = L
+	return _EULERIAN2_LOG
+
+def stirl2nd_log_exact(m, i):
+	"""Returns log S(m, i) for the numbers of occupied bins i (array), from the
+	numbers of collisions k = m-i <= OCCUPANCY_MAX_COLLISIONS, with
+
+	S(m, m-k) = sum_j <<k, j>> * C(m-1+k-j, 2k)
+
+	(see eulerian2_log), as a log-sum-exp of positive terms.
+	"""
+	k = m - i
+	K = int(k.max())
+	j = np.arange(K+1)
+	a = m - 1 + k[:,None] - j[None,:]
+	b = 2*k[:,None]
+	# log C(a, b), from log-factorials over the (short) ranges of a, b and a-b
+	(lo_a, lo_d) = (m-1-K, m-1-2*K)
+	fact_a = log_fact(np.arange(lo_a, m+K))
+	fact_b = log_fact(np.arange(2*K+1))
+	fact_d = log_fact(np.maximum(np.arange(lo_d, m), 0))
+	valid = (j[None,:] <= k[:,None]) & (a >= b)
+	t = np.where(valid, eulerian2_log()[k][:,:K+1] + fact_a[a-lo_a] - fact_b[b] - fact_d[np.clip(a-b-lo_d, 0, 2*K)], -np.inf)
+	tmax = t.max(axis=1)
+	return tmax + np.log(np.exp(t - tmax[:,None]).sum(axis=1))
+
+def stirl2nd_log_saddle(m, i):
+	"""Returns the saddle-point approximation of log S(m, i) for the numbers of
+	occupied bins i < m (array).
+
+	The number of surjections i!*S(m, i) is m! times the coefficient of z^m in
+	(e^z-1)^i, evaluated at the saddle point r, r/(1-e^-r) = m/i, with the
+	first correction of the Edgeworth expansion (cumulants k2, k3, k4 of the
+	zero-truncated Poisson distribution of parameter r). Its relative error
+	decreases with the number of collisions m-i, below 1e-8 beyond a thousand.
+
+	Ref: https://doi.org/10.1137/0145049
+	"""
+	i = i.astype(float)
+	c = m/i
+	r = np.where(c < 2, 2*(c-1), c)
+	for _ in range(64): # Newton on r/(1-e^-r) = c
+		em = -np.expm1(-r)
+		r = np.maximum(r - (r/em - c)*em**2/(em - r*np.exp(-r)), 1E-300)
+	p0 = -np.expm1(-r)
+	m1 = r/p0
+	m2 = (r + r**2)/p0
+	m3 = (r**3 + 3*r**2 + r)/p0
+	m4 = (r**4 + 6*r**3 + 7*r**2 + r)/p0
+	k2 = m2 - m1**2
+	k3 = m3 - 3*m2*m1 + 2*m1**3
+	k4 = m4 - 4*m3*m1 - 3*m2**2 + 12*m2*m1**2 - 6*m1**4
+	b = i*k2
+	return (lgamma(m+1) - log_fact(i) + i*(r + np.log(p0)) - m*np.log(r) - 0.5*np.log(2*np.pi*b)
+		+ np.log1p(i*k4/(8*b**2) - 5*(i*k3)**2/(24*b**3)))
+
+@lru_cache(maxsize=OCCUPANCY_CACHE)
+def occupancy_window(N, m):
+	"""Returns (lo, pb), the distribution of the number of occupied bins after m
+	uniform throws into N bins on the window i = lo..lo+len(pb)-1 out of which
+	its mass is below OCCUPANCY_EPS.
+
+	Pr(i bins occupied) = N!/(N-i)! * S(m, i) / N^m is evaluated in log space
+	over the mean +- 16 standard deviations (and a margin for the Poisson-like
+	low-collision regime), exactly if there are at most OCCUPANCY_MAX_COLLISIONS
+	collisions on the window (see stirl2nd_log_exact), with the saddle-point
+	approximation otherwise (see stirl2nd_log_saddle), then normalized. The
+	result is cached (OCCUPANCY_CACHE windows), hence returned read-only.
+
+	Args:
+		N (int): The number of bins.
+		m (int): The number of throws.
+	"""
+	if m == 0 or N == 1:
+		pb = np.ones(1)
+		pb.flags.writeable = False
+		return (min(m, 1), pb)
+
+	# Mean and standard deviation of the number of occupied bins
+	q = np.log1p(-1/N)
+	mu = -N*np.expm1(m*q)
+	var = (N*(N-1)*np.exp(m*np.log1p(-2/N)) if N > 2 else 0) + N*np.exp(m*q) - N**2*np.exp(2*m*q)
+	sd = np.sqrt(max(var, 0))
+	lo = max(1, int(np.floor(mu - 16*sd)) - 32)
+	hi = min(N, m, int(np.ceil(mu + 16*sd)) + 32)
+
+	i = np.arange(lo, hi+1)
+	if m - lo <= OCCUPANCY_MAX_COLLISIONS:
+		log_s = stirl2nd_log_exact(m, i)
+	else:
+		with np.errstate(divide='ignore', invalid='ignore'):
+			log_s = np.where(i < m, stirl2nd_log_saddle(m, np.minimum(i, m-1)), 0.0)
+	log_pb = lgamma(N+1) - log_fact(N-i) + log_s - m*np.log(N)
+	pb = np.exp(log_pb - log_pb.max())
+	pb /= pb.sum()
+
+	kept = np.flatnonzero(pb >= OCCUPANCY_EPS)
+	pb = pb[kept[0]:kept[-1]+1]
+	pb.flags.writeable = False
+	return (lo + int(kept[0]), pb)
+
+def occupancy_dist(N, m):
+	"""Returns the distribution of the number of occupied bins after m uniform
+	throws into N bins, i.e., Pr(i bins occupied) for i = 0..min(N, m) (see
+	occupancy_window), as a read-only array.
+
+	Args:
+		N (int): The number of bins.
+		m (int): The number of throws.
+	"""
+	(lo, pb) = occupancy_window(N, m)
+	dist = np.zeros(min(N, m)+1)
+	dist[lo:lo+len(pb)] = pb
+	dist.flags.writeable = False
+	return dist
 
 def distinct_pb(n, m, d):
-	return alpha(min(d,n),m)*truncexp(n, d)/n**m
+	return occupancy_pb(n, m, d)
 
 def occupancy_pb(N, m, i):
-	return factorial(N)*alpha(i,m)/(factorial(N-i)*(N**m))
+	(lo, pb) = occupancy_window(N, m)
+	return float(pb[i-lo]) if lo <= i < lo+len(pb) else 0.0
 
 def occupancy_exp(N, m):
-	return sum(map(lambda i: i*occupancy_pb(N, m, i), range(1, min(N+1, m+1))))
+	"""Returns N*(1-(1-1/N)^m), the expected number of occupied bins after m
+	uniform throws into N bins."""
+	if N == 1:
+		return float(m > 0)
+	return -N*np.expm1(m*np.log1p(-1/N))
 
 def recomp_matrix(N, C):
 	p = np.zeros((N+2, N+2))
@@ -121,12 +394,26 @@ def recomp_matrix(N, C):
 	return p
 
 def recomp_exp(N, C):
-	p = recomp_matrix(N, C)
+	"""Returns the expected number of queries before absorption of the chain of
+	recomp_matrix, starting from state 0, for one or many cache sizes C.
 
-	q = [r[:-1] for r in p[:-1]]
+	The chain only stays in state i (w.p. min(C, i)/N) or moves forward to i+1
+	(w.p. (N-i)/N), hence the expected number of queries from state i follows
+	E_i = (1 + (N-i)/N*E_{i+1}) / (1 - min(C, i)/N), i.e.,
 
-	m = np.identity(N+2-1) - q
+	E_0 = sum_i (prod_{j<i} (N-j)/(N-min(C, j))) * N/(N-min(C, i)),
 
-	n = np.linalg.inv(m)
+	which is evaluated in O(N) (per cache size) without building the matrix.
 
-	return sum(n[0])
\ No newline at end of file
+	Args:
+		N (int): The number of W-OTS+ key pairs.
+		C (int or array): The cache size(s) (infinite expectation if C >= N).
+	"""
+	Cs = np.minimum(np.atleast_1d(C), N)[None,:]
+	i = np.arange(N+1)[:,None]
+	leave = (N - np.minimum(Cs, i))/N
+	with np.errstate(divide='ignore', invalid='ignore'):
+		logs = np.log((N - i)/N) - np.log(leave)
+		prefix = np.exp(np.concatenate((np.zeros_like(logs[:1]), np.cumsum(logs[:-1], axis=0))))
+		E = (prefix/leave).sum(axis=0)
+	return E[0] if np.ndim(C) == 0 else E
@@ -0,0 +1,129 @@
+import os
+import random
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from .montecarlo import wilson
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from SPHINCSplus import ADRS, Fault, FaultModel, FaultyHash, SPHINCSplus
+
+# ------------------------------------------------------------------------------
+# Fault injection simulation
+# ------------------------------------------------------------------------------
+#
+# Signs with SPHINCSplus and a FaultyHash faulting one hash call, drawn
+# uniformly over all the calls of the signature, and classifies each faulty
+# signature as in analysis_fault.py:
+#	- exploitable, if a W-OTS+ key pair of the signature signs another message
+#	  than in the valid signature, i.e., its values all lie on its chains, at
+#	  other positions than the valid digits;
+#	- verifiable, if this message is also the root recomputed from the faulty
+#	  signature below (i.e., the fault is detectable by the attacker).
+# The chains of the key pairs of the valid signature are computed once per
+# batch, so that the classification only needs lookups and extract_keys.
+
+# Empirical Pr(exploitable) and Pr(verifiable) (montecarlo.Estimate), along with
+# the number of hash calls of a signature
+FaultStats = namedtuple("FaultStats", "exploitable verifiable calls")
+
+def _digits(wots_plus, msg):
+	"""Returns the W-OTS+ digits (message and checksum) of msg."""
+	b = wots_plus.to_baseW(int.from_bytes(msg, byteorder="big"), wots_plus.len1)
+	return b + wots_plus.to_baseW(sum(wots_plus.W-1-x for x in b), wots_plus.len2)
+
+class _Reference:
+	"""Positions of the chain values of the key pairs of the valid signature of
+	msg (computed without fault)."""
+
+	def __init__(self, spx, msg, sig):
+		(md, tree_idx, leaf_idx) = spx.digest(msg, sig[0])
+		roots = spx.extract_keys(msg, sig)
+		self.digits = []
+		self.positions = []
+		adrs = ADRS()
+		adrs.setType(ADRS.Type.WOTSCHAIN)
+		for layer in range(spx.d):
+			adrs.setLayerAddress(layer)
+			adrs.setTreeAddress(tree_idx)
+			adrs.setKeyPairAddress(leaf_idx)
+			self.digits += [_digits(spx.wots_plus, roots[layer])]
+			self.positions += [[self._chain(spx, adrs, i) for i in range(spx.wots_plus.len)]]
+			leaf_idx = tree_idx & (2**spx.xmss.h_prime-1)
+			tree_idx >>= spx.xmss.h_prime
+
+	def _chain(self, spx, adrs, i):
+		adrs.setChainAddress(i)
+		adrs.setHashAddress(0)
+		x = spx.hash.PRF(spx.sk_seed, adrs)
+		positions = {x: 0}
+		for j in range(spx.wots_plus.W-1):
+			adrs.setHashAddress(j)
+			x = spx.hash.F(x, adrs, spx.pk_seed)
+			positions[x] = j+1
+		return positions
+
+	def classify(self, spx, msg, sig):
+		"""Returns whether the faulty signature sig of msg is (exploitable,
+		verifiable)."""
+		(exploitable, verifiable) = (False, False)
+		roots = None
+		for (layer, ((wots_sig, _), chains)) in enumerate(zip(sig[2], self.positions)):
+			positions = [chain.get(x) for (chain, x) in zip(chains, wots_sig)]
+			if None in positions or positions == self.digits[layer]:
+				continue
+			exploitable = True
+			roots = roots or spx.extract_keys(msg, sig)
+			verifiable |= positions == _digits(spx.wots_plus, roots[layer])
+		return (exploitable, verifiable)
+
+def _batch(args):
+	"""Returns (trials, exploitable, verifiable, calls) of a batch of faulty
+	signatures of a random message."""
+	(instance, robust, keys, model, bits, seed, B) = args
+	spx = SPHINCSplus(instance, randomize=False, robust=robust, hash=FaultyHash)
+	spx.keygen(*keys)
+	spx.hash.rng = random.Random(seed)
+	msg = spx.hash.rng.randbytes(spx.hash.n)
+
+	spx.hash.reset()
+	sig = spx.sign(msg)
+	calls = spx.hash.calls
+	ref = _Reference(spx, msg, sig)
+
+	(exploitable, verifiable) = (0, 0)
+	for _ in range(B):
+		spx.hash.reset(Fault(model, call=spx.hash.rng.randrange(calls), bits=bits))
+		faulty = spx.sign(msg)
+		spx.hash.reset()
+		(e, v) = ref.classify(spx, msg, faulty)
+		(exploitable, verifiable) = (exploitable + e, verifiable + v)
+	return (B, exploitable, verifiable, calls)
+
+def simulate(instance, model=FaultModel.RANDOM, trials=10**6, batch=2**6, processes=None, seed=0, robust=False, bits=1):
+	"""Returns the empirical Pr(exploitable) and Pr(verifiable) (FaultStats) of
+	a single fault on a hash call drawn uniformly.
+
+	Args:
+		instance (str or spx_inst): The SPHINCS+ instance (see SPHINCSplus).
+		model (FaultModel): The fault model.
+		trials (int): The number of faulty signatures.
+		batch (int): The number of faulty signatures per message (and task).
+		processes (int): The number of processes (1 to run in this process,
+			None for os.cpu_count()).
+		seed (int): The seed of the keys and of the batches.
+		robust (bool): Whether to use the robust tweakable hash functions.
+		bits (int): The number of flipped bits (FaultModel.BITFLIP).
+	"""
+	rng = random.Random(seed)
+	n = SPHINCSplus(instance).hash.n
+	keys = tuple(rng.randbytes(n) for _ in range(3)) # sk_seed, sk_prf, pk_seed
+	jobs = [(instance, robust, keys, model, bits, f"{seed}:{start}", min(batch, trials-start)) for start in range(0, trials, batch)]
+	if processes == 1:
+		batches = list(map(_batch, jobs))
+	else:
+		with ProcessPoolExecutor(max_workers=processes) as pool:
+			batches = list(pool.map(_batch, jobs))
+	(n, exploitable, verifiable, _) = map(sum, zip(*batches))
+	return FaultStats(wilson(exploitable, n), wilson(verifiable, n), batches[0][3])
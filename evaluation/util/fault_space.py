@@ -0,0 +1,203 @@
+import os
+import random
+import sys
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from enum import IntEnum
+
+from .fault_sim import _Reference
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from SPHINCSplus import ADRS, Fault, FaultModel, FaultyHash, Hash, SPHINCSplus
+
+# ------------------------------------------------------------------------------
+# Exhaustive single-fault enumeration
+# ------------------------------------------------------------------------------
+#
+# Records the dataflow DAG of one SPHINCSplus.sign run (each hash call with the
+# calls producing its inputs, the last one producing the value), and
+# classifies the fault of each call. Only the calls downstream of the faulted
+# one are recomputed, from the cached values upstream. As the inputs of the
+# hash calls never cross a layer (a root only selects the chains of the W-OTS+
+# signature above), the faulted layer is replayed from the DAG, and the W-OTS+
+# signature above it is signed again (SigningContext.resign). The faults of
+# PRF_msg and H_msg, which change the whole signature, are signed again.
+
+class Outcome(IntEnum):
+	VALID = 0         # valid signature (e.g., fault without effect)
+	INVALID = 1       # invalid signature, not exploitable
+	NONVERIFIABLE = 2 # exploitable, but the faulty root is not recomputable
+	VERIFIABLE = 3    # exploitable, and the faulty root is recomputable
+
+# Component of the FORS calls (the others are in their hypertree layer, or None)
+FORS = -1
+
+# Outcomes per component ({component: Counter({Outcome: calls})}), and W-OTS+
+# digits of each layer of the signature
+Enumeration = namedtuple("Enumeration", "tally digits")
+
+class _TracingHash(FaultyHash):
+	"""FaultyHash recording its calls (name, adrs, inputs, producers of the
+	inputs, output) while trace is a list."""
+
+	def __init__(self, n, m, robust=False):
+		super().__init__(n, m, robust=robust)
+		self.trace = None
+		self.producer = {}
+
+	def _record(self, name, adrs, inputs, out):
+		if self.trace is not None:
+			producers = [self.producer.get(x) for x in inputs]
+			self.trace += [(name, adrs.bytes if adrs is not None else None, inputs, producers, out)]
+			self.producer[out] = len(self.trace)-1
+		return out
+
+	def T_l(self, xs, adrs, pk_seed):
+		return self._record("T_l", adrs, list(xs), super().T_l(xs, adrs, pk_seed))
+
+	def F(self, x, adrs, pk_seed):
+		return self._record("F", adrs, [x], super().F(x, adrs, pk_seed))
+
+	def H(self, left, right, adrs, pk_seed):
+		return self._record("H", adrs, [left, right], super().H(left, right, adrs, pk_seed))
+
+	def PRF(self, x, adrs):
+		return self._record("PRF", adrs, [x], super().PRF(x, adrs))
+
+	def PRF_msg(self, x, opt, sk_prf):
+		return self._record("PRF_msg", None, [], super().PRF_msg(x, opt, sk_prf))
+
+	def H_msg(self, x, pk_root, pk_seed, R):
+		return self._record("H_msg", None, [], super().H_msg(x, pk_root, pk_seed, R))
+
+def _patch(sig, f):
+	"""Returns the signature with each value x replaced by f(x)."""
+	(R, sig_fors, sig_ht) = sig
+	return (f(R), [(f(s), [f(x) for x in path]) for (s, path) in sig_fors],
+	        [([f(x) for x in wots], [f(x) for x in path]) for (wots, path) in sig_ht])
+
+class FaultSpace:
+	"""Single faults of each hash call of the signature of msg.
+
+	Args:
+		instance (str or spx_inst): The SPHINCS+ instance (see SPHINCSplus).
+		keys (tuple): (sk_seed, sk_prf, pk_seed).
+		msg (bytes): The message.
+		model (FaultModel): The fault model.
+		robust (bool): Whether to use the robust tweakable hash functions.
+		seed: The seed of the faulty values.
+	"""
+
+	def __init__(self, instance, keys, msg, model=FaultModel.RANDOM, robust=False, seed=0):
+		spx = SPHINCSplus(instance, randomize=False, robust=robust, hash=_TracingHash)
+		spx.keygen(*keys)
+		self.spx = spx
+		self.msg = msg
+		self.fault = Fault(model)
+		self.seed = seed
+		self.context = spx.context(msg)
+
+		spx.hash.trace = []
+		self.sig = spx.sign(msg)
+		(self.trace, spx.hash.trace) = (spx.hash.trace, None)
+		self.producer = spx.hash.producer
+		self.consumers = [[] for _ in self.trace]
+		for (c, (_, _, _, producers, _)) in enumerate(self.trace):
+			for p in set(producers) - {None}:
+				self.consumers[p] += [c]
+		self.reference = _Reference(spx, msg, self.sig)
+
+	def __len__(self):
+		return len(self.trace)
+
+	def component(self, c):
+		"""Returns the layer of call c (FORS, or None for PRF_msg and H_msg)."""
+		adrs = self.trace[c][1]
+		if adrs is None:
+			return None
+		adrs = ADRS(adrs)
+		if adrs.getWords(ADRS.SPX_TYPE_IDX, 1) in [ADRS.Type.FORSTREE, ADRS.Type.FORSPK]:
+			return FORS
+		return adrs.getWords(ADRS.SPX_LAYER_IDX, 1)
+
+	def _evaluate(self, c, inputs):
+		(name, adrs, _, _, _) = self.trace[c]
+		(hash, adrs, pk_seed) = (self.spx.hash, ADRS(adrs), self.spx.pk_seed)
+		if name == "F":
+			return Hash.F(hash, inputs[0], adrs, pk_seed)
+		if name == "H":
+			return Hash.H(hash, inputs[0], inputs[1], adrs, pk_seed)
+		return Hash.T_l(hash, inputs, adrs, pk_seed)
+
+	def signature(self, c):
+		"""Returns the signature with call c faulted."""
+		hash = self.spx.hash
+		hash.rng = random.Random(f"{self.seed}:{c}")
+		layer = self.component(c)
+		if layer is None:
+			hash.reset(self.fault._replace(call=c))
+			sig = self.spx.sign(self.msg)
+			hash.reset()
+			return sig
+
+		(_, _, inputs, _, out) = self.trace[c]
+		new = {c: hash.corrupt(self.fault, out, b''.join(inputs))}
+		downstream = set()
+		stack = [c]
+		while stack:
+			for d in self.consumers[stack.pop()]:
+				if d not in downstream:
+					downstream.add(d)
+					stack += [d]
+		for d in sorted(downstream):
+			(_, _, inputs, producers, _) = self.trace[d]
+			new[d] = self._evaluate(d, [new.get(p, x) for (p, x) in zip(producers, inputs)])
+
+		root = self.context.roots[layer+1]
+		root = new.get(self.producer[root], root)
+		sig = self.context.resign(layer, root) if root != self.context.roots[layer+1] else self.context.sign()
+		return _patch(sig, lambda x: new.get(self.producer.get(x), x))
+
+	def outcome(self, c):
+		"""Returns the Outcome of the fault of call c."""
+		sig = self.signature(c)
+		(exploitable, verifiable) = self.reference.classify(self.spx, self.msg, sig)
+		if exploitable:
+			return Outcome.VERIFIABLE if verifiable else Outcome.NONVERIFIABLE
+		return Outcome.VALID if sig == self.sig or self.spx.verify(self.msg, sig) else Outcome.INVALID
+
+def _outcomes(args):
+	(space_args, start, stop) = args
+	space = FaultSpace(*space_args)
+	return [(space.component(c), space.outcome(c)) for c in range(start, stop)]
+
+def enumerate_faults(instance, model=FaultModel.RANDOM, robust=False, seed=0, chunk=2**10, processes=None):
+	"""Returns the outcomes of the single faults of all the hash calls of a
+	signature (Enumeration), where the components are FORS, the layers, and None
+	(PRF_msg and H_msg).
+
+	Args:
+		instance (str or spx_inst): The SPHINCS+ instance (see SPHINCSplus).
+		model (FaultModel): The fault model.
+		robust (bool): Whether to use the robust tweakable hash functions.
+		seed: The seed of the keys, of the message and of the faulty values.
+		chunk (int): The number of calls per task.
+		processes (int): The number of processes (1 to run in this process,
+			None for os.cpu_count()).
+	"""
+	rng = random.Random(seed)
+	n = SPHINCSplus(instance).hash.n
+	keys = tuple(rng.randbytes(n) for _ in range(3)) # sk_seed, sk_prf, pk_seed
+	space_args = (instance, keys, rng.randbytes(n), model, robust, seed)
+	space = FaultSpace(*space_args)
+	calls = len(space)
+	tasks = [(space_args, start, min(start+chunk, calls)) for start in range(0, calls, chunk)]
+	if processes == 1:
+		outcomes = list(map(_outcomes, tasks))
+	else:
+		with ProcessPoolExecutor(max_workers=processes) as pool:
+			outcomes = list(pool.map(_outcomes, tasks))
+	tally = {}
+	for (component, outcome) in (o for task in outcomes for o in task):
+		tally.setdefault(component, Counter())[outcome] += 1
+	return Enumeration(tally, space.reference.digits)
@@ -0,0 +1,163 @@
+import hashlib
+import numpy as np
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# ------------------------------------------------------------------------------
+# FORS index coverage
+# ------------------------------------------------------------------------------
+#
+# Simulates the FORS leaves revealed by Q signatures, derived as in
+# SPHINCSplus.digest and FORS.to_baseA from H_msg(R, pk_seed, pk_root, msg)
+# (SHAKE256), and aggregates them per FORS key pair (tree_idx, leaf_idx).
+#
+# H_msg is modeled as a random oracle, hence R is drawn once per batch and the
+# messages are distinct counters: the state after R || pk_seed || pk_root is
+# absorbed once per batch, and copied for each message.
+
+# Revealed leaves: key pair and FORS indices of each signature
+Revealed = namedtuple("Revealed", "tree_idx leaf_idx indices")
+# Coverage of the key pairs hit by at least one signature
+Coverage = namedtuple("Coverage", "gamma revealed")
+
+# Number of set bits of each byte
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:,None], axis=1).sum(axis=1)
+
+def digest_lengths(spx):
+	"""Returns the byte lengths of (md, tree_idx, leaf_idx) in H_msg."""
+	return ((spx.k*spx.log_t+7)//8, (spx.h-spx.hp+7)//8, (spx.hp+7)//8)
+
+def _big_endian(D, bits):
+	"""Returns the big-endian integers of the rows of bytes D (at most 8),
+	truncated to their bits least significant bits."""
+	padded = np.zeros((len(D), 8), dtype=np.uint8)
+	padded[:, 8-D.shape[1]:] = D
+	return padded.view(">u8")[:,0].astype(np.uint64) & np.uint64((1 << bits) - 1)
+
+def decode(spx, D):
+	"""Returns the revealed leaves of H_msg digests, as SPHINCSplus.digest and
+	FORS.to_baseA (md read in little-endian order, k indices of log_t bits).
+
+	Args:
+		spx (spx_inst): The SPHINCS+ instance.
+		D (array): The digests, one row of bytes per signature.
+	"""
+	(md_len, tree_len, leaf_len) = digest_lengths(spx)
+	bits = np.unpackbits(D[:, :md_len], axis=1, bitorder='little')[:, :spx.k*spx.log_t]
+	indices = bits.reshape(len(D), spx.k, spx.log_t) @ (1 << np.arange(spx.log_t, dtype=np.uint32))
+	tree_idx = _big_endian(D[:, md_len:md_len+tree_len], spx.h-spx.hp)
+	leaf_idx = _big_endian(D[:, md_len+tree_len:md_len+tree_len+leaf_len], spx.hp).astype(np.uint32)
+	return Revealed(tree_idx, leaf_idx, indices.astype(np.uint32))
+
+def _digests(args):
+	"""Returns the revealed leaves of a batch of B signatures."""
+	(spx, pk_seed, pk_root, seed, B) = args
+	rng = np.random.default_rng(seed)
+	state = hashlib.shake_256(rng.bytes(spx.n) + pk_seed + pk_root)
+	prefix = rng.bytes(8)
+	m = sum(digest_lengths(spx))
+	D = bytearray()
+	for i in range(B):
+		h = state.copy()
+		h.update(prefix + i.to_bytes(8, 'little'))
+		D += h.digest(m)
+	return decode(spx, np.frombuffer(bytes(D), dtype=np.uint8).reshape(B, m))
+
+def simulate(spx, Q, pk_seed=None, pk_root=None, seed=0, batch=2**16, processes=None):
+	"""Returns the revealed leaves of Q random signatures.
+
+	Args:
+		spx (spx_inst): The SPHINCS+ instance.
+		Q (int): The number of signatures.
+		pk_seed, pk_root (bytes): The public key (random if None).
+		seed (int): The seed of the batches.
+		batch (int): The number of signatures per batch.
+		processes (int): The number of processes (os.cpu_count() if None).
+	"""
+	seeds = np.random.SeedSequence(seed).spawn(2 + (Q+batch-1)//batch)
+	pk_seed = pk_seed or np.random.default_rng(seeds[0]).bytes(spx.n)
+	pk_root = pk_root or np.random.default_rng(seeds[1]).bytes(spx.n)
+	jobs = [(spx, pk_seed, pk_root, s, min(batch, Q-start)) for (s, start) in zip(seeds[2:], range(0, Q, batch))]
+	with ProcessPoolExecutor(max_workers=processes) as pool:
+		batches = list(pool.map(_digests, jobs))
+	return Revealed(*(np.concatenate(columns) for columns in zip(*batches)))
+
+def key_pairs(spx, revealed, key_bits=None):
+	"""Returns the key pair of each signature as (ids, number of key pairs hit).
+
+	Args:
+		spx (spx_inst): The SPHINCS+ instance.
+		revealed (Revealed): The revealed leaves.
+		key_bits (int): Restricts the key pairs to the key_bits least significant
+			bits of tree_idx*2^hp + leaf_idx (all h bits if None), i.e., to a
+			hypertree of height key_bits, so as to observe many signatures per
+			key pair.
+	"""
+	if key_bits is None:
+		pairs = np.empty(len(revealed.tree_idx), dtype=[("tree", np.uint64), ("leaf", np.uint32)])
+		(pairs["tree"], pairs["leaf"]) = (revealed.tree_idx, revealed.leaf_idx)
+	else:
+		# Modulo 2^64 first, which keeps the least significant bits
+		pairs = ((revealed.tree_idx << np.uint64(spx.hp)) | revealed.leaf_idx) & np.uint64((1 << key_bits) - 1)
+	(_, ids) = np.unique(pairs, return_inverse=True)
+	return (ids.ravel(), int(ids.max()) + 1 if len(ids) else 0)
+
+def coverage(spx, revealed, key_bits=None):
+	"""Returns the number of signatures gamma of each key pair hit, and its
+	number of revealed leaves per FORS tree.
+
+	A key pair hit once reveals one leaf per tree. Revealed-leaf bitmaps (k
+	trees of t bits, packed) are only built for the key pairs hit several times.
+
+	Args:
+		spx (spx_inst): The SPHINCS+ instance.
+		revealed (Revealed): The revealed leaves.
+		key_bits (int): See key_pairs.
+
+	Returns:
+		Coverage(gamma (array of P), revealed (array of P x k))
+	"""
+	(ids, P) = key_pairs(spx, revealed, key_bits)
+	gamma = np.bincount(ids, minlength=P)
+	counts = np.ones((P, spx.k), dtype=np.int64)
+
+	multi = np.flatnonzero(gamma > 1)
+	if len(multi):
+		dense = np.full(P, -1)
+		dense[multi] = np.arange(len(multi))
+		rows = np.flatnonzero(dense[ids] >= 0)
+		bitmaps = np.zeros((len(multi), spx.k, ((1 << spx.log_t) + 7)//8), dtype=np.uint8)
+		idx = revealed.indices[rows]
+		np.bitwise_or.at(bitmaps, (dense[ids[rows]][:,None], np.arange(spx.k)[None,:], idx >> 3),
+		                 (1 << (idx & 7)).astype(np.uint8))
+		counts[multi] = _POPCOUNT[bitmaps].sum(axis=-1)
+	return Coverage(gamma, counts)
+
+def _log2sum(x):
+	"""Returns log2(sum(2^x)), without underflows."""
+	top = x.max()
+	return top + np.log2(np.exp2(x - top).sum())
+
+def forgery_log2pr(spx, cov, key_bits=None):
+	"""Returns the log2 of the probability that the FORS signature of a fresh
+	random message is forgeable from the revealed leaves, i.e., the average over
+	all key pairs of prod_i |revealed_i|/t (zero if the key pair was not hit)."""
+	log2pr = (np.log2(cov.revealed) - spx.log_t).sum(axis=1)
+	return _log2sum(log2pr) - (spx.h if key_bits is None else key_bits)
+
+def analytic_forgery_log2pr(spx, Q, key_bits=None):
+	"""Returns the log2 of the probability of forgery_log2pr for uniform digests,
+	i.e., the sum over gamma (Poisson distributed with mean Q/2^h) of
+	Pr(gamma)*(1-(1-1/t)^gamma)^k (see search.fors_security)."""
+	lam = Q/2.0**(spx.h if key_bits is None else key_bits)
+	gamma = np.arange(1, int(lam + 12*np.sqrt(lam)) + 32)
+	log2_pb = (-lam + gamma*np.log(lam) - np.cumsum(np.log(gamma)))/np.log(2)
+	return _log2sum(log2_pb + spx.k*np.log2(-np.expm1(gamma*np.log1p(-2.0**-spx.log_t))))
+
+def revealed_fraction(spx, cov, key_bits=None):
+	"""Returns the fraction of the FORS leaves revealed, over all key pairs."""
+	return cov.revealed.sum()/(spx.k*2.0**spx.log_t)/2.0**(spx.h if key_bits is None else key_bits)
+
+def analytic_revealed_fraction(spx, Q, key_bits=None):
+	"""Returns 1-(1-2^-(h+log_t))^Q, the expected fraction of revealed leaves."""
+	return -np.expm1(Q*np.log1p(-2.0**-(spx.log_t + (spx.h if key_bits is None else key_bits))))
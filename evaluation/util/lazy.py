@@ -0,0 +1,25 @@
+import importlib.util
+import sys
+
+# ------------------------------------------------------------------------------
+# Lazy imports
+# ------------------------------------------------------------------------------
+#
+# Heavy modules (e.g., numpy) are only loaded on the first access to one of
+# their attributes, so that the scripts that do not need them start fast.
+
+def lazy_import(name):
+	"""Returns the module name, loaded on first attribute access.
+
+	Args:
+		name (str): The absolute name of the module (e.g., "numpy").
+	"""
+	if name in sys.modules:
+		return sys.modules[name]
+	spec = importlib.util.find_spec(name)
+	loader = importlib.util.LazyLoader(spec.loader)
+	spec.loader = loader
+	module = importlib.util.module_from_spec(spec)
+	sys.modules[name] = module
+	loader.exec_module(module)
+	return module
@@ -0,0 +1,177 @@
+import numpy as np
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# ------------------------------------------------------------------------------
+# Monte Carlo validation
+# ------------------------------------------------------------------------------
+#
+# Simulates the random processes behind the formulas of combi.py and
+# cmplx_uf.py, so that their analytical values can be checked against
+# empirical estimates. Each sampler draws a batch of independent trials at
+# once with NumPy, and estimate splits the trials into batches, possibly run on
+# a process pool with independent random streams.
+
+# Empirical estimate and its confidence interval
+Estimate = namedtuple("Estimate", "mean lo hi trials")
+
+# Largest number of random values drawn at once by a sampler
+_MAX_DRAWS = 2**22
+
+def _chunks(B, per_trial):
+	"""Splits B trials into chunks of at most _MAX_DRAWS draws."""
+	size = max(1, _MAX_DRAWS//max(1, per_trial))
+	for start in range(0, B, size):
+		yield min(size, B-start)
+
+def _loads(rng, B, N, m):
+	"""Returns the loads of the N bins after m uniform throws, for B trials
+	(array of shape (B, N)), along with the bins of the throws (shape (B, m))."""
+	bins = rng.integers(N, size=(B, m))
+	rows = np.arange(B)[:,None]
+	return (np.bincount((rows*N + bins).ravel(), minlength=B*N).reshape(B, N), bins)
+
+# ------------------------------------------------------------------------------
+# Samplers (one value per trial)
+# ------------------------------------------------------------------------------
+
+def sample_break(rng, B, N, Mv, Mf):
+	"""Samples the event of combi.break_pb, i.e., no bin receives two faulty
+	balls (Mv = 0), or no bin receives balls of both types (Mv > 0).
+
+	Args:
+		rng (Generator): The random generator.
+		B (int): The number of trials.
+		N (int): The number of bins.
+		Mv (int): The number of valid balls.
+		Mf (int): The number of faulty balls.
+	"""
+	out = []
+	for b in _chunks(B, N + Mv + Mf):
+		(loads_f, bins_f) = _loads(rng, b, N, Mf)
+		if Mv == 0:
+			out += [loads_f.max(axis=1) < 2]
+		else:
+			(loads_v, _) = _loads(rng, b, N, Mv)
+			out += [~(loads_v[np.arange(b)[:,None], bins_f] > 0).any(axis=1)]
+	return np.concatenate(out)
+
+def sample_coverage(rng, B, N):
+	"""Samples the number of uniform throws required to cover N bins (see
+	combi.coverage_exp), as the sum of the geometric waiting times of each new
+	bin, i.e., with probability (N-i)/N once i bins are covered."""
+	p = (N - np.arange(N))/N
+	return np.concatenate([rng.geometric(p, size=(b, N)).sum(axis=1) for b in _chunks(B, N)])
+
+def sample_maxload(rng, B, N, Mf, Mv):
+	"""Samples the quantity of combi.maxload_exp, i.e., the maximum load of N
+	bins after Mf throws, plus one if a given bin receives one of Mv throws."""
+	out = []
+	for b in _chunks(B, N + Mf):
+		(loads, _) = _loads(rng, b, N, Mf)
+		out += [loads.max(axis=1) + (rng.binomial(Mv, 1/N, size=b) > 0)]
+	return np.concatenate(out)
+
+def sample_recomp(rng, B, N, C):
+	"""Samples the number of queries before absorption of the chain of
+	combi.recomp_matrix, i.e., of uniform queries to N W-OTS+ key pairs before
+	one of them is queried again after its eviction from a FIFO cache of size C.
+
+	In state i (i distinct key pairs queried so far), a query hits the cache
+	with probability min(C, i)/N, hence the chain stays a geometric number of
+	queries, and then moves forward (new key pair) rather than absorbs with
+	probability (N-i)/(N-min(C, i)). The trials still alive are kept as indices.
+
+	Args:
+		rng (Generator): The random generator.
+		B (int): The number of trials.
+		N (int): The number of W-OTS+ key pairs.
+		C (int): The cache size (C < N).
+	"""
+	queries = np.zeros(B)
+	alive = np.arange(B)
+	for i in range(N+1):
+		if not len(alive):
+			break
+		stay = min(C, i)/N
+		queries[alive] += rng.geometric(1-stay, size=len(alive))
+		alive = alive[rng.random(len(alive)) < (N-i)/(N*(1-stay))]
+	return queries
+
+def sample_grafting_chunk(rng, B, M, W):
+	"""Samples the grafting event of one W-OTS+ chunk (see cmplx_uf.grafting_pr),
+	i.e., one of M uniform faulty values in [0, W) is at most the uniform
+	value of the message to forge."""
+	out = []
+	for b in _chunks(B, M + 1):
+		x = rng.integers(W, size=b)
+		out += [rng.integers(W, size=(b, M)).min(axis=1) <= x]
+	return np.concatenate(out)
+
+# ------------------------------------------------------------------------------
+# Estimation
+# ------------------------------------------------------------------------------
+
+def _moments(args):
+	"""Returns (count, sum, sum of squares, boolean samples) of a batch of a
+	sampler."""
+	(sampler, seed, B, params) = args
+	x = sampler(np.random.default_rng(seed), B, *params)
+	boolean = x.dtype == bool
+	x = x.astype(np.float64)
+	return (len(x), x.sum(), (x*x).sum(), boolean)
+
+def estimate(sampler, *params, trials=10**6, batch=2**16, processes=1, seed=0, z=1.96):
+	"""Returns the empirical mean of a sampler with its confidence interval.
+
+	The trials are split into batches, each with its own random stream spawned
+	from seed, so that the estimate does not depend on the number of processes.
+	The interval is the normal one for means, and the Wilson one for
+	probabilities (boolean samplers), which remains valid for rare events.
+
+	Args:
+		sampler (function): One of the sample_* functions.
+		params: The parameters of the sampler (after rng and B).
+		trials (int): The number of trials.
+		batch (int): The number of trials per batch.
+		processes (int): The number of processes (1 to run in this process).
+		seed (int): The seed of the random streams.
+		z (float): The quantile of the confidence interval (1.96 for 95%).
+	"""
+	sizes = [min(batch, trials-start) for start in range(0, trials, batch)]
+	seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+	jobs = [(sampler, s, B, params) for (s, B) in zip(seeds, sizes)]
+	if processes == 1:
+		moments = list(map(_moments, jobs))
+	else:
+		with ProcessPoolExecutor(max_workers=processes) as pool:
+			moments = list(pool.map(_moments, jobs))
+	(n, s, s2, boolean) = map(sum, zip(*moments))
+
+	mean = s/n
+	if boolean:
+		return wilson(s, n, z)
+	half = z*np.sqrt(max(s2/n - mean*mean, 0)/n)
+	return Estimate(mean, mean-half, mean+half, n)
+
+def wilson(successes, n, z=1.96):
+	"""Returns the estimate of a probability from successes out of n trials,
+	with its Wilson interval."""
+	mean = successes/n
+	center = (mean + z*z/(2*n))/(1 + z*z/n)
+	half = z*np.sqrt(mean*(1-mean)/n + z*z/(4*n*n))/(1 + z*z/n)
+	return Estimate(mean, center-half, center+half, n)
+
+def estimate_grafting_pr(ell, M, W, **kwargs):
+	"""Returns the estimate of cmplx_uf.grafting_pr.
+
+	The ell chunks of a signature are independent, hence the per-chunk
+	probability is estimated and raised to the power ell, so that the
+	(typically tiny) probability of a whole signature is still measurable.
+	"""
+	e = estimate(sample_grafting_chunk, M, W, **kwargs)
+	return Estimate(e.mean**ell, max(e.lo, 0)**ell, min(e.hi, 1)**ell, e.trials)
+
+def agrees(value, e):
+	"""Returns whether an analytical value lies in the interval of an estimate."""
+	return e.lo <= value <= e.hi
@@ -0,0 +1,144 @@
+import numpy as np
+from collections import namedtuple
+
+from .cmplx_np import wots_len, fors_total_hashes, xmss_total_hashes, grafting_pr
+
+# ------------------------------------------------------------------------------
+# Parameter-space search
+# ------------------------------------------------------------------------------
+#
+# Enumerates the (h, d, log_t, k, W) configurations of a security level, along
+# with the number c of cached layers, scores them with the complexity models,
+# and keeps the Pareto front of the configurations within the budgets.
+#
+# The loop is over (h, d) only: the other parameters are NumPy axes, so that
+# millions of candidates are scored in seconds.
+
+# Number of signatures per key pair (Ref: SPHINCS+ round 3 specification)
+LOG_QSIGN = 64
+
+# Search space
+search_space = namedtuple("search_space", "h log_t k W hp_max")
+DEFAULT_SPACE = search_space(h=range(60, 73), log_t=range(4, 21), k=range(4, 65), W=[4, 16, 256], hp_max=16)
+
+# Objectives (minimized) and columns of the candidates
+OBJECTIVES = ["pr_expl", "graft_log2pr", "sig_bytes", "mem_bytes", "sign_hashes"]
+COLUMNS = ["n", "h", "d", "log_t", "k", "W", "c", "hp", "ell", "sec"] + OBJECTIVES
+
+def fors_security(h, log_t, k, log_q=LOG_QSIGN):
+	"""Returns the bit security of FORS against forgeries after 2^log_q
+	signatures, i.e., -log2 of the sum over gamma (the number of signatures with
+	a same FORS key pair, Poisson distributed) of Pr(gamma)*(1-(1-1/t)^gamma)^k.
+
+	Args:
+		h (int): The height of the hypertree.
+		log_t (array): The height of the FORS trees.
+		k (array): The number of FORS trees.
+		log_q (int): The log2 of the number of signatures.
+	"""
+	lam = 2.0**(log_q - h)
+	gamma = np.arange(1, int(lam + 12*np.sqrt(lam)) + 32)
+	log_pb = -lam + gamma*np.log(lam) - np.cumsum(np.log(gamma))
+	log_t = np.asarray(log_t, dtype=np.float64)[...,None]
+	k = np.asarray(k, dtype=np.float64)[...,None]
+	forge = np.exp(log_pb + k*np.log(-np.expm1(gamma*np.log1p(-np.exp2(-log_t))))).sum(axis=-1)
+	with np.errstate(divide='ignore'):
+		return -np.log2(forge)
+
+def score(n, h, d, log_t, k, W, c, M=2):
+	"""Returns the objectives of the configurations (broadcast arrays).
+
+	Pr(expl.) and the memory account for c cached layers, as in
+	analysis_caching_layers.py, and the grafting probability (of M faulty
+	signatures) is given in log2.
+
+	Args:
+		n (int): The security parameter (in bytes).
+		h, d (int): The height and the number of layers of the hypertree.
+		log_t, k, W, c (array): FORS, W-OTS+ and caching parameters.
+		M (int): The number of faulty signatures for grafting.
+	"""
+	hp = h//d
+	ell = wots_len(n, W)
+	f_total_h = fors_total_hashes(log_t, k)
+	x_total_h = xmss_total_hashes(ell, W, hp)
+	c = np.asarray(c, dtype=np.float64)
+
+	s_total_expl_h = np.maximum(d-c-1, 0)*x_total_h + np.where(c < d, f_total_h, 0)
+	s_total_h = f_total_h + (d-c)*x_total_h + c*(2**(hp-1)*(ell*(W-1)+2) + (2**hp) - 1)
+	cached = (2**hp)*(np.exp2(c*hp)-1)/(2**hp-1)
+
+	return {
+		"pr_expl": s_total_expl_h/s_total_h,
+		"graft_log2pr": ell*np.log2(grafting_pr(1, M, W)), # grafting_pr underflows
+		"sig_bytes": (1 + k*(log_t+1) + h + d*ell)*n,
+		"mem_bytes": cached*n*ell,
+		"sign_hashes": s_total_h,
+	}
+
+def pareto_front(Y, chunk=1024):
+	"""Returns the indices of the non-dominated rows of Y (minimized).
+
+	Rows are visited in lexicographic order, in which a row can only be
+	dominated by a previous one. Hence, each chunk of rows is compared once
+	against the front built so far and against itself.
+
+	Args:
+		Y (array): Objectives, one row per candidate.
+		chunk (int): Number of rows compared at once.
+	"""
+	order = np.lexsort(Y.T[::-1])
+	(front, idx) = (np.empty((0, Y.shape[1])), [])
+	for start in range(0, len(order), chunk):
+		rows = order[start:start+chunk]
+		y = Y[rows]
+		dominated = lambda f: ((f[None,:,:] <= y[:,None,:]).all(-1) & (f[None,:,:] < y[:,None,:]).any(-1)).any(-1)
+		keep = ~dominated(front) & ~dominated(y)
+		front = np.concatenate((front, y[keep]))
+		idx += list(rows[keep])
+	return np.array(idx, dtype=int)
+
+def search(n, space=DEFAULT_SPACE, max_sig_bytes=None, max_mem_bytes=None, objectives=OBJECTIVES, M=2):
+	"""Returns the Pareto front of the configurations of security level 8n bits
+	within the budgets.
+
+	A configuration is valid if d divides h, h/d <= hp_max, and FORS reaches
+	8n bits of security after 2^LOG_QSIGN signatures.
+
+	Args:
+		n (int): The security parameter (in bytes).
+		space (search_space): The enumerated parameters.
+		max_sig_bytes (int): The signature size budget (None if unbounded).
+		max_mem_bytes (int): The caching memory budget (None if unbounded).
+		objectives (list): The minimized objectives (among OBJECTIVES).
+		M (int): The number of faulty signatures for grafting.
+
+	Returns:
+		(dict of arrays, one per column of COLUMNS, number of candidates)
+	"""
+	(log_t, k, W) = np.meshgrid(np.asarray(space.log_t), np.asarray(space.k), np.asarray(space.W), indexing='ij')
+	candidates = {col: [] for col in COLUMNS}
+	total = 0
+	for h in space.h:
+		sec = np.broadcast_to(fors_security(h, log_t[:,:1,0], k[:1,:,0])[...,None], log_t.shape)
+		for d in [d for d in range(1, h+1) if h % d == 0 and h//d <= space.hp_max]:
+			# Cached layers along the last axis
+			c = np.arange(d+1)
+			scores = score(n, h, d, log_t[...,None], k[...,None], W[...,None], c, M)
+			shape = np.broadcast_shapes(log_t.shape + (1,), c.shape)
+			total += np.prod(shape)
+
+			valid = np.broadcast_to((sec >= 8*n)[...,None], shape)
+			if max_sig_bytes is not None:
+				valid = valid & (scores["sig_bytes"] <= max_sig_bytes)
+			if max_mem_bytes is not None:
+				valid = valid & (scores["mem_bytes"] <= max_mem_bytes)
+
+			columns = {"n": n, "h": h, "d": d, "log_t": log_t[...,None], "k": k[...,None], "W": W[...,None],
+			           "c": c, "hp": h//d, "ell": wots_len(n, W[...,None]), "sec": sec[...,None], **scores}
+			for col in COLUMNS:
+				candidates[col] += [np.broadcast_to(columns[col], shape)[valid]]
+
+	candidates = {col: np.concatenate(values) for (col, values) in candidates.items()}
+	front = pareto_front(np.stack([candidates[o] for o in objectives], axis=1))
+	return ({col: values[front] for (col, values) in candidates.items()}, total)
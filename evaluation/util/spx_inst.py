@@ -1,5 +1,9 @@
+import os
+import sys
 from collections import namedtuple
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
 # SPHINCS+ parameters
 spx_inst = namedtuple("spx_inst", "n h d log_t k W ell hp")
 
@@ -12,4 +16,24 @@ SPHINCSPLUS_INSTANCES = {
 	"192f": spx_inst(n=24, h=66, d=22, log_t=8,  k=33, W=16, ell = 51, hp=3),
 	"256s": spx_inst(n=32, h=64, d=8,  log_t=14, k=22, W=16, ell = 67, hp=8),
 	"256f": spx_inst(n=32, h=68, d=17, log_t=10, k=30, W=16, ell = 67, hp=4)
-}
\ No newline at end of file
+}
+
+def toy_inst(n, h, d, a, k, w):
+	"""Returns the entry of the complexity models of the SPHINCS+ instance with
+	the parameters of SPHINCSplus.spx_inst (e.g., a reduced "toy" instance).
+	"""
+	W = 2**w
+	len1 = -(-8*n//w)
+	len2 = ((len1*(W-1)).bit_length()-1)//w + 1
+	return spx_inst(n=n, h=h, d=d, log_t=a, k=k, W=W, ell=len1+len2, hp=h//d)
+
+def __getattr__(name):
+	"""Derives the reduced instances, TOY_INSTANCES, from the ones of
+	SPHINCSplus.TOY_INSTANCES on first access, so that the scripts that do not
+	need them do not import SPHINCSplus (see lazy.py).
+	"""
+	if name == "TOY_INSTANCES":
+		from SPHINCSplus import TOY_INSTANCES as SPX_TOY_INSTANCES
+		globals()[name] = {toy: toy_inst(**inst._asdict()) for (toy, inst) in SPX_TOY_INSTANCES.items()}
+		return globals()[name]
+	raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,136 @@
+import csv
+import hashlib
+import inspect
+import json
+import os
+import sys
+from collections import namedtuple
+import concurrent.futures # ProcessPoolExecutor (and multiprocessing) loaded on first use
+
+# ------------------------------------------------------------------------------
+# Sweep runner
+# ------------------------------------------------------------------------------
+#
+# A table is a list of independent cells, i.e., calls fn(*args, **kwargs) of a
+# module-level function. The cells of one or several tables are run at once on
+# a process pool, and their results are memoized on disk, keyed by the
+# function, its arguments and the source of the modules it depends on, so that
+# only the cells whose code or parameters changed are recomputed.
+
+Cell = namedtuple("Cell", "fn args kwargs")
+
+def cell(fn, *args, **kwargs):
+	return Cell(fn, args, kwargs)
+
+def source_hash(fn):
+	"""Returns the hash of the source of the module of fn, and of the modules of
+	the same package that it refers to (e.g., util.cmplx_spx for util.cmplx_uf).
+
+	Args:
+		fn (function): A module-level function.
+	"""
+	package = fn.__module__.split('.')[0]
+	modules = {sys.modules[fn.__module__]}
+	for value in list(fn.__globals__.values()):
+		module = inspect.getmodule(value)
+		if module is not None and module.__name__.split('.')[0] == package and getattr(module, '__file__', None):
+			modules.add(module)
+	h = hashlib.sha256()
+	for module in sorted(modules, key=lambda m: m.__name__):
+		h.update(inspect.getsource(module).encode())
+	return h.hexdigest()
+
+def _jsonable(x):
+	"""Converts NumPy values (and containers of them) to plain Python."""
+	if hasattr(x, 'tolist'):
+		return x.tolist()
+	if isinstance(x, (list, tuple)):
+		return [_jsonable(y) for y in x]
+	if isinstance(x, dict):
+		return {k: _jsonable(v) for (k, v) in x.items()}
+	return x
+
+# Source hashes computed so far, per function
+_SOURCE_HASHES = {}
+
+def cell_key(c):
+	"""Returns the memo key of a cell."""
+	if c.fn not in _SOURCE_HASHES:
+		_SOURCE_HASHES[c.fn] = source_hash(c.fn)
+	ident = [c.fn.__module__, c.fn.__qualname__, _SOURCE_HASHES[c.fn], _jsonable(list(c.args)), _jsonable(c.kwargs)]
+	return hashlib.sha256(json.dumps(ident, sort_keys=True, default=repr).encode()).hexdigest()
+
+class Memo:
+	"""On-disk memo of cell results, one JSON file per cell.
+
+	Args:
+		path (str): Folder of the memo (created if it does not exist).
+	"""
+
+	def __init__(self, path):
+		self.path = path
+		os.makedirs(path, exist_ok=True)
+
+	def get(self, key):
+		"""Returns (True, result) if the cell was memoized, (False, None) otherwise."""
+		try:
+			with open(os.path.join(self.path, f"{key}.json")) as f:
+				return (True, json.load(f)["result"])
+		except (FileNotFoundError, json.JSONDecodeError, KeyError):
+			return (False, None)
+
+	def put(self, key, c, result):
+		path = os.path.join(self.path, f"{key}.json")
+		with open(f"{path}.tmp", 'w') as f:
+			json.dump({"fn": f"{c.fn.__module__}.{c.fn.__qualname__}", "args": _jsonable(list(c.args)),
+			           "kwargs": _jsonable(c.kwargs), "result": result}, f)
+		os.replace(f"{path}.tmp", path) # atomic, so that an interrupted sweep leaves no partial cell
+
+def _run(c):
+	return _jsonable(c.fn(*c.args, **c.kwargs))
+
+def run(cells, memo=None, processes=None):
+	"""Returns the results of the cells (in order), computing on a process pool
+	only the ones that are not memoized.
+
+	Args:
+		cells (list): The cells (see cell).
+		memo (Memo): The on-disk memo (None to recompute everything).
+		processes (int): The number of processes (os.cpu_count() if None).
+	"""
+	keys = [cell_key(c) for c in cells]
+	results = {}
+	if memo is not None:
+		for key in set(keys):
+			(hit, result) = memo.get(key)
+			if hit:
+				results[key] = result
+
+	# Compute each missing cell once
+	todo = {key: c for (key, c) in zip(keys, cells) if key not in results}
+	if todo:
+		with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as pool:
+			for (key, result) in zip(todo, pool.map(_run, todo.values())):
+				results[key] = result
+				if memo is not None:
+					memo.put(key, todo[key], result)
+	return [results[key] for key in keys]
+
+# ------------------------------------------------------------------------------
+# Outputs
+# ------------------------------------------------------------------------------
+
+def write_table(path, rows):
+	"""Writes the rows of a table (list of dict) to path.csv and path.json.
+
+	Args:
+		path (str): Path of the outputs, without extension.
+		rows (list): The rows, all with the same keys.
+	"""
+	os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+	with open(f"{path}.json", 'w') as f:
+		json.dump(_jsonable(rows), f, indent=1)
+	with open(f"{path}.csv", 'w', newline='') as f:
+		writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else [])
+		writer.writeheader()
+		writer.writerows(_jsonable(rows))
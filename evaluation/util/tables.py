@@ -0,0 +1,38 @@
+import os
+import pickle
+
+# ------------------------------------------------------------------------------
+# Persistent constant tables
+# ------------------------------------------------------------------------------
+#
+# Constant tables (e.g., the rows of Stirling's numbers in combi.py) are kept on
+# disk between runs, one pickle file per table. The files are named after
+# TABLES_VERSION, to bump whenever the definition of a table changes, so that
+# stale tables are never read.
+
+TABLES_VERSION = 1
+TABLES_DIR = os.environ.get("SPX_TABLES_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache"))
+
+def _table_path(name):
+	return os.path.join(TABLES_DIR, f"{name}.v{TABLES_VERSION}.pickle")
+
+def load_table(name, default=None):
+	"""Returns the table saved under name, or default if there is none (or if
+	it cannot be read)."""
+	try:
+		with open(_table_path(name), 'rb') as f:
+			return pickle.load(f)
+	except (OSError, EOFError, pickle.UnpicklingError):
+		return default
+
+def save_table(name, table):
+	"""Saves a table under name, atomically (concurrent processes may save the
+	same table). Failures are ignored, the table is then rebuilt next time."""
+	path = _table_path(name)
+	try:
+		os.makedirs(TABLES_DIR, exist_ok=True)
+		with open(f"{path}.{os.getpid()}.tmp", 'wb') as f:
+			pickle.dump(table, f, protocol=pickle.HIGHEST_PROTOCOL)
+		os.replace(f"{path}.{os.getpid()}.tmp", path)
+	except OSError:
+		pass
@@ -0,0 +1,255 @@
+from bisect import bisect_right
+from collections import namedtuple
+from itertools import accumulate
+
+# ------------------------------------------------------------------------------
+# Execution timeline of a SPHINCS+ signature
+# ------------------------------------------------------------------------------
+#
+# The signing procedure (SPHINCSplus.sign) is modeled as a sequence of hash
+# function calls, in the order in which they are executed:
+#
+#   PRF_msg, H_msg                      (layer None, structure "msg")
+#   FORS trees, then T_k                (layer FORS, structures "fors" and "fors_pk")
+#   XMSS layers 0..d-1: W-OTS+ leaves,  (layer l, structure "wots")
+#   then tree nodes level by level      (layer l, structure "xmss")
+#
+# The XMSS layers are numbered as in the addresses (see SPHINCSplus.ADRS and
+# SPHINCSplus.fault_sign), and FORS as in fault_space.py.
+#
+# The calls are those counted in cmplx_spx (i.e., the roots are obtained from
+# treehash, and not recomputed with keyextract), each weighted by its cost. By
+# default, the cost of a call is its number of Keccak-f permutations, which
+# dominates the execution time on the target.
+#
+# Calls are grouped in segments, i.e., a pattern of calls repeated a number of
+# times, so that the timeline of a whole signature (millions of calls) remains
+# small.
+
+# Rate of SHAKE256 (in bytes)
+SHAKE256_RATE = 136
+# Bytelength of an address
+ADRS_LEN = 32
+# Layer of the FORS calls (as fault_space.FORS)
+FORS = -1
+
+Segment = namedtuple("Segment", "layer structure pattern reps exploitable verifiable")
+HashCall = namedtuple("HashCall", "index layer structure offset func exploitable verifiable")
+
+def keccak_blocks(inlen, outlen, rate=SHAKE256_RATE):
+	"""Returns the number of Keccak-f permutations of a SHAKE call.
+
+	Args:
+		inlen (int): Bytelength of the input.
+		outlen (int): Bytelength of the output.
+		rate (int): Rate of the sponge (in bytes).
+	"""
+	return inlen//rate + 1 + (outlen-1)//rate
+
+def call_costs(spx, robust=False, msglen=32):
+	"""Returns the default cost of each hash function call.
+
+	Args:
+		spx (spx_inst): The SPHINCS+ instance.
+		robust (bool): Robust variant (masks derived with an extra SHAKE call).
+		msglen (int): Bytelength of the signed message.
+	"""
+	n = spx.n
+	m = (spx.k*spx.log_t+7)//8 + (spx.h-spx.h//spx.d+7)//8 + (spx.h//spx.d+7)//8
+	mask = lambda l: keccak_blocks(n+ADRS_LEN, l) if robust else 0
+	return {
+		"PRF_msg": keccak_blocks(2*n+msglen, n),
+		"H_msg": keccak_blocks(3*n+msglen, m),
+		"PRF": keccak_blocks(n+ADRS_LEN, n),
+		"F": keccak_blocks(2*n+ADRS_LEN, n) + mask(n),
+		"H": keccak_blocks(3*n+ADRS_LEN, n) + mask(2*n),
+		"T_l": keccak_blocks((spx.ell+1)*n+ADRS_LEN, n) + mask(spx.ell*n),
+		"T_k": keccak_blocks((spx.k+1)*n+ADRS_LEN, n) + mask(spx.k*n),
+	}
+
+def _split(layer, structure, pattern, reps, idx, exploitable):
+	"""Segments of reps patterns, where the idx-th one is non-verifiable."""
+	return [Segment(layer, structure, pattern, r, exploitable, v)
+	        for (r, v) in [(idx, True), (1, False), (reps-idx-1, True)] if r > 0]
+
+def _treehash(layer, structure, height, leaf_idx, exploitable, verifiable=True):
+	"""Segments of the tree nodes computed by treehash, level by level (the
+	nodes on the path from the signed leaf to the root are non-verifiable)."""
+	segments = []
+	for h in range(1, height+1):
+		if verifiable:
+			segments += _split(layer, structure, ("H",), 2**(height-h), leaf_idx >> h, exploitable)
+		else:
+			segments += [Segment(layer, structure, ("H",), 2**(height-h), exploitable, False)]
+	return segments
+
+def _xmss(spx, layer, leaf_idx, exploitable, verifiable=True):
+	"""Segments of an XMSS tree signing its leaf_idx-th leaf."""
+	leaf = (("PRF",) + ("F",)*(spx.W-1))*spx.ell + ("T_l",)
+	if verifiable:
+		segments = _split(layer, "wots", leaf, 2**spx.hp, leaf_idx, exploitable)
+	else:
+		segments = [Segment(layer, "wots", leaf, 2**spx.hp, exploitable, False)]
+	return segments + _treehash(layer, "xmss", spx.hp, leaf_idx, exploitable, verifiable)
+
+def sign_segments(spx, leaf_idx=None, fors_idx=None):
+	"""Returns the segments of a whole SPHINCS+ signature.
+
+	A fault is exploitable if it alters the message signed by a W-OTS+ key pair
+	below the top layer, and verifiable if the faulty signature still verifies
+	(as counted by cmplx_spx). The latter depends on the signed leaves, which
+	do not change the number of calls.
+
+	Args:
+		spx (spx_inst): The SPHINCS+ instance.
+		leaf_idx (list): Index of the signed leaf in each XMSS layer (0 if None).
+		fors_idx (list): Index of the signed leaf in each FORS tree (0 if None).
+	"""
+	leaf_idx = leaf_idx or [0]*spx.d
+	fors_idx = fors_idx or [0]*spx.k
+	t = 2**spx.log_t
+
+	segments = [Segment(None, "msg", ("PRF_msg",), 1, False, True),
+	            Segment(None, "msg", ("H_msg",), 1, True, False)]
+	for i in range(spx.k):
+		segments += _split(FORS, "fors", ("PRF", "F"), t, fors_idx[i], True)
+		segments += _treehash(FORS, "fors", spx.log_t, fors_idx[i], True)
+	segments += [Segment(FORS, "fors_pk", ("T_k",), 1, True, False)]
+	for l in range(spx.d):
+		segments += _xmss(spx, l, leaf_idx[l], l < spx.d-1, verifiable=l < spx.d-1)
+	return segments
+
+def experiment_segments(spx, leaf_idx=0, layer=0):
+	"""Returns the segments of the signature computed in the experiments (see
+	sign_straight and sign_cached in simpleserial-sphincsplus.c), i.e., an XMSS
+	tree whose root is signed by a W-OTS+ key pair of the next layer.
+
+	Args:
+		spx (spx_inst): The SPHINCS+ instance.
+		leaf_idx (int): Index of the signed leaf in the XMSS tree.
+		layer (int): Layer of the XMSS tree (0..d-2, as in the addresses).
+	"""
+	if not 0 <= layer < spx.d-1:
+		raise ValueError(f"No W-OTS+ key pair signs the layer {layer} (d = {spx.d})")
+	leaf = (("PRF",) + ("F",)*(spx.W-1))*spx.ell + ("T_l",)
+	return _xmss(spx, layer, leaf_idx, True) + [Segment(layer+1, "wots", leaf, 1, False, False)]
+
+class Timeline:
+	"""Maps the time elapsed in a signature to the hash function call running
+	at that time.
+
+	Args:
+		segments (list): Segments of the signature, in execution order.
+		costs (dict): Cost of each hash function call.
+	"""
+
+	def __init__(self, segments, costs):
+		self.segments = segments
+		self.costs = costs
+		self.pattern_costs = [list(accumulate(costs[f] for f in s.pattern)) for s in segments]
+		seg_calls = [len(s.pattern)*s.reps for s in segments]
+		seg_costs = [c[-1]*s.reps for (c, s) in zip(self.pattern_costs, segments)]
+		self.call_starts = [0] + list(accumulate(seg_calls))
+		self.cost_starts = [0] + list(accumulate(seg_costs))
+
+		# Index of the first call of each segment within its structure
+		self.bases = []
+		count = {}
+		for (s, c) in zip(segments, seg_calls):
+			self.bases += [count.get((s.layer, s.structure), 0)]
+			count[(s.layer, s.structure)] = self.bases[-1] + c
+
+	def __len__(self):
+		return self.call_starts[-1]
+
+	def duration(self):
+		"""Returns the total cost of the signature."""
+		return self.cost_starts[-1]
+
+	def at(self, offset):
+		"""Returns the hash function call running at a relative time offset.
+
+		Args:
+			offset (float): Time offset, relative to the signature's duration (in [0, 1)).
+		"""
+		c = min(max(offset, 0), 1)*self.duration()
+		i = min(bisect_right(self.cost_starts, c) - 1, len(self.segments)-1)
+		s = self.segments[i]
+		pattern_costs = self.pattern_costs[i]
+		(rep, c) = divmod(c - self.cost_starts[i], pattern_costs[-1])
+		if rep >= s.reps: # End of the signature
+			(rep, c) = (s.reps-1, pattern_costs[-1])
+		j = min(bisect_right(pattern_costs, c), len(s.pattern)-1)
+		k = int(rep)*len(s.pattern) + j
+		return HashCall(self.call_starts[i] + k, s.layer, s.structure, self.bases[i] + k,
+		                s.pattern[j], s.exploitable, s.verifiable)
+
+	def count(self, exploitable=None, verifiable=None):
+		"""Returns the number of calls matching the given fault properties.
+
+		Args:
+			exploitable (bool): Exploitable calls only if True (or not, if False).
+			verifiable (bool): Verifiable calls only if True (or not, if False).
+		"""
+		return sum(len(s.pattern)*s.reps for s in self.segments
+		           if exploitable in [None, s.exploitable] and verifiable in [None, s.verifiable])
+
+	def windows(self, exploitable=True, verifiable=None):
+		"""Returns the time windows during which faults have the given properties,
+		as a list of (start, end) relative offsets.
+
+		Args:
+			exploitable (bool): Exploitable faults if True (or not, if False).
+			verifiable (bool): Verifiable faults if True (or not, if False).
+		"""
+		windows = []
+		for (s, start, end) in zip(self.segments, self.cost_starts, self.cost_starts[1:]):
+			if exploitable in [None, s.exploitable] and verifiable in [None, s.verifiable]:
+				(start, end) = (start/self.duration(), end/self.duration())
+				if windows and windows[-1][1] == start:
+					windows[-1] = (windows[-1][0], end)
+				else:
+					windows += [(start, end)]
+		return windows
+
+	def schedule(self, exploitable=True, verifiable=None):
+		"""Returns a glitch schedule spreading M glitches uniformly over the time
+		windows during which faults have the given properties.
+
+		The schedule is called as schedule(i, M) for the i-th glitch out of M,
+		and returns the relative time offset of the glitch (see run_exp1 and
+		run_exp2 in cwfaultexp.py).
+
+		Args:
+			exploitable (bool): Exploitable faults if True (or not, if False).
+			verifiable (bool): Verifiable faults if True (or not, if False).
+		"""
+		windows = self.windows(exploitable, verifiable)
+		assert windows, "No fault has the requested properties"
+		ends = list(accumulate(end - start for (start, end) in windows))
+
+		def schedule(i, M):
+			q = (i+1)/(M+1)*ends[-1]
+			w = min(bisect_right(ends, q), len(windows)-1)
+			return windows[w][1] - (ends[w] - q)
+		schedule.__name__ = f"schedule_{'exploitable' if exploitable else 'any'}"
+		return schedule
+
+def sign_timeline(spx, leaf_idx=None, fors_idx=None, robust=False, msglen=32, costs=None):
+	"""Returns the timeline of a whole SPHINCS+ signature (see sign_segments).
+
+	Args:
+		costs (dict): Cost of each hash function call (call_costs if None),
+			e.g., measured on the target.
+	"""
+	return Timeline(sign_segments(spx, leaf_idx, fors_idx), costs or call_costs(spx, robust, msglen))
+
+def experiment_timeline(spx, leaf_idx=0, layer=0, robust=True, costs=None):
+	"""Returns the timeline of the signature computed in the experiments (see
+	experiment_segments).
+
+	Args:
+		costs (dict): Cost of each hash function call (call_costs if None),
+			e.g., measured on the target.
+	"""
+	return Timeline(experiment_segments(spx, leaf_idx, layer), costs or call_costs(spx, robust))
@@ -103,6 +103,36 @@ unsigned char sig[EXP_SIG_BYTES]  = { 0x00 };
 uint8_t cache[CACHE_SIZE] = { 0x0000 };
 uint8_t cache_idx = 0;
 
+/* Number of cache entries patched per command (synchronized with python tools) */
+#define CACHE_BATCH 30
+
+/* Limits of simpleserial: the stock ones are assumed unless simpleserial.h
+ * defines them (they are usually defined in simpleserial.c, in which case
+ * pass them with -D if your build differs) */
+#ifndef MAX_SS_CMDS
+#define MAX_SS_CMDS 16
+#endif
+#ifndef MAX_SS_LEN
+#define MAX_SS_LEN 64
+#endif
+
+/* Registered commands: 3 by simpleserial ('v', 'w', 'y') and 9 to attack
+ * SPHINCS+, then 6 for testing purpose (registered last, so that only those
+ * are dropped when MAX_SS_CMDS is reached) */
+#define SS_CMDS (3 + 9)
+#define SS_TEST_CMDS 6
+#if SS_CMDS > MAX_SS_CMDS
+#error "Too many simpleserial commands: increase MAX_SS_CMDS in simpleserial.c"
+#endif
+#if defined(ENABLE_TESTS) && SS_CMDS + SS_TEST_CMDS > MAX_SS_CMDS
+#warning "Some test commands are not registered: increase MAX_SS_CMDS in simpleserial.c"
+#endif
+
+/* Payloads are rejected unless shorter than MAX_SS_LEN */
+#if 2 + 2*CACHE_BATCH >= MAX_SS_LEN
+#error "Payload of 'f' (patch_cache) too long: decrease CACHE_BATCH (here and in cwcache.py)"
+#endif
+
 /* ========================================================================== */
 /*                             INTERNAL FUNCTIONS                             */
 /* ========================================================================== */
@@ -458,6 +488,33 @@ uint8_t fill_cache(uint8_t* in_addr, uint8_t len)
     return 0x00;
 }
 
+uint8_t get_cache(uint8_t* m, uint8_t len)
+{ // Get cache state (cache_idx || cache)
+    size_t i = 0;
+
+    putch(cache_idx);
+    for (i = 0; i < CACHE_SIZE; ++i)
+    {
+        putch(cache[i]);
+    }
+
+    return 0x00;
+}
+
+uint8_t patch_cache(uint8_t* m, uint8_t len)
+{ // Patch cache entries (count || cache_idx || (slot || addrs) * CACHE_BATCH)
+    uint8_t i = 0;
+
+    for (i = 0; i < m[0] && i < CACHE_BATCH; ++i)
+        if (m[2+2*i] < CACHE_SIZE)
+            cache[m[2+2*i]] = m[3+2*i];
+
+    if (m[1] < CACHE_SIZE)
+        cache_idx = m[1];
+
+    return 0x00;
+}
+
 uint8_t sign_cached(uint8_t* in_addr, uint8_t len)
 {
     unsigned char root[SPX_N] = { 0x00 };
@@ -550,16 +607,6 @@ int main(void)
 
     /* Functions programmed to attack SPHINCS+ */
 
-    /* Additional (optional) functions for testing purpose */
-    #ifdef ENABLE_TESTS
-    simpleserial_addcmd('a', SPX_N, test_thash);
-    simpleserial_addcmd('b', SPX_N, test_wotsplus);
-    simpleserial_addcmd('c', SPX_N, test_merkle);
-    simpleserial_addcmd('d', SPX_FORS_MSG_BYTES, test_fors);
-    simpleserial_addcmd('e', SPHINCSPLUS_MSG_BYTES, test_sphincsplus);
-    simpleserial_addcmd('t', 1, test_trig);
-    #endif
-
     simpleserial_addcmd('k', SPHINCSPLUS_SK_BYTES, set_key);
     simpleserial_addcmd('p', 0, get_pk);
     simpleserial_addcmd('r', 2, get_sig);
@@ -568,6 +615,19 @@ int main(void)
     simpleserial_addcmd('x', 8, sign_straight);
     simpleserial_addcmd('q', 8, fill_cache);
     simpleserial_addcmd('z', 8, sign_cached);
+    simpleserial_addcmd('g', 0, get_cache);
+    simpleserial_addcmd('f', 2+2*CACHE_BATCH, patch_cache);
+
+    /* Additional (optional) functions for testing purpose, registered last
+     * (see SS_CMDS) */
+    #ifdef ENABLE_TESTS
+    simpleserial_addcmd('a', SPX_N, test_thash);
+    simpleserial_addcmd('b', SPX_N, test_wotsplus);
+    simpleserial_addcmd('c', SPX_N, test_merkle);
+    simpleserial_addcmd('d', SPX_FORS_MSG_BYTES, test_fors);
+    simpleserial_addcmd('e', SPHINCSPLUS_MSG_BYTES, test_sphincsplus);
+    simpleserial_addcmd('t', 1, test_trig);
+    #endif
 
     /* Note: letters 'y', 'w', 'v' are already assigned (see simpleserial.c) */
 
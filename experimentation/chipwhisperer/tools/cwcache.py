@@ -0,0 +1,167 @@
+import time
+import datetime
+
+from cwsetup import reset_target, log_info
+
+# Default constants (synchronized with simpleserial-sphincsplus.c)
+CACHE_SIZE = 171  # Number of cached addresses
+CACHE_BATCH = 30  # Number of cache entries patched per command (2+2*CACHE_BATCH < MAX_SS_LEN)
+
+class CacheMirror:
+    """
+    Host-side mirror of the target's cache.
+
+    The target caches the last CACHE_SIZE addresses that it signed in a ring
+    buffer initialized with zeros (see fill_cache and sign_cached in
+    simpleserial-sphincsplus.c). The mirror replicates the same buffer and
+    eviction order, so that it predicts exactly which addresses hit.
+
+    @input size  Size of the cache
+    """
+    def __init__(self, size=CACHE_SIZE):
+        self.entries = [0]*size
+        self.idx = 0
+
+    def __contains__(self, adrs):
+        """
+        @input adrs  Cached address (one byte, as sent in the input)
+        """
+        return int.from_bytes(adrs, byteorder='big') in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def insert(self, adrs):
+        """
+        Cache an address, evicting the oldest one.
+
+        @input adrs  Address to cache (one byte)
+        """
+        self.entries[self.idx] = int.from_bytes(adrs, byteorder='big')
+        self.idx = (self.idx + 1) % len(self.entries)
+
+    def access(self, adrs):
+        """
+        Look up an address as the target does when asked to sign it.
+
+        @input adrs  Address to look up (one byte)
+        @output True if cache hit (otherwise, the address is cached)
+        """
+        if adrs in self:
+            return True
+        self.insert(adrs)
+        return False
+
+    def diff(self, entries, idx):
+        """
+        Entries to patch so that the given cache state matches the mirror.
+
+        @input entries  Cached addresses (list of int)
+        @input idx      Index of the next cache entry to evict
+        @output List of (slot, address) that differ, and whether idx differs
+        """
+        patch = [(slot, a) for (slot, (a, b)) in enumerate(zip(self.entries, entries)) if a != b]
+        return (patch, idx != self.idx)
+
+    def dump(self):
+        return {'entries': bytes(self.entries).hex(), 'idx': self.idx}
+
+    @classmethod
+    def load(cls, state):
+        mirror = cls(len(state['entries'])//2)
+        mirror.entries = list(bytes.fromhex(state['entries']))
+        mirror.idx = state['idx']
+        return mirror
+
+    def __str__(self):
+        return ', '.join([f"{a:02x}" for a in self.entries])
+
+def query_cache(target, size=CACHE_SIZE):
+    """
+    Read the state of the target's cache ('g': get_cache).
+
+    @input target  ChipWhisperer's target (target = cw.target(scope))
+    @input size    Size of the cache
+    @output (entries, idx) or None if the target did not answer properly
+    """
+    target.simpleserial_write('g', b'')
+    time.sleep(0.05)
+    out = target.read(num_char=1+size+4)
+    if len(out) != 1+size+4:
+        return None
+    out = out[:-4].encode('latin-1')
+    return (list(out[1:]), out[0])
+
+def patch_cache(target, patch, idx, timeout=500):
+    """
+    Patch up to CACHE_BATCH entries of the target's cache and set its eviction
+    index ('f': patch_cache).
+
+    @input target   ChipWhisperer's target (target = cw.target(scope))
+    @input patch    List of (slot, address) to write
+    @input idx      Index of the next cache entry to evict
+    @input timeout  Time to wait for the acknowledgement (in ms)
+    @output True if the target acknowledged the command
+    """
+    assert len(patch) <= CACHE_BATCH, f"Too many entries in a single batch ({len(patch)} > {CACHE_BATCH})"
+    inp = bytes([len(patch), idx]) + b''.join([bytes([slot, a]) for (slot, a) in patch])
+    inp += b'\x00'*(2 + 2*CACHE_BATCH - len(inp))
+    target.simpleserial_write('f', inp)
+    return target.simpleserial_wait_ack(timeout=timeout) is not None
+
+def resync_cache(target, scope, cached, reset=False, retries=3, max_resets=3, f_log=None, p=True):
+    """
+    Synchronize the target's cache with its local mirror, by sending only the
+    entries that differ, in batches. The target is reset if it does not
+    answer (and then, all the non-zero entries are sent), and an error is
+    raised if it still does not after max_resets resets (e.g., firmware
+    without the commands 'g' and 'f').
+
+    @input target      ChipWhisperer's target (target = cw.target(scope))
+    @input scope       Chipwhisperer's scope (scope = cw.scope())
+    @input cached      Local state of the cache (CacheMirror)
+    @input reset       Reset the target first if True
+    @input retries     Number of attempts before resetting the target
+    @input max_resets  Number of resets (besides the requested one) before
+                       giving up
+    @input f_log       Log file
+    @input p           Print on console if True
+    """
+    now = datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
+    log_info(f"{now}: Synchronizing cache ...", f_log=f_log, p=p)
+    attempts = 0
+    resets = 0
+    while True:
+        if reset or attempts >= retries:
+            if not reset:
+                resets += 1
+                if resets > max_resets:
+                    raise RuntimeError(f"Cache not synchronized after {max_resets} resets (does the firmware implement the commands 'g' and 'f'?)")
+            reset_target(scope)
+            target.flush()
+            (reset, attempts) = (False, 0)
+        attempts += 1
+
+        # 1. Retrieve what is missing in the target's cache
+        state = query_cache(target, len(cached))
+        if state is None:
+            now = datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
+            log_info(f"{now}: No cache state received ({attempts}/{retries})!", f_log=f_log, p=p)
+            target.flush()
+            continue
+        (patch, idx_differs) = cached.diff(*state)
+        if not patch and not idx_differs:
+            break
+
+        # 2. Send the missing entries
+        now = datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
+        log_info(f"{now}: Patching {len(patch)} cache entries ...", f_log=f_log, p=p)
+        for b in range(0, max(len(patch), 1), CACHE_BATCH):
+            if not patch_cache(target, patch[b:b+CACHE_BATCH], cached.idx):
+                now = datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
+                log_info(f"{now}: TimeoutError when patching cache ({attempts}/{retries})!", f_log=f_log, p=p)
+                target.flush()
+                break
+        # 3. Loop back to check the patched state
+    now = datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
+    log_info(f"{now}: Cache synchronized ! [{cached}]", f_log=f_log, p=p)
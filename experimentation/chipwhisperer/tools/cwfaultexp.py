@@ -6,6 +6,9 @@ import datetime
 import os
 
 from cwsetup import chipwhisperersetup, reset_target, randbytes, read_sig, log_info
+from cwselect import select_uniform, wots_address
+from cwjournal import Journal, load_rng
+from cwcache import CacheMirror, resync_cache
 
 # =============================================================================
 # Constants and variables
@@ -60,81 +63,80 @@ forsmsg = randbytes(FORSMSGLEN) # Note: unused (from an unreported experiment)
 pkroot = int.to_bytes(0xfc5429b364889d213a26d5a69986560179dac9c6e20d55f424cee9339179dae8, byteorder="big", length=PKLEN)
 
 # =============================================================================
-# Open and configure ChipWhisperer
+# Configure ChipWhisperer
 # =============================================================================
 
-# Path to SPHINCSplus compiled code
-fw_folder = ""
-if REFLASH:
-    fw_folder = input("Please enter path to 'simpleserial-sphincsplus' folder: ")
-    if not fw_folder:
-        print("Warning: no firmware path detected, skipping relfashing.")
-
-# Connects to chipwhisperer and reflash if fw_folder is provided
-print(f"Opening simpleserial-sphincsplus...")
-(target, scope) = chipwhisperersetup(fw_folder)
-
-# Increase clock frequency
-# STM32F4:
-#   see stm32f4_hal.c
-# STM32F3:
-#   see: https://forum.newae.com/t/cw1173-errortarget-did-not-ack/1757 (clk + baud)
-#   see: https://forum.newae.com/t/stm32f3-clock-frequency-setup/1835/2 (wait_states)
-scope.clock.clkgen_freq = 8E6 # Fixed at 8 [MHz]
-target.baud = 101050
-reset_target(scope)
-
-time.sleep(0.05)
-print(f"Reading target: {target.read()}")
-
-# Glitch parameters
-scope.glitch.clk_src = "clkgen" # set glitch input clock
-scope.glitch.output = "glitch_only" # glitch_out = clk ^ glitch
-scope.glitch.trigger_src = "manual" # glitch only when scope.glitch.manual_trigger() is called
-scope.io.glitch_hp = True
-scope.io.glitch_lp = True
-
-# Found with experimental exploration (see bottom)
-scope.glitch.ext_offset = 0
-scope.glitch.offset = -4
-scope.glitch.width = 20
+def configure(target, scope):
+    """
+    Configure the clock and the glitch parameters used in the experiments.
+
+    @input target  ChipWhisperer's target (target = cw.target(scope))
+    @input scope   Chipwhisperer's scope (scope = cw.scope())
+    """
+    # Increase clock frequency
+    # STM32F4:
+    #   see stm32f4_hal.c
+    # STM32F3:
+    #   see: https://forum.newae.com/t/cw1173-errortarget-did-not-ack/1757 (clk + baud)
+    #   see: https://forum.newae.com/t/stm32f3-clock-frequency-setup/1835/2 (wait_states)
+    scope.clock.clkgen_freq = 8E6 # Fixed at 8 [MHz]
+    target.baud = 101050
+    reset_target(scope)
+
+    time.sleep(0.05)
+    print(f"Reading target: {target.read()}")
+
+    # Glitch parameters
+    scope.glitch.clk_src = "clkgen" # set glitch input clock
+    scope.glitch.output = "glitch_only" # glitch_out = clk ^ glitch
+    scope.glitch.trigger_src = "manual" # glitch only when scope.glitch.manual_trigger() is called
+    scope.io.glitch_hp = True
+    scope.io.glitch_lp = True
+
+    # Found with experimental exploration (see bottom)
+    scope.glitch.ext_offset = 0
+    scope.glitch.offset = -4
+    scope.glitch.width = 20
 
 #DURATION = int(elapsed_simpleserial(target, 'x', b'\x00'*8))
 DURATION = 79
 
-# =============================================================================
-# Experiment #2 - Cached branches
-# =============================================================================
+def schedule_linear(i, M):
+    """
+    Glitch schedule sweeping the signature linearly (as in the original
+    experiments). A schedule concentrating the glitches in the exploitable
+    windows is provided by Timeline.schedule (see evaluation/util/timeline.py).
 
-def fill_cache(target, scope, cached, f_log=None):
+    @input i  Index of the glitch
+    @input M  Number of glitches per experiment
+    @output Time offset of the glitch, relative to DURATION
     """
-    Fill the cache in the target device to match with local state of the cache.
+    return i/(M+1)
 
-    @input target  ChipWhisperer's target (target = cw.target(scope))
-    @input scope   Chipwhisperer's scope (scope = cw.scope())
-    @input cached  Local state of the cache
-    @input f_log   Log file
+def analyze(analyzer, inp, sig, status, preamble="", f_log=None):
     """
-    cmd = 'q' # API to cache ('q': fill_cache)
-    now = datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
-    log_info(f"{now}: Filling cache ...", f_log=f_log, p=PRINT_BY_DEFAULT)
-    for adrs in cached:
-        filled = False
-        inp = 6*b'\x00' + adrs + b'\x00'
-        while not filled: # Will try until the address is cached
-            try:
-                elapsed_simpleserial(target, cmd, inp, timeout=1)
-                time.sleep(0.005)
-                filled = True
-            except TimeoutError:
-                now = datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
-                log_info(f"{now}: TimeoutError when sending {adrs.hex()}! Resetting ...", f_log=f_log, p=PRINT_BY_DEFAULT)
-                reset_target(scope) # Should have ideally found a way to restart from the beginning, but it always failed at the first address, so it was fine
-                target.flush()
+    Feed the outcome of a glitch to the online analyzer of the campaign.
+
+    @input analyzer  Online analyzer (see experimentation/results/online.py),
+                     or None
+    @input inp       Address sent to target
+    @input sig       Signature read from the target (None if nothing)
+    @input status    Status of the outcome (see Journal.outcome)
+    @input preamble  Prefix of the logged line
+    @input f_log     Logfile handler to write in
+    @output True if the target of the analyzer is met
+    """
+    if analyzer is None or not analyzer.update(inp, sig, status):
+        return False
     now = datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
-    log_info(f"{now}: Cache filled ! [{', '.join([c.hex() for c in cached])}]", f_log=f_log, p=PRINT_BY_DEFAULT)
+    log_info(f"{now}: {preamble} TARGET MET, stopping the campaign!", f_log=f_log, p=PRINT_BY_DEFAULT)
+    return True
+
+# =============================================================================
+# Experiment #2 - Cached branches
+# =============================================================================
 
-def run_exp2(target, scope, inplength, N, M, CACHE_SIZE, logged=False):
+def run_exp2(target, scope, inplength, N, M, CACHE_SIZE, logged=False, select=select_uniform, journal=None, rng=random, duration=DURATION, tag="", schedule=schedule_linear, analyzer=None):
     """
     Run the second experiment reported in paper.
 
@@ -145,6 +147,16 @@ def run_exp2(target, scope, inplength, N, M, CACHE_SIZE, logged=False):
     @input M           Number of signatures in an experiment
     @input CACHE_SIZE  Size of the cache
     @input logged      Log the results if True
+    @input select      Address selection strategy (see cwselect.py)
+    @input journal     Path to the campaign journal, resumed if it exists
+                       (see cwjournal.py), or opened Journal
+    @input rng         Random number generator (random or random.Random)
+    @input duration    Duration of a signature (in seconds)
+    @input tag         Name of the bench, appended to the log file name
+    @input schedule    Glitch schedule, giving the time offset of the i-th glitch
+    @input analyzer    Online analyzer, stopping the campaign once its target
+                       is met (see analyze), replayed from the journal by the
+                       caller when resuming
     """
     # Pre-requisites
     cmd = 'z' # API to glitch ('z': sign_cached)
@@ -154,15 +166,24 @@ def run_exp2(target, scope, inplength, N, M, CACHE_SIZE, logged=False):
     # Open log file
     f_log = None
     if logged:
-        logfilename = datetime.datetime.now().strftime(os.path.join(LOG_FOLDER, f"%Y-%m-%d_%H-%M-%S_SPHINCSplus.txt"))
+        logfilename = datetime.datetime.now().strftime(os.path.join(LOG_FOLDER, f"%Y-%m-%d_%H-%M-%S_SPHINCSplus{'_' + tag if tag else ''}.txt"))
         f_log = open(logfilename, 'w')
         print(f"Opened {logfilename}")
 
+    # Open journal and retrieve where the campaign stopped
+    resume = None
+    if journal:
+        if not isinstance(journal, Journal):
+            journal = Journal(journal, rng=rng)
+        resume = journal.resume(wots_address)
+
     try:
         # Start experimentation
         log_info(f"SPHINCSplus (256s, robust) glitch campaign launched", f_log=f_log, p=PRINT_BY_DEFAULT)
         log_info(f"N: {N}", f_log=f_log, p=PRINT_BY_DEFAULT)
         log_info(f"M: {M}", f_log=f_log, p=PRINT_BY_DEFAULT)
+        log_info(f"Address selection: {select.__name__}", f_log=f_log, p=PRINT_BY_DEFAULT)
+        log_info(f"Glitch schedule: {schedule.__name__}", f_log=f_log, p=PRINT_BY_DEFAULT)
         log_info(f"="*80, f_log=f_log, p=PRINT_BY_DEFAULT)
         log_info(f"Clock speed: {scope.clock.clkgen_freq}", f_log=f_log, p=PRINT_BY_DEFAULT)
         log_info(f"Baud rate: {target.baud}", f_log=f_log, p=PRINT_BY_DEFAULT)
@@ -174,55 +195,67 @@ def run_exp2(target, scope, inplength, N, M, CACHE_SIZE, logged=False):
         log_info(f"Glitch output: {scope.glitch.output}", f_log=f_log, p=PRINT_BY_DEFAULT)
         log_info(f"Glitch trigger source: {scope.glitch.trigger_src}", f_log=f_log, p=PRINT_BY_DEFAULT)
         log_info(f"="*80, f_log=f_log, p=PRINT_BY_DEFAULT)
+        if journal:
+            journal.campaign(experiment=2, inplength=inplength, N=N, M=M, CACHE_SIZE=CACHE_SIZE, select=select.__name__)
         
         ### LAUNCH CAMPAIGN (cached) ###
-        for idx in range(N):
+        for idx in range(resume.exp if resume else 0, N):
+            resumed = resume and resume.exp == idx and resume.begun
+            if resume and resume.exp == idx:
+                load_rng(resume.rng, rng)
+
             # Preamble
             now = datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
-            log_info(f"{now} ({idx+1:02d}/{N:02d}) Launching experiment", f_log=f_log, p=PRINT_BY_DEFAULT)
+            log_info(f"{now} ({idx+1:02d}/{N:02d}) {'Resuming' if resumed else 'Launching'} experiment", f_log=f_log, p=PRINT_BY_DEFAULT)
             
             # Set up initial cache
             reset_target(scope)
             target.flush()
-            cached = []
+            cached = CacheMirror(CACHE_SIZE)
             #cached = [int.to_bytes(s, byteorder='big', length=inplength-1) for s in random.sample(range(total_wots), CACHE_SIZE)]
             #cache_idx = 0
             #fill_cache(target, scope, cached, f_log=f_log)
 
             collections = {}
 
+            if resumed: # Restore the journaled state (and the target's cache)
+                collections = resume.collections
+                if resume.cached:
+                    cached = CacheMirror.load(resume.cached)
+                resync_cache(target, scope, cached, f_log=f_log, p=PRINT_BY_DEFAULT)
+            elif journal:
+                journal.begin(idx)
+
             # Program secret seed
             #simpleserial_logsend(target, 'k', skseed, preamble=f"({idx+1:02d}/{N:02d})", f_log=f_log, p=PRINT_BY_DEFAULT)
 
             # LAUNCH GLITCHES
-            for i in range(M):
+            for i in range(resume.i if resumed else 0, M):
                 # Resets target
                 #reset_target(scope)
                 target.flush()
                 if f_log:
                     f_log.flush()
 
-                inp = b"\x00"*zeropad + randbytes(inplength)
+                if resumed and i == resume.i and resume.inp: # Interrupted glitch
+                    inp = resume.inp
+                else:
+                    inp = b"\x00"*zeropad + select(inplength, collections, cached, rng=rng)
+                if journal:
+                    journal.glitch(idx, i, inp)
                 
-                # Address of the W-OTS is the last 8 bits of the tree address
-                address = (int.from_bytes(inp, byteorder='big') >> SPHINCS_XMSS_HEIGHT) & (2**SPHINCS_XMSS_HEIGHT - 1)
+                # Address of the W-OTS+ is the tree address
+                address = wots_address(inp)
                 
                 now = datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
-                log_info(f"{now}: [{i+1:04d}/{M}] Sending  ... {inp.hex()}, waiting {DURATION*(i/M)} sec ...", f_log=f_log, p=PRINT_BY_DEFAULT)
+                wait = duration*schedule(i, M)
+                log_info(f"{now}: [{i+1:04d}/{M}] Sending  ... {inp.hex()}, waiting {wait} sec ...", f_log=f_log, p=PRINT_BY_DEFAULT)
 
                 # 1. Send command
                 target.simpleserial_write(cmd, inp)
                 
                 # 2. Update internal cache
-                predicted = True
-                if not inp[-2:-1] in cached:
-                    predicted = False
-                    if len(cached) < CACHE_SIZE:
-                        cached += [inp[-2:-1]]
-                    else:
-                        cached = cached[1:] + [inp[-2:-1]]
-                    #cached[cache_idx] = inp[-2:-1]
-                    #cache_idx = ((cache_idx + 1) % CACHE_SIZE)
+                predicted = cached.access(inp[-2:-1])
 
                 # 3. Quick read of returned value (in case cached)
                 time.sleep(0.005)
@@ -230,41 +263,47 @@ def run_exp2(target, scope, inplength, N, M, CACHE_SIZE, logged=False):
                 if len(val) >= 4:
                     now = datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
                     log_info(f"{now}: [{i+1:04d}/{M}] CACHE HIT (STATUS={val[-2]}, HIT PREDICTION={predicted})!", f_log=f_log, p=PRINT_BY_DEFAULT)
-                    if not predicted: # Should be True, if not => refill cache
-                        log_info(f"{now}: [{i+1:04d}/{M}] Cache mismatch, resetting ...", f_log=f_log, p=PRINT_BY_DEFAULT)
-                        reset_target(scope)
-                        target.flush()
-                        fill_cache(target, scope, cached, f_log=f_log)
+                    if not predicted: # Should be True, if not => resync cache
+                        log_info(f"{now}: [{i+1:04d}/{M}] Cache mismatch, resynchronizing ...", f_log=f_log, p=PRINT_BY_DEFAULT)
+                        resync_cache(target, scope, cached, f_log=f_log, p=PRINT_BY_DEFAULT)
+                    if journal:
+                        journal.outcome(idx, i, 'hit', cached=cached)
+                    if analyze(analyzer, inp, None, 'hit', f"[{i+1:04d}/{M}]", f_log=f_log):
+                        return
                     continue
                 else:
                     now = datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
                     log_info(f"{now}: [{i+1:04d}/{M}] CACHE MISS (HIT PREDICTION={predicted})!", f_log=f_log, p=PRINT_BY_DEFAULT)
-                    if predicted: # Should be False, if not => refill cache
-                        log_info(f"{now}: [{i+1:04d}/{M}] Cache mismatch, resetting ...", f_log=f_log, p=PRINT_BY_DEFAULT)
-                        reset_target(scope)
-                        target.flush()
-                        fill_cache(target, scope, cached, f_log=f_log)
+                    if predicted: # Should be False, if not => resync cache
+                        log_info(f"{now}: [{i+1:04d}/{M}] Cache mismatch, resynchronizing ...", f_log=f_log, p=PRINT_BY_DEFAULT)
+                        resync_cache(target, scope, cached, f_log=f_log, p=PRINT_BY_DEFAULT)
+                        if journal:
+                            journal.outcome(idx, i, 'mismatch', cached=cached)
+                        if analyze(analyzer, inp, None, 'mismatch', f"[{i+1:04d}/{M}]", f_log=f_log):
+                            return
                         continue
                         
 
                 # 4. Wait a few seconds
-                time.sleep(DURATION*(i/(M+1)))
+                time.sleep(wait)
 
                 # 5. Send glitch
                 scope.glitch.manual_trigger()
                 
                 # 6. Wait remaining time
-                time.sleep(DURATION*(1-(i/(M+1))) + 0.5)
+                time.sleep(duration - wait + 0.5)
                 
                 # 7. Check if anything is wrong
                 ret = scope.capture()
 
-                if ret: # In case of time out => refill cache
+                if ret: # In case of time out => reset and resync cache
                     now = datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
                     log_info(f"{now}: [{i+1:04d}/{M}] TIMED OUT!", f_log=f_log, p=PRINT_BY_DEFAULT)
-                    reset_target(scope)
-                    target.flush()
-                    fill_cache(target, scope, cached, f_log=f_log)
+                    resync_cache(target, scope, cached, reset=True, f_log=f_log, p=PRINT_BY_DEFAULT)
+                    if journal:
+                        journal.outcome(idx, i, 'timeout', cached=cached)
+                    if analyze(analyzer, inp, None, 'timeout', f"[{i+1:04d}/{M}]", f_log=f_log):
+                        return
                 else:
                     # 8. Read signature
                     sig = read_sig(target, 67+8)
@@ -276,26 +315,32 @@ def run_exp2(target, scope, inplength, N, M, CACHE_SIZE, logged=False):
                             collections[address] += [sig]
                         else:
                             collections[address] = [sig]
-                    else: # In case nothing is received => refill cache
+                    else: # In case nothing is received => reset and resync cache
                         log_info(f"{now}: [{i+1:04d}/{M}] Received ... Nothing!", f_log=f_log, p=PRINT_BY_DEFAULT)
-                        reset_target(scope)
-                        target.flush()
-                        fill_cache(target, scope, cached, f_log=f_log)
+                        resync_cache(target, scope, cached, reset=True, f_log=f_log, p=PRINT_BY_DEFAULT)
+                    if journal:
+                        journal.outcome(idx, i, 'signed' if sig else 'nothing', sig=sig, cached=cached)
+                    if analyze(analyzer, inp, sig, 'signed' if sig else 'nothing', f"[{i+1:04d}/{M}]", f_log=f_log):
+                        return
 
             # Log findings
             now = datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
             log_info(f"{now} ({idx+1:05d}/{N:05d}) Finished acquisition\n", f_log=f_log, p=PRINT_BY_DEFAULT)
+            if journal:
+                journal.end(idx)
 
     finally:
         if f_log:
             print(f"Closing {logfilename}...")
             f_log.close()
+        if journal:
+            journal.close()
 
 # =============================================================================
 # Experiment #1 - Cached layers
 # =============================================================================
 
-def run_exp1(target, scope, inplength, N, M, logged=False):
+def run_exp1(target, scope, inplength, N, M, logged=False, select=select_uniform, journal=None, rng=random, duration=DURATION, tag="", schedule=schedule_linear, analyzer=None):
     """
     Run the first experiment reported in paper.
 
@@ -305,6 +350,16 @@ def run_exp1(target, scope, inplength, N, M, logged=False):
     @input N           Number of different experiments
     @input M           Number of signatures in an experiment
     @input logged      Log the results if True
+    @input select      Address selection strategy (see cwselect.py)
+    @input journal     Path to the campaign journal, resumed if it exists
+                       (see cwjournal.py), or opened Journal
+    @input rng         Random number generator (random or random.Random)
+    @input duration    Duration of a signature (in seconds)
+    @input tag         Name of the bench, appended to the log file name
+    @input schedule    Glitch schedule, giving the time offset of the i-th glitch
+    @input analyzer    Online analyzer, stopping the campaign once its target
+                       is met (see analyze), replayed from the journal by the
+                       caller when resuming
     """
     # Pre-requisites
     cmd = 'x' # API to glitch ('x': sign_straight)
@@ -314,15 +369,24 @@ def run_exp1(target, scope, inplength, N, M, logged=False):
     # Open log file
     f_log = None
     if logged:
-        logfilename = datetime.datetime.now().strftime(os.path.join(LOG_FOLDER, f"%Y-%m-%d_%H-%M-%S_SPHINCSplus.txt"))
+        logfilename = datetime.datetime.now().strftime(os.path.join(LOG_FOLDER, f"%Y-%m-%d_%H-%M-%S_SPHINCSplus{'_' + tag if tag else ''}.txt"))
         f_log = open(logfilename, 'w')
         print(f"Opened {logfilename}")
+
+    # Open journal and retrieve where the campaign stopped
+    resume = None
+    if journal:
+        if not isinstance(journal, Journal):
+            journal = Journal(journal, rng=rng)
+        resume = journal.resume(wots_address)
         
     try:
         # Start experimentation
         log_info(f"SPHINCSplus (256s, robust) glitch campaign launched", f_log=f_log, p=PRINT_BY_DEFAULT)
         log_info(f"N: {N}", f_log=f_log, p=PRINT_BY_DEFAULT)
         log_info(f"M: {M}", f_log=f_log, p=PRINT_BY_DEFAULT)
+        log_info(f"Address selection: {select.__name__}", f_log=f_log, p=PRINT_BY_DEFAULT)
+        log_info(f"Glitch schedule: {schedule.__name__}", f_log=f_log, p=PRINT_BY_DEFAULT)
         log_info(f"="*80, f_log=f_log, p=PRINT_BY_DEFAULT)
         log_info(f"Clock speed: {scope.clock.clkgen_freq}", f_log=f_log, p=PRINT_BY_DEFAULT)
         log_info(f"Baud rate: {target.baud}", f_log=f_log, p=PRINT_BY_DEFAULT)
@@ -334,45 +398,62 @@ def run_exp1(target, scope, inplength, N, M, logged=False):
         log_info(f"Glitch output: {scope.glitch.output}", f_log=f_log, p=PRINT_BY_DEFAULT)
         log_info(f"Glitch trigger source: {scope.glitch.trigger_src}", f_log=f_log, p=PRINT_BY_DEFAULT)
         log_info(f"="*80, f_log=f_log, p=PRINT_BY_DEFAULT)
+        if journal:
+            journal.campaign(experiment=1, inplength=inplength, N=N, M=M, select=select.__name__)
 
         ### LAUNCH CAMPAIGN (straight) ###
-        for idx in range(N):
+        for idx in range(resume.exp if resume else 0, N):
+            resumed = resume and resume.exp == idx and resume.begun
+            if resume and resume.exp == idx:
+                load_rng(resume.rng, rng)
+
             # Preamble
             now = datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
-            log_info(f"{now} ({idx+1:02d}/{N:02d}) Launching experiment", f_log=f_log, p=PRINT_BY_DEFAULT)
+            log_info(f"{now} ({idx+1:02d}/{N:02d}) {'Resuming' if resumed else 'Launching'} experiment", f_log=f_log, p=PRINT_BY_DEFAULT)
 
             collections = {}
 
+            if resumed: # Restore the journaled state
+                collections = resume.collections
+            elif journal:
+                journal.begin(idx)
+
             # Program secret seed
             #simpleserial_logsend(target, 'k', skseed, preamble=f"({idx+1:02d}/{N:02d})", f_log=f_log, p=PRINT_BY_DEFAULT)
 
             # LAUNCH GLITCHES
-            for i in range(M):
+            for i in range(resume.i if resumed else 0, M):
                 # Resets target
                 reset_target(scope)
                 target.flush()
                 if f_log:
                     f_log.flush()
 
-                inp = b"\x00"*zeropad + randbytes(inplength)
+                if resumed and i == resume.i and resume.inp: # Interrupted glitch
+                    inp = resume.inp
+                else:
+                    inp = b"\x00"*zeropad + select(inplength, collections, None, rng=rng)
+                if journal:
+                    journal.glitch(idx, i, inp)
                 
-                # Address of the W-OTS is the last 8 bits of the tree address
-                address = (int.from_bytes(inp, byteorder='big') >> SPHINCS_XMSS_HEIGHT) & (2**SPHINCS_XMSS_HEIGHT - 1)
+                # Address of the W-OTS+ is the tree address
+                address = wots_address(inp)
                 
                 now = datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
-                log_info(f"{now}: [{i+1:04d}/{M}] Sending  ... {inp.hex()}, waiting {DURATION*(i/M)} sec ...", f_log=f_log, p=PRINT_BY_DEFAULT)
+                wait = duration*schedule(i, M)
+                log_info(f"{now}: [{i+1:04d}/{M}] Sending  ... {inp.hex()}, waiting {wait} sec ...", f_log=f_log, p=PRINT_BY_DEFAULT)
 
                 # 1. Send command
                 target.simpleserial_write(cmd, inp)
 
                 # 2. Wait a few seconds
-                time.sleep(0.005 + DURATION*(i/(M+1)))
+                time.sleep(0.005 + wait)
 
                 # 3. Send glitch
                 scope.glitch.manual_trigger()
                 
                 # 4. Wait remaining time
-                time.sleep(DURATION*(1-(i/(M+1))) + 0.5)
+                time.sleep(duration - wait + 0.5)
                 
                 # 5. Check if anything is wrong
                 ret = scope.capture()
@@ -382,6 +463,10 @@ def run_exp1(target, scope, inplength, N, M, logged=False):
                     log_info(f"{now}: [{i+1:04d}/{M}] TIMED OUT!", f_log=f_log, p=PRINT_BY_DEFAULT)
                     reset_target(scope)
                     target.flush()
+                    if journal:
+                        journal.outcome(idx, i, 'timeout')
+                    if analyze(analyzer, inp, None, 'timeout', f"[{i+1:04d}/{M}]", f_log=f_log):
+                        return
                 else:
                     # 6. Read signature
                     sig = read_sig(target, 67+8)
@@ -395,15 +480,23 @@ def run_exp1(target, scope, inplength, N, M, logged=False):
                             collections[address] = [sig]
                     else: # In case nothing is received
                         log_info(f"{now}: [{i+1:04d}/{M}] Received ... Nothing!", f_log=f_log, p=PRINT_BY_DEFAULT)
+                    if journal:
+                        journal.outcome(idx, i, 'signed' if sig else 'nothing', sig=sig)
+                    if analyze(analyzer, inp, sig, 'signed' if sig else 'nothing', f"[{i+1:04d}/{M}]", f_log=f_log):
+                        return
 
             # Log findings
             now = datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
             log_info(f"{now} ({idx+1:05d}/{N:05d}) Finished acquisition\n", f_log=f_log, p=PRINT_BY_DEFAULT)
+            if journal:
+                journal.end(idx)
 
     finally:
         if f_log:
             print(f"Closing {logfilename}...")
             f_log.close()
+        if journal:
+            journal.close()
 
 # =============================================================================
 # Experimental exploration
@@ -491,15 +584,28 @@ def run_exp_expl(logged=False):
 # Experiments execution
 # =============================================================================
 
-try:
-    # Run experiment 2 (~4 days)
-    run_exp2(target, scope, inplength=2, N=10, M=512, CACHE_SIZE=171, logged=LOG_BY_DEFAULT)
+if __name__ == '__main__':
+    # Path to SPHINCSplus compiled code
+    fw_folder = ""
+    if REFLASH:
+        fw_folder = input("Please enter path to 'simpleserial-sphincsplus' folder: ")
+        if not fw_folder:
+            print("Warning: no firmware path detected, skipping relfashing.")
 
-    # Run experiment 1 (~5 days)
-    run_exp1(target, scope, inplength=3, N=5, M=1024, logged=LOG_BY_DEFAULT)
+    # Connects to chipwhisperer and reflash if fw_folder is provided
+    print(f"Opening simpleserial-sphincsplus...")
+    (target, scope) = chipwhisperersetup(fw_folder)
+    configure(target, scope)
 
-    #run_exp_expl(logged=LOG_BY_DEFAULT)
+    try:
+        # Run experiment 2 (~4 days)
+        run_exp2(target, scope, inplength=2, N=10, M=512, CACHE_SIZE=171, logged=LOG_BY_DEFAULT)
+
+        # Run experiment 1 (~5 days)
+        run_exp1(target, scope, inplength=3, N=5, M=1024, logged=LOG_BY_DEFAULT)
 
-finally:
-    target.dis()
-    scope.dis()
\ No newline at end of file
+        #run_exp_expl(logged=LOG_BY_DEFAULT)
+
+    finally:
+        target.dis()
+        scope.dis()
\ No newline at end of file
@@ -0,0 +1,254 @@
+import json
+import os
+import random
+
+# =============================================================================
+# Campaign journal
+# =============================================================================
+#
+# The journal is an append-only file with one JSON record per line, flushed to
+# disk before the corresponding action is performed on the target. A campaign
+# writes the following records:
+#
+#   {"type": "campaign", ...}                       parameters of the campaign
+#   {"type": "begin", "exp": idx, "rng": ...}       experiment idx launched
+#   {"type": "glitch", "exp": idx, "i": i,
+#    "inp": ..., "rng": ...}                        address about to be sent
+#   {"type": "outcome", "exp": idx, "i": i,
+#    "status": ..., "sig": ..., "cached": ...}      result of the glitch
+#   {"type": "end", "exp": idx}                     experiment idx finished
+#
+# where "rng" is the state of the campaign's RNG right after the record's
+# random draws, so that a resumed campaign draws exactly the same addresses.
+#
+# Several campaigns run concurrently (see cwmulti.py) share a single journal:
+# each record is then tagged with the "device" that wrote it, and a campaign
+# only resumes from the records of its own device.
+
+def dump_rng(rng=random):
+    """
+    Serialize the state of a RNG.
+
+    @input rng  Random number generator (random or random.Random)
+    @output JSON-compatible state of rng
+    """
+    (version, internal, gauss_next) = rng.getstate()
+    return [version, list(internal), gauss_next]
+
+def load_rng(state, rng=random):
+    """
+    Restore the state of a RNG.
+
+    @input state  Output of dump_rng
+    @input rng    Random number generator (random or random.Random)
+    """
+    (version, internal, gauss_next) = state
+    rng.setstate((version, tuple(internal), gauss_next))
+
+def scan_journal(path):
+    """
+    Read all the complete records of a journal, i.e., up to the first line
+    that is not newline-terminated or cannot be decoded (e.g., due to a crash
+    while writing).
+
+    @input path  Path to the journal
+    @output (List of records, byte length of the complete records)
+    """
+    records = []
+    end = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                records += [json.loads(line)]
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                break
+            end += len(line)
+    return (records, end)
+
+def read_journal(path):
+    """
+    Read all the complete records of a journal (a truncated last line, e.g.,
+    due to a crash while writing, is ignored).
+
+    @input path  Path to the journal
+    @output List of records
+    """
+    return scan_journal(path)[0]
+
+class Resume:
+    """
+    State of an interrupted campaign, as reconstructed from its journal.
+
+    @field exp          Index of the experiment to resume
+    @field begun        False if the experiment must be launched from scratch
+    @field i            Index of the glitch to resume
+    @field inp          Address to resend (None if a new one must be drawn)
+    @field collections  Signatures collected so far, by W-OTS+ address
+    @field cached       Local state of the cache (see CacheMirror.dump)
+    @field rng          State of the RNG to restore
+    """
+    def __init__(self, exp, begun, i, inp, collections, cached, rng):
+        self.exp = exp
+        self.begun = begun
+        self.i = i
+        self.inp = inp
+        self.collections = collections
+        self.cached = cached
+        self.rng = rng
+
+class Journal:
+    """
+    Crash-safe journal of a glitch campaign.
+
+    @input path    Path to the journal (created if it does not exist)
+    @input rng     Random number generator of the campaign
+    @input device  Tag of the device when the journal is shared (None if not)
+    @input lock    Lock shared by the campaigns writing to the same journal
+    """
+    def __init__(self, path, rng=random, device=None, lock=None):
+        self.path = path
+        self.rng = rng
+        self.device = device
+        self.lock = lock
+        if self.lock is None:
+            self.records = self._open()
+        else:
+            with self.lock:
+                self.records = self._open()
+        self.records = [r for r in self.records if r.get('device') == device]
+
+    def _open(self):
+        """
+        Open the journal for appending, after truncating it back to its
+        complete records (so that the next records are not appended to a torn
+        line, and thus ignored on the following resumes).
+
+        @output Complete records of the journal
+        """
+        (records, end) = scan_journal(self.path) if os.path.isfile(self.path) else ([], 0)
+        if os.path.isfile(self.path) and os.path.getsize(self.path) > end:
+            os.truncate(self.path, end)
+        self.f = open(self.path, 'a')
+        return records
+
+    def append(self, record):
+        """
+        Write a record and make sure it reaches the disk.
+
+        @input record  Record to write (dict)
+        """
+        if self.device is not None:
+            record = {'device': self.device, **record}
+        if self.lock is None:
+            self._write(record)
+        else:
+            with self.lock:
+                self._write(record)
+
+    def _write(self, record):
+        self.f.write(json.dumps(record) + '\n')
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    def campaign(self, **params):
+        """
+        Record the parameters of the campaign, or check that they match the
+        ones of the journaled campaign when resuming.
+
+        @input params  Parameters of the campaign
+        """
+        headers = [r for r in self.records if r['type'] == 'campaign']
+        if headers:
+            if {k: headers[0].get(k) for k in params} != params:
+                raise ValueError(f"{self.path} journals another campaign ({headers[0]} != {params})")
+        else:
+            self.append({'type': 'campaign', **params})
+
+    def begin(self, exp):
+        self.append({'type': 'begin', 'exp': exp, 'rng': dump_rng(self.rng)})
+
+    def glitch(self, exp, i, inp):
+        self.append({'type': 'glitch', 'exp': exp, 'i': i, 'inp': inp.hex(), 'rng': dump_rng(self.rng)})
+
+    def outcome(self, exp, i, status, sig=None, cached=None):
+        self.append({'type': 'outcome', 'exp': exp, 'i': i, 'status': status,
+                     'sig': [s.hex() for s in sig] if sig else None,
+                     'cached': cached.dump() if cached is not None else None})
+
+    def end(self, exp):
+        self.append({'type': 'end', 'exp': exp})
+
+    def resume(self, address):
+        """
+        Reconstruct the state of the campaign where it stopped. The records
+        preceding the first experiment (other than the campaign parameters)
+        are ignored, as there is no experiment to resume them in.
+
+        @input address  Function deriving the W-OTS+ address of an input
+        @output Resume state (None if nothing to resume)
+        """
+        state = None
+        pending = None
+        for r in self.records:
+            if r['type'] == 'begin':
+                state = Resume(r['exp'], True, 0, None, {}, None, r['rng'])
+                pending = None
+            elif state is None:
+                continue
+            elif r['type'] == 'glitch':
+                pending = r
+                state.i = r['i']
+                state.inp = bytes.fromhex(r['inp'])
+                state.rng = r['rng']
+            elif r['type'] == 'outcome':
+                if r['sig'] and pending is not None:
+                    state.collections.setdefault(address(bytes.fromhex(pending['inp'])), []).append(
+                        [bytes.fromhex(s) for s in r['sig']])
+                if r['cached'] is not None:
+                    state.cached = r['cached']
+                state.i = r['i'] + 1
+                state.inp = None
+            elif r['type'] == 'end':
+                state = Resume(r['exp'] + 1, False, 0, None, {}, None, state.rng)
+        return state
+
+    def close(self):
+        self.f.close()
+
+# =============================================================================
+# Self-check
+# =============================================================================
+
+if __name__ == '__main__':
+    import tempfile
+
+    address = lambda inp: int.from_bytes(inp, byteorder='big') >> 8
+    with tempfile.TemporaryDirectory() as folder:
+        # Crash while writing an outcome: the torn line is dropped on reopen,
+        # and the records written after it are resumed
+        path = os.path.join(folder, "journal.jsonl")
+        journal = Journal(path)
+        journal.begin(0)
+        journal.glitch(0, 0, b"\x00\x01")
+        journal.f.write('{"type": "outcome", "exp": 0, "i": 0, "sta')
+        journal.close()
+
+        journal = Journal(path)
+        journal.glitch(0, 0, b"\x00\x01")
+        journal.outcome(0, 0, 'signed', sig=[b"\xaa"])
+        journal.close()
+        resume = Journal(path).resume(address)
+        assert (resume.exp, resume.i, resume.collections) == (0, 1, {0: [[b"\xaa"]]}), (resume.exp, resume.i, resume.collections)
+
+        # Records preceding the first experiment
+        path = os.path.join(folder, "orphans.jsonl")
+        journal = Journal(path)
+        journal.glitch(0, 0, b"\x00\x01")
+        journal.outcome(0, 0, 'signed', sig=[b"\xaa"])
+        journal.end(0)
+        journal.close()
+        assert Journal(path).resume(address) is None
+
+    print("cwjournal.py: ok")
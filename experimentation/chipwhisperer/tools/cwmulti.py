@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+import time
+import random
+import datetime
+import threading
+
+from cwsetup import chipwhisperersetup, log_info
+from cwjournal import Journal
+from cwfaultexp import configure, run_exp2, seed, DURATION
+from cwsim import SimTarget, SimScope
+
+# =============================================================================
+# Constants and variables
+# =============================================================================
+# Serial numbers of the ChipWhisperers (one per bench)
+SERIAL_NUMBERS = []
+
+# Dry-run on simulated benches (see cwsim.py) instead of hardware
+SIMULATE = True
+SIM_BENCHES = 4
+SIM_DURATION = 1
+
+# Merged journal of the benches
+JOURNAL = "../logs/campaign.jsonl"
+
+# =============================================================================
+# Multi-bench driver
+# =============================================================================
+
+def run_benches(benches, run_exp, journal, seed=seed, **params):
+    """
+    Run a campaign concurrently on several benches (one thread per bench, as a
+    bench mostly waits for its target to sign).
+
+    Each bench draws its addresses from its own RNG stream, derived from the
+    program seed and its tag, and tags its records in the merged journal, so
+    that every bench resumes on its own (see cwjournal.py).
+
+    @input benches  Benches as {tag: (target, scope)}
+    @input run_exp  Campaign to run (run_exp1 or run_exp2)
+    @input journal  Path to the merged journal
+    @input seed     Program seed
+    @input params   Parameters of the campaign (see run_exp1 and run_exp2)
+    @output Exceptions raised by the benches that failed, as {tag: exception}
+    """
+    lock = threading.Lock()
+    errors = {}
+
+    def bench(tag, target, scope):
+        rng = random.Random(f"{seed}/{tag}")
+        try:
+            run_exp(target, scope, rng=rng, tag=tag,
+                    journal=Journal(journal, rng=rng, device=tag, lock=lock), **params)
+        except Exception as e:
+            now = datetime.datetime.now().strftime("%Y/%m/%d %H:%M:%S")
+            log_info(f"{now}: [{tag}] Bench failed: {e!r}")
+            errors[tag] = e
+
+    threads = [threading.Thread(target=bench, args=(tag, target, scope), name=tag)
+               for (tag, (target, scope)) in benches.items()]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
+
+# =============================================================================
+# Experiments execution
+# =============================================================================
+
+if __name__ == '__main__':
+    if SIMULATE:
+        benches = {}
+        for b in range(SIM_BENCHES):
+            target = SimTarget(duration=SIM_DURATION, seed=bytes([b]))
+            benches[f"sim{b}"] = (target, SimScope(target, rng=random.Random(b)))
+        duration = SIM_DURATION
+    else:
+        benches = {}
+        for sn in SERIAL_NUMBERS:
+            print(f"Opening simpleserial-sphincsplus on {sn}...")
+            (target, scope) = chipwhisperersetup(sn=sn)
+            configure(target, scope)
+            benches[sn] = (target, scope)
+        duration = DURATION
+
+    try:
+        start = time.monotonic()
+        errors = run_benches(benches, run_exp2, JOURNAL, inplength=2, N=10, M=512, CACHE_SIZE=171, duration=duration)
+        print(f"{len(benches)} benches ({len(errors)} failed) in {time.monotonic() - start:.1f} sec")
+
+    finally:
+        for (target, scope) in benches.values():
+            target.dis()
+            scope.dis()
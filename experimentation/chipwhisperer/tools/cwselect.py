@@ -0,0 +1,109 @@
+import random
+
+from cwsetup import randbytes
+
+# Default constants
+SPHINCS_XMSS_HEIGHT = 8 # Height of an XMSS tree
+WOTS_LEN = 67           # Number of elements in a W-OTS+ signature (SPHINCS+-256s)
+MAX_DRAWS = 64          # Number of draws before giving up on finding a fresh address
+
+def wots_address(inp):
+    """
+    Address of the W-OTS+ key pair at l* signing the XMSS tree addressed by the
+    input sent to the target (i.e., the tree address at l*-1).
+
+    @input inp  Address sent to target (tree | leaf)
+    @output W-OTS+ key pair address (tree)
+    """
+    return int.from_bytes(inp, byteorder='big') >> SPHINCS_XMSS_HEIGHT
+
+def distinct_sigs(sigs, l=WOTS_LEN):
+    """
+    Count the distinct W-OTS+ signatures among the signatures collected at a
+    same address (the authentication paths are discarded).
+
+    @input sigs  Signatures read from the target (see read_sig)
+    @input l     Number of elements in a W-OTS+ signature
+    @output Number of distinct W-OTS+ signatures
+    """
+    return len({b''.join(sig[:l]) for sig in sigs})
+
+def is_cached(inp, cached):
+    """
+    Predict whether the target answers the input from its cache.
+
+    @input inp     Address sent to target (tree | leaf)
+    @input cached  Local state of the cache (None if not cached experiment)
+    @output True if cache hit
+    """
+    return cached is not None and inp[-2:-1] in cached
+
+# =============================================================================
+# Address selection strategies
+# =============================================================================
+#
+# A strategy is called before each glitch as
+#
+#     inp = select(inplength, collections, cached, rng=rng)
+#
+# where collections maps the W-OTS+ key pair address (see wots_address) to the
+# list of signatures collected so far, and cached is the local state of the
+# target's cache (None when the target does not cache). All the random draws go
+# through rng, so that concurrent campaigns keep their own RNG stream. It returns
+# the inplength bytes of address to send to the target.
+
+def select_uniform(inplength, collections, cached=None, rng=random):
+    """
+    Select a uniformly random address (as in the original experiments).
+
+    @input inplength    Bytelength of addresses sent to target
+    @input collections  Signatures collected so far, by W-OTS+ address
+    @input cached       Local state of the cache
+    @input rng          Random number generator
+    @output Address to send to target
+    """
+    return randbytes(inplength, rng)
+
+def select_coverage(inplength, collections, cached=None, rng=random):
+    """
+    Select an address that brings a W-OTS+ key pair closer to compromise.
+
+    A W-OTS+ key pair is compromised once two distinct signatures are collected
+    at its address. Hence, addresses with a single distinct signature are
+    revisited first (with a random leaf, as it does not change the key pair).
+    Otherwise, a fresh address is drawn. In both cases, addresses predicted to
+    hit the cache are avoided, as the target would not sign anything.
+
+    @input inplength    Bytelength of addresses sent to target
+    @input collections  Signatures collected so far, by W-OTS+ address
+    @input cached       Local state of the cache
+    @input rng          Random number generator
+    @output Address to send to target
+    """
+    # 1. Revisit W-OTS+ key pairs with a single distinct signature
+    pending = []
+    for (address, sigs) in collections.items():
+        inp = int.to_bytes(address << SPHINCS_XMSS_HEIGHT, byteorder='big', length=inplength)
+        if distinct_sigs(sigs) == 1 and not is_cached(inp, cached):
+            pending += [address]
+    if pending:
+        address = rng.choice(pending)
+        leaf = rng.randint(0, 2**SPHINCS_XMSS_HEIGHT - 1)
+        return int.to_bytes((address << SPHINCS_XMSS_HEIGHT) | leaf, byteorder='big', length=inplength)
+
+    # 2. Draw a fresh address, preferably never visited and not cached
+    fallback = None
+    for _ in range(MAX_DRAWS):
+        inp = randbytes(inplength, rng)
+        if is_cached(inp, cached):
+            continue
+        if not wots_address(inp) in collections:
+            return inp
+        fallback = fallback or inp
+    return fallback or inp
+
+# Available strategies
+SELECTORS = {
+    'uniform': select_uniform,
+    'coverage': select_coverage,
+}
@@ -1,13 +1,12 @@
 import random
 import time
-import chipwhisperer as cw
 import os
 
 # Default options
 CRYPTO_TARGET='SPHINCSplus'
 PLATFORM='CW308_STM32F4'
 
-def chipwhisperersetup(fw_folder="", CRYPTO_TARGET=CRYPTO_TARGET, SCOPETYPE='OPENADC', PLATFORM=PLATFORM):
+def chipwhisperersetup(fw_folder="", CRYPTO_TARGET=CRYPTO_TARGET, SCOPETYPE='OPENADC', PLATFORM=PLATFORM, sn=None):
     """
     Connect to the ChipWhisperer and flash the simpleserial-sphincsplus firmware
     if provided a firmware path.
@@ -17,6 +16,8 @@ def chipwhisperersetup(fw_folder="", CRYPTO_TARGET=CRYPTO_TARGET, SCOPETYPE='OPE
     @input CRYPTO_TARGET  Should be 'SPHINCSplus'
     @input SCOPETYPE      Should be 'OPENADC'
     @input PLATFORM       Should be 'CW308_STM32F4'
+    @input sn             Serial number of the ChipWhisperer to connect to
+                          (if None, then the only one plugged in)
     @output target  ChipWhisperer's target (target = cw.target(scope))
     @output scope   Chipwhisperer's scope (scope = cw.scope())
     """
@@ -32,14 +33,17 @@ def chipwhisperersetup(fw_folder="", CRYPTO_TARGET=CRYPTO_TARGET, SCOPETYPE='OPE
         make PLATFORM={PLATFORM} CRYPTO_TARGET={CRYPTO_TARGET}
 """)
 
+    # Imported here, so that the simulated benches (see cwsim.py) run without it
+    import chipwhisperer as cw
+
     # Try to connect to chipwhisperer
     try:
-        scope = cw.scope()
+        scope = cw.scope(sn=sn)
         target = cw.target(scope)
     except IOError:
         print("INFO: Caught exception on reconnecting to target - attempting to reconnect to scope first.")
         print("INFO: This is a work-around when USB has died without Python knowing. Ignore errors above this line.")
-        scope = cw.scope()
+        scope = cw.scope(sn=sn)
         target = cw.target(scope)
 
     print("INFO: Found ChipWhisperer😍")
@@ -87,14 +91,15 @@ def reset_target(scope, PLATFORM=PLATFORM):
         scope.io.nrst = 'high'
         time.sleep(0.05)
 
-def randbytes(n):
+def randbytes(n, rng=random):
     """
     Generate random bytes of provided byte length.
 
-    @input n  Bytelength
+    @input n    Bytelength
+    @input rng  Random number generator (random or random.Random)
     @output Random bytes of bytelength n
     """
-    return int.to_bytes(random.randint(0, 2**(n*8)-1), byteorder="big", length=n)
+    return int.to_bytes(rng.randint(0, 2**(n*8)-1), byteorder="big", length=n)
 
 def read_sig(target, l=75):
     """
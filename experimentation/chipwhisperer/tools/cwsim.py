@@ -0,0 +1,181 @@
+import time
+import random
+import hashlib
+
+from cwcache import CacheMirror, CACHE_SIZE, CACHE_BATCH
+
+# =============================================================================
+# Simulated bench
+# =============================================================================
+#
+# Software stand-ins for a ChipWhisperer (scope) and a target running the
+# simpleserial-sphincsplus firmware, answering the commands used by the
+# campaigns ('x', 'z', 'r', 'g', 'f') with the same framing as the target (see
+# read_sig, query_cache and patch_cache). They only mimic the observable
+# behaviour of a glitch (faulty, missing or no signature at all, and mute
+# target until reset), so as to dry-run a campaign or a multi-bench setup (see
+# cwmulti.py) without hardware.
+
+# Default constants
+SIG_LEN = 67+8  # Number of elements read per signature (W-OTS+ signature and authentication path)
+WOTS_LEN = 67   # Number of elements in a W-OTS+ signature
+
+class SimTarget:
+    """
+    Simulated target.
+
+    @input duration  Duration of a signature (in seconds)
+    @input seed      Seed of the simulated secret key
+    @input size      Size of the cache
+    """
+    def __init__(self, duration=1, seed=b'', size=CACHE_SIZE):
+        self.duration = duration
+        self.seed = seed
+        self.size = size
+        self.baud = 101050
+        self.reset()
+
+    def reset(self):
+        self.cache = CacheMirror(self.size)
+        self.out = ''
+        self.sig = None
+        self.done = 0     # Time at which the current signature is done
+        self.mute = False # Target crashed (until reset)
+
+    def element(self, address, msg, j):
+        return hashlib.sha256(self.seed + address + msg + int.to_bytes(j, byteorder='big', length=2)).digest()
+
+    def sign(self, inp, msg=b''):
+        """
+        Start signing an address.
+
+        @input inp  Address sent to target (tree | leaf)
+        @input msg  Message signed by the W-OTS+ key pair (empty if not faulted)
+        """
+        address = inp[:-1]
+        self.sig = [self.element(address, msg, j) for j in range(WOTS_LEN)]
+        self.sig += [self.element(inp, b'', j) for j in range(WOTS_LEN, SIG_LEN)]
+        self.done = time.monotonic() + self.duration
+
+    def signing(self):
+        return self.sig is not None and time.monotonic() < self.done
+
+    def simpleserial_write(self, cmd, data):
+        if self.mute:
+            return
+        if cmd == 'x':
+            self.sign(data)
+        elif cmd == 'z':
+            if self.cache.access(data[-2:-1]):
+                self.out += 'z01\n'
+            else:
+                self.sign(data)
+        elif cmd == 'r':
+            j = int.from_bytes(data, byteorder='little')
+            if self.sig is not None and not self.signing() and j < len(self.sig):
+                self.out += self.sig[j].decode('latin-1') + 'z00\n'
+        elif cmd == 'g':
+            self.out += chr(self.cache.idx) + bytes(self.cache.entries).decode('latin-1') + 'z00\n'
+        elif cmd == 'f':
+            for i in range(min(data[0], CACHE_BATCH)):
+                if data[2+2*i] < self.size:
+                    self.cache.entries[data[2+2*i]] = data[3+2*i]
+            if data[1] < self.size:
+                self.cache.idx = data[1]
+            self.out += 'z00\n'
+
+    def simpleserial_wait_ack(self, timeout=500):
+        if self.mute or not self.out.endswith('z00\n'):
+            return None
+        self.out = self.out[:-4]
+        return 0
+
+    def read(self, num_char=0, timeout=250):
+        (out, self.out) = (self.out, '')
+        return out
+
+    def flush(self):
+        self.out = ''
+
+    def dis(self):
+        pass
+
+class _Clock:
+    clkgen_freq = 8E6
+
+class _ADC:
+    state = False
+
+class _Glitch:
+    def __init__(self, scope):
+        self.scope = scope
+        self.clk_src = "clkgen"
+        self.output = "glitch_only"
+        self.trigger_src = "manual"
+        self.ext_offset = 0
+        self.offset = -4
+        self.width = 20
+
+    def manual_trigger(self):
+        self.scope.fault()
+
+class _IO:
+    def __init__(self, scope):
+        self.scope = scope
+        self.glitch_hp = True
+        self.glitch_lp = True
+        self.pdic = 'high'
+        self._nrst = 'high'
+
+    @property
+    def nrst(self):
+        return self._nrst
+
+    @nrst.setter
+    def nrst(self, value):
+        if value == 'low':
+            self.scope.target.reset()
+        self._nrst = value
+
+class SimScope:
+    """
+    Simulated scope, glitching a SimTarget.
+
+    @input target    Glitched SimTarget
+    @input p_fault   Probability that a glitch faults the signature
+    @input p_crash   Probability that a glitch crashes the target
+    @input p_none    Probability that a glitch aborts the signature
+    @input rng       Random number generator drawing the glitch outcomes
+    """
+    def __init__(self, target, p_fault=0.1, p_crash=0.02, p_none=0.02, rng=None):
+        self.target = target
+        self.p = (p_fault, p_crash, p_none)
+        self.rng = rng or random.Random()
+        self.clock = _Clock()
+        self.adc = _ADC()
+        self.glitch = _Glitch(self)
+        self.io = _IO(self)
+
+    def fault(self):
+        target = self.target
+        if target.mute or not target.signing():
+            return
+        (p_fault, p_crash, p_none) = self.p
+        draw = self.rng.random()
+        if draw < p_fault:
+            auth_path = target.sig[WOTS_LEN:]
+            target.sig = [target.element(b'', self.rng.randbytes(8), j) for j in range(WOTS_LEN)] + auth_path
+        elif draw < p_fault + p_crash:
+            target.mute = True
+        elif draw < p_fault + p_crash + p_none:
+            target.sig = None
+
+    def capture(self):
+        """
+        @output True if the target timed out
+        """
+        time.sleep(max(0, self.target.done - time.monotonic()))
+        return self.target.mute
+
+    def dis(self):
+        pass
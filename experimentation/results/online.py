@@ -0,0 +1,218 @@
+import json
+import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from SPHINCSplus import ADRS
+from collections import Counter
+from functools import lru_cache
+from math import prod
+
+from utils import SigIndex, derive_chains
+
+# -----------------------------------------------------------------------------
+# Online analysis
+# -----------------------------------------------------------------------------
+#
+# Classifies the outcomes of a glitch campaign as they are acquired (see
+# run_exp1 and run_exp2 in cwfaultexp.py), rather than from the logs once the
+# campaign is over (see results_exp1.py and results_exp2.py), with the same
+# classes as check_faulty, check_verifiable and check_correctness:
+#	- valid, if the signature is the expected one;
+#	- verifiable, if the faulty W-OTS+ signature is the one of the root
+#	  recomputed from the received authentication path;
+#	- correct, if the faulty non-verifiable W-OTS+ signature lies on the chains;
+#	- incorrect, otherwise (including when nothing is received).
+# The maximum load, the compromised W-OTS+ and their grafting probabilities are
+# updated along (as in check_compromised and check_compromised_cached).
+#
+# The memory is bounded: the distinct signatures are only indexed by digest
+# (SigIndex), a key pair only keeps the lowest digits of its signatures (which
+# is enough for the grafting probability, see compute_graftingproba), and the
+# trees at the previous layer (leaves, root, and chains of the W-OTS+ signing
+# it) are derived once per tree, in a cache of bounded size.
+
+class OnlineAnalyzer:
+	"""Online analysis of the signatures of the W-OTS+ at the specified layer.
+
+	The target is either a grafting probability, reached by the first
+	compromised W-OTS+ whose grafting probability is at least as high, or a
+	function of the analyzer returning whether to stop. The cache is the number
+	of trees whose derivation is kept.
+	"""
+
+	def __init__(self, spx, layer, target=None, cache=2**4):
+		self.spx = spx
+		self.layer = layer
+		self.target = target
+		self.h = spx.xmss.h_prime
+
+		self.classes = Counter()
+		self.index = SigIndex(spx.hash.n, keep=False)
+		self.visited = set()
+		self.lowest = {}
+		self.msgs = Counter()
+		self.graft_p = {}
+		self.recomp_queries = float('inf')
+		self.queries = 0
+		self.done = False
+
+		self._tree = lru_cache(maxsize=cache)(self._derive)
+
+	def _derive(self, tree):
+		"""Derives the leaves and the root of the tree at the previous layer, the
+		expected W-OTS+ signature of the root, and the positions of the values of
+		the chains of this W-OTS+.
+		"""
+		spx = self.spx
+		adrs = ADRS()
+		adrs.setLayerAddress(self.layer-1)
+		adrs.setTreeAddress(tree)
+		leaves = []
+		for i in range(2**self.h):
+			adrs.setKeyPairAddress(i)
+			leaves += [spx.wots_plus.keygen(spx.sk_seed, adrs, spx.pk_seed)[1]]
+		adrs.setType(ADRS.Type.XMSS)
+		adrs.setKeyPairAddress(0)
+		(root, _) = spx.hash.treehash(leaves, 0, adrs, spx.pk_seed)
+
+		sig = spx.wots_plus.sign(root, spx.sk_seed, self._wots_adrs(tree), spx.pk_seed)
+
+		return (leaves, root, sig, derive_chains(spx, self.layer, tree))
+
+	def _wots_adrs(self, tree):
+		adrs = ADRS()
+		adrs.setLayerAddress(self.layer)
+		adrs.setTreeAddress(tree >> self.h)
+		adrs.setKeyPairAddress(tree & (2**self.h-1))
+		return adrs
+
+	def _auth_path(self, tree, leaf):
+		(leaves, _, _, _) = self._tree(tree)
+		adrs = ADRS()
+		adrs.setLayerAddress(self.layer-1)
+		adrs.setTreeAddress(tree)
+		adrs.setType(ADRS.Type.XMSS)
+		(_, auth_path) = self.spx.hash.treehash(leaves, leaf, adrs, self.spx.pk_seed)
+		return auth_path
+
+	def _digits(self, tree, wots_sig):
+		"""Returns the digits of a W-OTS+ signature of the key pair signing tree
+		(None if not on the chains).
+		"""
+		digits = [chain.get(x) for (chain, x) in zip(self._tree(tree)[3], wots_sig)]
+		return digits if len(digits) == self.spx.wots_plus.len and None not in digits else None
+
+	def classify(self, tree, leaf, sig):
+		"""Returns the class of the signature (W-OTS+ signature and
+		authentication path elements, or None if nothing was received) sent
+		for the leaf of the tree at the previous layer.
+		"""
+		(spx, ell) = (self.spx, self.spx.wots_plus.len)
+		if not sig:
+			return 'incorrect'
+		(leaves, _, expected, _) = self._tree(tree)
+		(wots_sig, auth_path) = (sig[:ell], sig[ell:])
+
+		if wots_sig == expected and auth_path == self._auth_path(tree, leaf):
+			return 'valid'
+
+		# Root recomputed from the received authentication path
+		adrs = ADRS()
+		adrs.setLayerAddress(self.layer-1)
+		adrs.setTreeAddress(tree)
+		adrs.setType(ADRS.Type.XMSS)
+		root = spx.hash.recomp_root(leaves[leaf], auth_path, leaf, adrs, spx.pk_seed)
+		if wots_sig == spx.wots_plus.sign(root, spx.sk_seed, self._wots_adrs(tree), spx.pk_seed):
+			return 'verifiable'
+
+		return 'correct' if self._digits(tree, wots_sig) else 'incorrect'
+
+	def _collect(self, tree, wots_sig):
+		"""Collects a W-OTS+ signature of the key pair signing tree, and updates
+		its grafting probability.
+		"""
+		if not self.index.add(tree, b''.join(wots_sig)):
+			return
+		digits = self._digits(tree, wots_sig)
+		if digits is None:
+			return
+		W = self.spx.wots_plus.W
+		self.lowest[tree] = list(map(min, zip(self.lowest.get(tree, digits), digits)))
+		self.msgs[tree] += 1
+		if self.msgs[tree] > 1:
+			self.graft_p[tree] = prod((W-b)/W for b in self.lowest[tree])
+
+	def update(self, inp, sig, status=None):
+		"""Analyzes the outcome of a glitch, and returns whether the target is
+		met.
+
+		The input is the address sent to the target (bytes or hexadecimal
+		string), the signature the elements read from the target (see read_sig,
+		None if nothing was received), and the status the one of the journal
+		(see Journal.outcome). Cache hits collect the expected signature of a
+		tree not visited yet, the timeouts and cache mismatches are ignored.
+		"""
+		address = int(inp, 16) if isinstance(inp, str) else int.from_bytes(inp, byteorder='big')
+		(tree, leaf) = (address >> self.h, address & (2**self.h-1))
+		self.queries += 1
+
+		if status in ['timeout', 'mismatch']:
+			return self.done
+
+		if status == 'hit':
+			if tree not in self.visited:
+				self._collect(tree, self._tree(tree)[2])
+		else:
+			self.classes[self.classify(tree, leaf, sig)] += 1
+			if sig:
+				self._collect(tree, sig[:self.spx.wots_plus.len])
+		self.visited.add(tree)
+
+		# Condition to compromise
+		if self.index.load(tree) >= 2:
+			self.recomp_queries = min(self.recomp_queries, self.queries-1)
+
+		if callable(self.target):
+			self.done = self.done or self.target(self)
+		elif self.target is not None:
+			self.done = self.done or self.graft_p.get(tree, 0) >= self.target
+		return self.done
+
+	def feed(self, record, pending=None):
+		"""Analyzes a journal record (see cwjournal.py), and returns the pending
+		glitch record, i.e., the input of the next outcome.
+		"""
+		if record['type'] == 'glitch':
+			return record
+		if record['type'] == 'outcome' and pending is not None:
+			sig = [bytes.fromhex(s) for s in record['sig']] if record['sig'] else None
+			self.update(pending['inp'], sig, record['status'])
+		return None
+
+	def follow(self, path, device=None, poll=1.0):
+		"""Analyzes the records of a journal as they are written, and returns
+		when the target is met (a partially written line is read again once
+		complete).
+		"""
+		pending = None
+		with open(path) as f:
+			while not self.done:
+				pos = f.tell()
+				line = f.readline()
+				if not line.endswith('\n'):
+					f.seek(pos)
+					time.sleep(poll)
+					continue
+				record = json.loads(line)
+				if record.get('device') == device:
+					pending = self.feed(record, pending)
+
+	def results(self):
+		"""Returns the results as check_compromised_cached (maximum load, number
+		of compromised W-OTS+, grafting probabilities, queries before the first
+		compromise), along with the classes of the analyzed signatures.
+		"""
+		graft_p = [(tree, self.graft_p.get(tree, 0)) for tree in self.index.compromised()]
+		return (self.index.max_load, self.index.n_compromised, graft_p, self.recomp_queries, self.classes)
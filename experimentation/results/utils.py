@@ -3,7 +3,9 @@ sys.path.append('../../')
 
 import re
 from SPHINCSplus import ADRS
+from hashlib import blake2b
 from math import prod
+import numpy as np
 
 # -----------------------------------------------------------------------------
 # Miscellaneous
@@ -72,6 +74,30 @@ def derive_sig(spx, layer, tree):
 
 	return sig
 
+def derive_chains(spx, layer, tree):
+	"""Derives the chains of the W-OTS+ at specified layer signing the XMSS
+	tree root at the previous layer, each as the position of its values.
+	"""
+	wots_adrs = ADRS()
+	wots_adrs.setLayerAddress(layer)
+	wots_adrs.setTreeAddress(tree >> spx.xmss.h_prime)
+	wots_adrs.setKeyPairAddress(tree & (2**spx.xmss.h_prime-1))
+	wots_adrs.setType(ADRS.Type.WOTSCHAIN)
+
+	chains = []
+	for i in range(spx.wots_plus.len):
+		wots_adrs.setChainAddress(i)
+		wots_adrs.setHashAddress(0)
+		x = spx.hash.PRF(spx.sk_seed, wots_adrs)
+		chain = {x: 0}
+		for j in range(spx.wots_plus.W-1):
+			wots_adrs.setHashAddress(j)
+			x = spx.hash.F(x, wots_adrs, spx.pk_seed)
+			chain[x] = j+1
+		chains += [chain]
+
+	return chains
+
 # -----------------------------------------------------------------------------
 # Log parsing functions
 # -----------------------------------------------------------------------------
@@ -155,6 +181,78 @@ def parse_logs_cached(logfile):
 
 	return (send_data, recv_data, cache_data)
 
+# -----------------------------------------------------------------------------
+# Signature index
+# -----------------------------------------------------------------------------
+
+class SigIndex:
+	"""Index of the distinct W-OTS+ signatures collected per key pair (layer,
+	tree, leaf).
+
+	Each distinct signature is stored once, in bytes, along with the
+	authentication path of its first occurrence, and addressed by its digest
+	(16 bytes), so that a key pair only holds the digests of its signatures.
+	The loads are maintained on insertion, hence the maximum load and the number
+	of compromised key pairs (i.e., with at least 2 distinct signatures) are
+	available in O(1). The elements of the signatures are n bytes long. Without
+	keep, only the digests are stored, which is enough for the loads but not for
+	the grafting probabilities.
+	"""
+
+	def __init__(self, n=32, keep=True):
+		self.n = n
+		self.keep = keep
+		self.blobs = {}
+		self.adrs2sig = {}
+		self.max_load = 0
+		self.n_compromised = 0
+
+	def add(self, key, sig, auth_path=b''):
+		"""Adds a W-OTS+ signature (bytes) of the key pair key, and returns
+		whether it is new for this key pair.
+		"""
+		digest = blake2b(sig, digest_size=16).digest()
+		if self.keep and digest not in self.blobs:
+			self.blobs[digest] = (sig, auth_path)
+
+		sigs = self.adrs2sig.setdefault(key, set())
+		if digest in sigs:
+			return False
+		sigs.add(digest)
+		self.max_load = max(self.max_load, len(sigs))
+		if len(sigs) == 2:
+			self.n_compromised += 1
+		return True
+
+	def add_hex(self, key, recv, ell=67):
+		"""Adds a received W-OTS+ signature and authentication path (hexadecimal
+		strings of the elements separated by spaces, as in the logs), and returns
+		whether it is new for this key pair. The elements truncated in the logs
+		are dropped.
+		"""
+		elems = [bytes.fromhex(x) for x in recv.split() if len(x) == 2*self.n]
+		return self.add(key, b''.join(elems[:ell]), b''.join(elems[ell:]))
+
+	def load(self, key):
+		return len(self.adrs2sig.get(key, ()))
+
+	def compromised(self):
+		"""Yields the compromised key pairs.
+		"""
+		return (key for (key, sigs) in self.adrs2sig.items() if len(sigs) > 1)
+
+	def signatures(self, key):
+		"""Returns the distinct W-OTS+ signatures of a key pair, each as the list
+		of its elements.
+		"""
+		return [[sig[i:i+self.n] for i in range(0, len(sig), self.n)] for (sig, _) in (self.blobs[d] for d in self.adrs2sig.get(key, ()))]
+
+	def __contains__(self, key):
+		return key in self.adrs2sig
+
+	def __len__(self):
+		return len(self.adrs2sig)
+
 # -----------------------------------------------------------------------------
 # Signatures checks
 # -----------------------------------------------------------------------------
@@ -311,13 +409,7 @@ def compute_graftingproba(spx, sigs, tree, layer):
 
 	msgs = []
 	for s in sigs:
-		# Skips "Nothing"
-		if "Nothing" in s:
-			continue
-
-		# W-OTS+ signature elements
-		s = [int.to_bytes(int(x, 16), byteorder='big', length=32) for x in s.split()]
-
+		# W-OTS+ signature elements (see SigIndex.signatures)
 		(sk, _) = spx.wots_plus.keygen(spx.sk_seed, wots_adrs, spx.pk_seed)
 
 		msg = []
@@ -345,20 +437,56 @@ def compute_graftingproba(spx, sigs, tree, layer):
 
 	return (tree, proba)
 
-def derive_results(spx, layer, adrs2sig):
-	"""Derives the various results according to number of collisions of
-	signatures for a same address.
+def recover_digits(spx, layer, index, trees):
+	"""Recovers the messages (digits) of the distinct W-OTS+ signatures of the
+	specified trees (tree addresses of previous layer) in a SigIndex, each key
+	pair being derived once.
+
+	Returns the trees, the number of messages of each, and the messages of all
+	trees (array of signatures x ell), grouped by tree. The signatures with
+	elements off the chains are dropped.
+	"""
+	(counts, msgs) = ([], [])
+	for tree in trees:
+		chains = derive_chains(spx, layer, tree)
+		digits = np.array([[chain.get(x, -1) for (chain, x) in zip(chains, s)] for s in index.signatures(tree)], dtype=np.int16).reshape(-1, spx.wots_plus.len)
+		digits = np.unique(digits[(digits >= 0).all(axis=1)], axis=0)
+		counts += [len(digits)]
+		msgs += [digits]
+
+	return (list(trees), np.array(counts), np.concatenate(msgs) if msgs else np.empty((0, spx.wots_plus.len), dtype=np.int16))
+
+def compute_graftingprobas(spx, layer, index, trees):
+	"""Computes the theoretical probability that each specified tree could be
+	grafted given its W-OTS+ signatures in a SigIndex (see
+	compute_graftingproba), at once for all trees.
 	"""
-	# Get maximum load (i.e., maximum number of unique signatures at a single address)
-	max_load = len(max(adrs2sig.values(), key= lambda v: len(v)))
+	(trees, counts, msgs) = recover_digits(spx, layer, index, trees)
+	W = spx.wots_plus.W
+
+	# Lowest digits of each tree with messages
+	nonempty = counts > 0
+	starts = np.cumsum(counts) - counts
+	lowest = np.minimum.reduceat(msgs, starts[nonempty], axis=0) if msgs.size else msgs
 
-	# Get compromised W-OTS+ (i.e., addresses for which there are at least 2 unique signatures)
-	compromised_wots = list(filter(lambda k: len(adrs2sig[k]) > 1, adrs2sig))
+	proba = np.zeros(len(trees))
+	proba[nonempty] = np.prod((W - lowest)/W, axis=1)
+	proba[counts < 2] = 0
 
-	# Compute grafting probabilities
-	graft_p = [compute_graftingproba(spx, adrs2sig[adrs], adrs, layer) for adrs in compromised_wots]
+	return list(zip(trees, proba.tolist()))
+
+def derive_results(spx, layer, index):
+	"""Derives the various results according to number of collisions of
+	signatures for a same address.
+
+	The signatures are in a SigIndex, by tree address of previous layer.
+	"""
+	# Compute grafting probabilities of compromised W-OTS+ (i.e., addresses for
+	# which there are at least 2 unique signatures)
+	graft_p = compute_graftingprobas(spx, layer, index, list(index.compromised()))
 
-	return (max_load, len(compromised_wots), graft_p)
+	# Maximum load (i.e., maximum number of unique signatures at a single address)
+	return (index.max_load, index.n_compromised, graft_p)
 
 def check_compromised(spx, layer, send_data, recv_data):
 	"""Checks the number of compromised W-OTS+ key pairs by arranging all the
@@ -370,12 +498,12 @@ def check_compromised(spx, layer, send_data, recv_data):
 	hexadecimal string, big endian).
 	"""
 	# Arrange signatures by address (tree address of previous layer)
-	adrs2sig = {k:set() for k in [int(adrs,16) >> 8 for adrs in send_data]}
+	index = SigIndex(spx.hash.n)
 	for i in range(len(send_data)):
 		if not "Nothing" in recv_data[i]:
-			adrs2sig[int(send_data[i], 16) >> 8].add(recv_data[i][:65*67-1])
+			index.add_hex(int(send_data[i], 16) >> 8, recv_data[i], spx.wots_plus.len)
 
-	return derive_results(spx, layer, adrs2sig)
+	return derive_results(spx, layer, index)
 
 def check_compromised_cached(spx, layer, send_data, recv_data, cache_data):
 	"""Checks the number of compromised W-OTS+ key pairs by arranging all the
@@ -388,9 +516,9 @@ def check_compromised_cached(spx, layer, send_data, recv_data, cache_data):
 	the cache missed (all in hexadecimal string, big endian), and the cached
 	data to the status of the cache returned by each sent address.
 	"""
-	adrs2sig = {k:set() for k in [int(adrs,16) >> 8 for adrs in send_data]}
+	index = SigIndex(spx.hash.n)
 
-	visited = []
+	visited = set()
 	recv_idx = 0
 	recomp_queries = float('inf')
 	for i in range(len(send_data)):
@@ -406,20 +534,19 @@ def check_compromised_cached(spx, layer, send_data, recv_data, cache_data):
 				continue
 
 			# Re-compute address from pretended cache
-			sig = ' '.join([x.hex() for x in derive_sig(spx, layer, tree)])
-			adrs2sig[int(send_data[i], 16) >> 8].add(sig)
+			index.add(tree, b''.join(derive_sig(spx, layer, tree)))
 		# On (true) cache MISS
 		elif cache_data[i] == 0:
 			if not "Nothing" in recv_data[recv_idx]:
-				adrs2sig[tree].add(recv_data[recv_idx][:65*67-1])
+				index.add_hex(tree, recv_data[recv_idx], spx.wots_plus.len)
 			recv_idx += 1
 
-		visited += [tree]
+		visited.add(tree)
 
 		# Condition to compromise
-		if len(adrs2sig[tree]) >= 2:
+		if index.load(tree) >= 2:
 			recomp_queries = min(recomp_queries, i)
 
-	(maxload, n_compromised, graft_p) = derive_results(spx, layer, adrs2sig)
+	(maxload, n_compromised, graft_p) = derive_results(spx, layer, index)
 
 	return (maxload, n_compromised, graft_p, recomp_queries)
\ No newline at end of file